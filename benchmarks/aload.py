@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measure loading many calendars from a (local stand-in for a) server one by
+one and concurrently using `ICalTool.aload_many`.
+
+Usage: python3 benchmarks/aload.py [NUMBER_OF_CALENDARS] [EVENTS_EACH]
+       [LATENCY_IN_SECONDS]
+"""
+
+import functools
+import http.server
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from generate import write_calendar
+
+class SlowHandler(http.server.SimpleHTTPRequestHandler):
+    # answer like a server far away
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    calendars = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    SlowHandler.latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        for number in range(calendars):
+            write_calendar(os.path.join(directory, '{}.ics'.format(number)),
+                events=events, seed=number)
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+            functools.partial(SlowHandler, directory=directory))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        urls = ['http://127.0.0.1:{}/{}.ics'.format(server.server_port,
+            number) for number in range(calendars)]
+
+        print('calendars: {}, events each: {}, latency: {}s'.format(
+            calendars, events, SlowHandler.latency))
+        for concurrency in (1, 4, 16, 64):
+            tool = ICalTool()
+            start = time.perf_counter()
+            failed = tool.load_many(urls, concurrency=concurrency)
+            duration = time.perf_counter() - start
+            print('concurrency: {:2}  {:.2f}s  {} components  {} failed'
+                .format(concurrency, duration,
+                    len(tool.vcalendar._components), len(failed)))
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare evaluating rules component by component with the column store
+(needs numpy).
+
+Usage: python3 benchmarks/columns.py [NUMBER_OF_EVENTS]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from icaltool import rules
+from generate import write_calendar
+
+RULES = [
+    'DTSTART:+2015to2017',
+    'COMPONENT:+VEVENT;DTSTART:+2010to2020;DTEND:-2012',
+    'ATTENDEE:+person1',
+    'SUMMARY:+Event 1|-Event 12',
+]
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events - events // 10,
+            todos=events // 10)
+        tool = ICalTool()
+        tool.load(file_name)
+
+        start = time.perf_counter()
+        if tool.build_columns() is None:
+            sys.exit('numpy is needed')
+        print('components: {}, building the columns: {:.2f}s'.format(
+            events, time.perf_counter() - start))
+        column_store = tool.vcalendar.column_store
+
+        for rule in RULES:
+            rule_filter = rules.compile_rules(rule)
+            tool.vcalendar.column_store = None
+            start = time.perf_counter()
+            expected = tool.vcalendar.select(rule_filter).positions
+            objects = time.perf_counter() - start
+            tool.vcalendar.column_store = column_store
+            start = time.perf_counter()
+            positions = tool.vcalendar.select(rule_filter).positions
+            vectorized = time.perf_counter() - start
+            assert positions == expected
+            print('{:50} components: {:.3f}s  columns: {:.3f}s'.format(rule,
+                objects, vectorized))
+
+if __name__ == '__main__':
+    main()
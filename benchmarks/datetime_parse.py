@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Compare `datatypes.parse_date` against parsing with `time.strptime`.
+
+Usage: python3 benchmarks/datetime_parse.py [NUMBER_OF_VALUES]
+"""
+
+import os
+import sys
+import time
+import calendar
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+
+formats = {
+    8: ('%Y%m%d', 1),
+    15: ('%Y%m%dT%H%M%S', 2),
+    16: ('%Y%m%dT%H%M%SZ', 3),
+    10: ('%Y-%m-%d', 1),
+    19: ('%Y-%m-%dT%H:%M:%S', 2),
+}
+
+def parse_strptime(value):
+    # the way `DateTime` used to parse values
+    format_string, date_type = formats[len(value)]
+    return (calendar.timegm(time.strptime(value, format_string)), date_type)
+
+def measure(function, values):
+    start = time.perf_counter()
+    for value in values:
+        function(value)
+    return time.perf_counter() - start
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    random.seed(42)
+
+    unique = []
+    for i in range(number):
+        unique.append('{:04d}{:02d}{:02d}T{:02d}{:02d}00{}'.format(
+            random.randint(1990, 2030), random.randint(1, 12),
+            random.randint(1, 28), random.randint(0, 23),
+            random.randint(0, 59), 'Z' if i % 2 else ''))
+    # DTSTAMP, CREATED, ... tend to repeat
+    repeated = [unique[i % 100] for i in range(number)]
+
+    for name, values in (('unique', unique), ('repeated', repeated)):
+        datatypes.parse_date.cache_clear()
+        old = measure(parse_strptime, values)
+        new = measure(datatypes.parse_date, values)
+        print('{:9} strptime: {:.3f}s  parse_date: {:.3f}s  speedup: {:.1f}x'
+            .format(name, old, new, old / new))
+
+if __name__ == '__main__':
+    main()
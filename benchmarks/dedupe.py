@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Measure removing duplicates from a calendar merged with itself.
+
+Usage: python3 benchmarks/dedupe.py [NUMBER_OF_EVENTS]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from generate import write_calendar
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events)
+        tool = ICalTool()
+        tool.load_merged([file_name, file_name])
+
+        size = len(tool.vcalendar._components)
+        start = time.perf_counter()
+        duplicates = tool.dedupe()
+        duration = time.perf_counter() - start
+        print('components: {}, duplicates: {}, {:.2f}s'.format(size,
+            duplicates, duration))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic calendars for benchmarks.
+
+Usage: python3 benchmarks/generate.py FILE.ics [--events N] [--todos N]
+       [--alarms RATIO] [--attendees N] [--x-properties N]
+       [--description-length N] [--seed N]
+"""
+
+import argparse
+import datetime
+import random
+
+TIMEZONES = ['Europe/Berlin', 'America/New_York', 'Asia/Tokyo']
+
+VTIMEZONE = [
+    'BEGIN:VTIMEZONE',
+    'TZID:Europe/Berlin',
+    'BEGIN:DAYLIGHT',
+    'TZOFFSETFROM:+0100',
+    'TZOFFSETTO:+0200',
+    'TZNAME:CEST',
+    'DTSTART:19700329T020000',
+    'RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU',
+    'END:DAYLIGHT',
+    'BEGIN:STANDARD',
+    'TZOFFSETFROM:+0200',
+    'TZOFFSETTO:+0100',
+    'TZNAME:CET',
+    'DTSTART:19701025T030000',
+    'RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU',
+    'END:STANDARD',
+    'END:VTIMEZONE']
+
+WORDS = ['meeting', 'project', 'review', 'lunch', 'call', 'planning',
+    'budget', 'team', 'weekly', 'release', 'customer', 'über', 'café']
+
+def fold(line):
+    # fold at 74 characters like the writer does for ASCII text
+    lines = [line[:74]]
+    line = line[74:]
+    while line:
+        lines.append(' ' + line[:73])
+        line = line[73:]
+    return lines
+
+def _datetime(rng, year_from, year_to):
+    # a `datetime.datetime` at a quarter of an hour in [year_from, year_to]
+    first = datetime.datetime(year_from, 1, 1)
+    quarters = (datetime.datetime(year_to + 1, 1, 1) - first) // \
+        datetime.timedelta(minutes=15)
+    return first + datetime.timedelta(minutes=15 * rng.randrange(quarters))
+
+def _format(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def generate_lines(events=10000, todos=0, alarms=0.25, attendees=3,
+    x_properties=2, description_length=300, seed=42):
+    """
+    Generate the lines (including line breaks) of a calendar with `events`
+    VEVENTs and `todos` VTODOs. A share of `alarms` events has a VALARM,
+    every event has up to `attendees` ATTENDEEs, `x_properties` X-
+    properties and a folded DESCRIPTION of about `description_length`
+    characters. A third of the dates are UTC, a third use a TZID and a third
+    are dates.
+    """
+    rng = random.Random(seed)
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'PRODID:-//icaltool//benchmark//EN\r\n'
+    yield 'VERSION:2.0\r\n'
+    for line in VTIMEZONE:
+        yield line + '\r\n'
+
+    for i in range(events):
+        lines = ['BEGIN:VEVENT', 'UID:event-{}@benchmark'.format(i)]
+        start = _datetime(rng, 2000, 2030)
+        end = _format(start + datetime.timedelta(hours=1))
+        kind = i % 3
+        if kind == 0:
+            lines.append('DTSTART:{}Z'.format(_format(start)))
+            lines.append('DTEND:{}Z'.format(end))
+        elif kind == 1:
+            timezone = rng.choice(TIMEZONES)
+            lines.append('DTSTART;TZID={}:{}'.format(timezone,
+                _format(start)))
+            lines.append('DTEND;TZID={}:{}'.format(timezone, end))
+        else:
+            lines.append('DTSTART;VALUE=DATE:{}'.format(
+                start.strftime('%Y%m%d')))
+            lines.append('DTEND;VALUE=DATE:{}'.format((start.date() +
+                datetime.timedelta(days=1)).strftime('%Y%m%d')))
+        # DTSTAMP / CREATED tend to repeat
+        lines.append('DTSTAMP:2020{:02d}01T000000Z'.format(i % 12 + 1))
+        lines.append('CREATED:2019{:02d}01T000000Z'.format(i % 12 + 1))
+        lines.append('LAST-MODIFIED:{}Z'.format(_format(
+            _datetime(rng, 2019, 2020))))
+        lines.append('SEQUENCE:{}'.format(rng.randint(0, 3)))
+        lines.append('SUMMARY:{} {}'.format(
+            ' '.join(rng.choice(WORDS) for _ in range(3)), i))
+        description = []
+        while len(' '.join(description)) < description_length:
+            description.append(rng.choice(WORDS))
+        lines.extend(fold('DESCRIPTION:' + ' '.join(description)))
+        lines.append('LOCATION:Room {}'.format(rng.randint(1, 50)))
+        lines.append('STATUS:' + rng.choice(
+            ('CONFIRMED', 'TENTATIVE', 'CANCELLED')))
+        lines.append('CLASS:' + rng.choice(('PUBLIC', 'PRIVATE')))
+        lines.append('TRANSP:OPAQUE')
+        lines.append('CATEGORIES:' + rng.choice(WORDS).upper())
+        lines.append('ORGANIZER;CN=Organizer {0}:mailto:organizer{0}@mail.domain'
+            .format(rng.randint(1, 20)))
+        for _ in range(rng.randint(0, attendees)):
+            lines.append('ATTENDEE;CN=Person {0};ROLE=REQ-PARTICIPANT:' \
+                'mailto:person{0}@mail.domain'.format(rng.randint(1, 500)))
+        for x in range(x_properties):
+            lines.append('X-BENCHMARK-{}:{}'.format(x, rng.randint(0, 100)))
+        if i % 10 == 0:
+            lines.append('RRULE:FREQ=WEEKLY;COUNT={}'.format(
+                rng.randint(2, 52)))
+        if rng.random() < alarms:
+            lines.extend(['BEGIN:VALARM', 'ACTION:DISPLAY',
+                'TRIGGER:-PT{}M'.format(rng.choice((5, 15, 30))),
+                'DESCRIPTION:Reminder', 'END:VALARM'])
+        lines.append('END:VEVENT')
+        yield '\r\n'.join(lines) + '\r\n'
+
+    for i in range(todos):
+        stamp = _format(_datetime(rng, 2015, 2025))
+        yield '\r\n'.join([
+            'BEGIN:VTODO',
+            'UID:todo-{}@benchmark'.format(i),
+            'CREATED:{}Z'.format(stamp),
+            'DTSTAMP:{}Z'.format(stamp),
+            'LAST-MODIFIED:{}Z'.format(stamp),
+            'SUMMARY:{} {}'.format(rng.choice(WORDS), i),
+            'END:VTODO']) + '\r\n'
+
+    yield 'END:VCALENDAR\r\n'
+
+def write_calendar(file_name, **options):
+    """
+    Write a calendar generated by `generate_lines(**options)` to
+    `file_name`.
+    """
+    with open(file_name, 'w', encoding='utf-8', newline='') as file_handle:
+        file_handle.writelines(generate_lines(**options))
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate a synthetic calendar for benchmarks.')
+    parser.add_argument('file', help='the .ics-file to write', type=str)
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--todos', type=int, default=0)
+    parser.add_argument('--alarms', type=float, default=0.25,
+        help='share of events with an alarm')
+    parser.add_argument('--attendees', type=int, default=3,
+        help='maximum number of attendees per event')
+    parser.add_argument('--x-properties', type=int, default=2)
+    parser.add_argument('--description-length', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    write_calendar(args.file, events=args.events, todos=args.todos,
+        alarms=args.alarms, attendees=args.attendees,
+        x_properties=args.x_properties,
+        description_length=args.description_length, seed=args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held by a loaded calendar.
+
+Usage: python3 benchmarks/memory.py [NUMBER_OF_EVENTS]
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+import gc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from generate import write_calendar
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events)
+
+        tool = ICalTool()
+        gc.collect()
+        tracemalloc.start()
+        tool.load(file_name)
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print('events:              {}'.format(events))
+    print('retained memory:     {:.1f} MiB'.format(current / 2**20))
+    print('peak memory (load):  {:.1f} MiB'.format(peak / 2**20))
+    print('bytes per event:     {:.0f}'.format(current / events))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Measure how loading an `.ics`-file scales with the number of processes.
+
+Usage: python3 benchmarks/parallel.py [NUMBER_OF_EVENTS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from generate import write_calendar
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events)
+
+        print('events: {}, cpus: {}'.format(events, os.cpu_count()))
+        reference = None
+        for jobs in (1, 2, 4, 8):
+            tool = ICalTool()
+            start = time.perf_counter()
+            tool.ical_load(file_name, jobs=jobs)
+            duration = time.perf_counter() - start
+            if reference is None:
+                reference = duration
+            print('jobs: {}  {:.2f}s  speedup: {:.2f}x'.format(
+                jobs, duration, reference / duration))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Measure date rules matching any occurrence of recurring events: daily,
+weekly and monthly series spanning decades are queried for short windows
+far from their start, expanded only for those windows.
+
+Usage: python3 benchmarks/recurrence.py [NUMBER_OF_SERIES] [NUMBER_OF_QUERIES]
+"""
+
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from icaltool import rules
+
+RULES = [
+    'FREQ=DAILY',
+    'FREQ=DAILY;INTERVAL=3',
+    'FREQ=WEEKLY;BYDAY=MO,WE,FR',
+    'FREQ=MONTHLY;BYDAY=-1FR',
+    'FREQ=DAILY;UNTIL=20491231T235959Z',
+]
+
+def write_series(file_name, series, seed=0):
+    generator = random.Random(seed)
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:benchmark']
+    for number in range(series):
+        year = generator.randint(1970, 2000)
+        month = generator.randint(1, 12)
+        hour = generator.randint(7, 18)
+        lines.extend([
+            'BEGIN:VEVENT',
+            'UID:series-{}'.format(number),
+            'DTSTART:{}{:02}01T{:02}0000Z'.format(year, month, hour),
+            'DTEND:{}{:02}01T{:02}3000Z'.format(year, month, hour),
+            'RRULE:{}'.format(RULES[number % len(RULES)]),
+            'EXDATE:{}{:02}02T{:02}0000Z'.format(year + 1, month, hour),
+            'SUMMARY:series {}'.format(number),
+            'END:VEVENT'])
+    lines.append('END:VCALENDAR')
+    with open(file_name, 'w', encoding='utf-8', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+def main():
+    series = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_series(file_name, series)
+        tool = ICalTool()
+        tool.load(file_name)
+    components = tool.vcalendar._components
+    print('series: {}, queries: {}'.format(series, queries))
+
+    generator = random.Random(1)
+    windows = ['{}-{:02}'.format(generator.randint(2001, 2060),
+        generator.randint(1, 12)) for _ in range(queries)]
+    start = time.perf_counter()
+    matching = 0
+    for window in windows:
+        rule_filter = rules.compile_rules('DTSTART:+{}'.format(window))
+        rule_filter.occurrences = True
+        matching += sum(1 for component in components
+            if component.meets_criteria(rule_filter))
+    duration = time.perf_counter() - start
+    print('{} month windows: {:.3f}s, {:.3f}ms per series and window, {} ' \
+        'matches'.format(len(windows), duration,
+        duration * 1000 / (series * len(windows)), matching))
+
+    # the occurrences of the last window are kept, e.g. for DTSTART and
+    # DTEND rules or several outputs using the same window
+    rule_filter = rules.compile_rules('DTEND:+{}'.format(windows[-1]))
+    rule_filter.occurrences = True
+    start = time.perf_counter()
+    matching = sum(1 for component in components
+        if component.meets_criteria(rule_filter))
+    duration = time.perf_counter() - start
+    print('same window again (DTEND): {:.3f}s, {} matches'.format(duration,
+        matching))
+
+    # what windowing saves: expand every series from its start up to the
+    # end of a window in 2060
+    window = rules.parse_date_range('2060-06')
+    sample = components[:max(1, series // 20)]
+    start = time.perf_counter()
+    occurrences = 0
+    for component in sample:
+        for occurrence in component.recurrence().iter_between(None,
+            window[1]):
+            occurrences += 1
+    duration = time.perf_counter() - start
+    start = time.perf_counter()
+    windowed = 0
+    for component in sample:
+        windowed += len(list(component.recurrence().iter_between(*window)))
+    windowed_duration = time.perf_counter() - start
+    print('{} series up to 2060-06: {} occurrences in {:.3f}s from the ' \
+        'start, {} in {:.4f}s for the window only'.format(len(sample),
+        occurrences, duration, windowed, windowed_duration))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Measure streaming a calendar into a file sorted by DTSTART with different
+memory limits: everything sorted in memory, a few large runs and many
+small runs merged in several passes. The outputs have to be the same.
+
+Usage: python3 benchmarks/sort.py [NUMBER_OF_EVENTS]
+"""
+
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from generate import write_calendar
+
+# `ICalTool.sort_memory` in bytes, `None`: not sorted
+LIMITS = [None, 256 * 2**20, 4 * 2**20, 2**18]
+
+def stream(file_name, output, limit, trace):
+    tool = ICalTool(stats=True)
+    if not limit is None:
+        tool.sort_by = 'DTSTART'
+        tool.sort_memory = limit
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    tool.stream(file_name, [('output', output)])
+    duration = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return duration, peak, tool.stats.counters['sort_runs_spilled']
+
+def digest(file_name):
+    with open(file_name, 'rb') as file_handle:
+        return hashlib.sha256(file_handle.read()).hexdigest()
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events)
+        print('events: {}, file: {:.1f} MiB'.format(events,
+            os.path.getsize(file_name) / 2**20))
+        digests = set()
+        for limit in LIMITS:
+            output = os.path.join(directory, 'sorted.ics')
+            duration, _, runs = stream(file_name, output, limit, False)
+            # tracemalloc slows everything down, measure memory separately
+            _, peak, _ = stream(file_name, output, limit, True)
+            if not limit is None:
+                digests.add(digest(output))
+            print('{:>12}: {:.2f}s, peak memory {:.1f} MiB, {} runs'.format(
+                'not sorted' if limit is None else
+                '{:g} MiB'.format(limit / 2**20), duration, peak / 2**20,
+                runs))
+    print('same output' if len(digests) == 1 else 'DIFFERENT OUTPUTS')
+    sys.exit(0 if len(digests) == 1 else 1)
+
+if __name__ == '__main__':
+    main()
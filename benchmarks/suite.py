@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Measure time and peak memory of every stage (`ical_load`, `filter`,
+`ical_write`, `csv_write`, `csv_load`) for calendars of different sizes.
+
+Usage: python3 benchmarks/suite.py [--sizes 10000,100000,1000000]
+       [--output results.json] [--compare baseline.json] [--threshold 0.1]
+       [--no-memory]
+
+With `--compare` every stage taking more time or memory than the baseline
+(by more than `threshold`) is reported as a regression and the exit code is
+1.
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from generate import write_calendar
+
+RULES = 'COMPONENT:+VEVENT;DTSTART:+2010to2020;ATTENDEE:+person1'
+
+def stages(directory, file_name):
+    # (name, function) of every stage, each function gets the tool of the
+    # previous stage and returns the tool for the next one
+    ics_output = os.path.join(directory, 'output.ics')
+    csv_output = os.path.join(directory, 'output.csv')
+
+    def ical_load(tool):
+        tool = ICalTool()
+        tool.ical_load(file_name)
+        return tool
+
+    def ical_write(tool):
+        tool.ical_write(ics_output)
+        return tool
+
+    def csv_write(tool):
+        tool.csv_write(csv_output)
+        return tool
+
+    def filter_rules(tool):
+        tool.filter(RULES)
+        return tool
+
+    def csv_load(tool):
+        tool = ICalTool()
+        tool.csv_load(csv_output)
+        return tool
+
+    return [('ical_load', ical_load), ('ical_write', ical_write),
+        ('csv_write', csv_write), ('filter', filter_rules),
+        ('csv_load', csv_load)]
+
+def run_stages(directory, file_name, memory):
+    results = {}
+    tool = None
+    for name, function in stages(directory, file_name):
+        gc.collect()
+        if memory:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        tool = function(tool)
+        duration = time.perf_counter() - start
+        results[name] = {'time': duration}
+        if memory:
+            results[name]['peak_memory'] = \
+                tracemalloc.get_traced_memory()[1] - before
+    return results
+
+def run(sizes, memory=True):
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'benchmark.ics')
+            write_calendar(file_name, events=size - size // 10,
+                todos=size // 10)
+            # time without tracing memory, it slows everything down
+            results[str(size)] = run_stages(directory, file_name, False)
+            if memory:
+                tracemalloc.start()
+                traced = run_stages(directory, file_name, True)
+                tracemalloc.stop()
+                for name, values in traced.items():
+                    results[str(size)][name]['peak_memory'] = \
+                        values['peak_memory']
+        print_results(size, results[str(size)])
+    return results
+
+def print_results(size, results):
+    print('{} components'.format(size))
+    for name, values in results.items():
+        line = '  {:12} {:8.3f}s'.format(name, values['time'])
+        if 'peak_memory' in values:
+            line += ' {:10.1f} MiB'.format(values['peak_memory'] / 2**20)
+        print(line)
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of regressions, i.e. stages that took more time or memory
+    than in `baseline` by more than `threshold` (relative).
+    """
+    regressions = []
+    for size, stages in results.items():
+        for name, values in stages.items():
+            try:
+                reference = baseline['results'][size][name]
+            except KeyError:
+                continue
+            for measure, value in values.items():
+                if not measure in reference or reference[measure] <= 0:
+                    continue
+                change = value / reference[measure] - 1
+                if change > threshold:
+                    regressions.append(
+                        '{} components, {}: {} {:+.0%} ({:.4g} -> {:.4g})'
+                        .format(size, name, measure, change,
+                            reference[measure], value))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the stages of icaltool.')
+    parser.add_argument('--sizes', type=str, default='10000,100000,1000000',
+        help='comma separated numbers of components')
+    parser.add_argument('--output', type=str,
+        help='save the results to this .json-file')
+    parser.add_argument('--compare', type=str,
+        help='.json-file with results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+        help='relative change counted as regression')
+    parser.add_argument('--no-memory', action='store_true',
+        help='do not measure peak memory')
+    args = parser.parse_args()
+
+    # warnings about unknown properties are not of interest here
+    logging.disable(logging.WARNING)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rules': RULES,
+        },
+        'results': run(sizes, not args.no_memory),
+    }
+
+    if not args.output is None:
+        with open(args.output, 'w') as file_handle:
+            json.dump(results, file_handle, indent=2)
+
+    if not args.compare is None:
+        with open(args.compare, 'r') as file_handle:
+            baseline = json.load(file_handle)
+        regressions = compare(results['results'], baseline, args.threshold)
+        if regressions:
+            print('regressions:')
+            for regression in regressions:
+                print('  ' + regression)
+            sys.exit(1)
+        print('no regressions')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Measure filtering ATTENDEE against long lists of terms, once as one term per
+address (`-a|-b|...`, checked one by one) and once as term list.
+
+Usage: python3 benchmarks/terms.py [NUMBER_OF_EVENTS] [NUMBER_OF_TERMS]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from icaltool import rules
+from generate import write_calendar
+
+def measure(tool, rule_filter):
+    start = time.perf_counter()
+    selection = tool.vcalendar.select(rule_filter)
+    return time.perf_counter() - start, len(selection)
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    number_of_terms = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    logging.disable(logging.WARNING)
+    # addresses not in the calendar and a few that are
+    terms = ['nobody{}@mail.domain'.format(i) for i in range(number_of_terms)]
+    terms[::number_of_terms // 4] = ['person{}@'.format(i) for i in range(4)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events)
+        tool = ICalTool()
+        tool.load(file_name)
+
+        one_by_one = rules.Filter([], False, {
+            'ATTENDEE': rules.PropertyRule('ATTENDEE', [])})
+        one_by_one.property_rules['ATTENDEE'].terms = [
+            rules.Term('-' + term) for term in terms]
+        combined = rules.Filter([], False, {})
+        combined.add_terms('ATTENDEE', terms, False, 'contains')
+
+        print('events: {}, terms: {}'.format(events, number_of_terms))
+        duration, kept = measure(tool, one_by_one)
+        print('one by one (str.find): {:.2f}s ({} kept)'.format(duration, kept))
+        duration, kept = measure(tool, combined)
+        print('term list (Aho-Corasick): {:.2f}s ({} kept)'.format(duration,
+            kept))
+
+if __name__ == '__main__':
+    main()
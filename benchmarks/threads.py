@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Stress test parsing many different calendars in threads at the same time:
+every calendar has X-properties of its own, the result of every parse (the
+calendar and the properties its schema ended up with) has to be the same as
+when parsing the calendars one after the other.
+
+Usage: python3 benchmarks/threads.py [NUMBER_OF_CALENDARS] [EVENTS_EACH]
+       [THREADS] [ROUNDS]
+"""
+
+import concurrent.futures
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from icaltool import datatypes
+from icaltool import reader
+from generate import generate_lines
+
+def write_calendars(directory, calendars, events):
+    file_names = []
+    for number in range(calendars):
+        file_name = os.path.join(directory, '{}.ics'.format(number))
+        # X-properties only this calendar has
+        content = ''.join(generate_lines(events=events, x_properties=3,
+            seed=number)).replace('X-BENCHMARK-', 'X-CALENDAR{}-'.format(
+            number))
+        with open(file_name, 'w', encoding='utf-8', newline='') as \
+            file_handle:
+            file_handle.write(content)
+        file_names.append(file_name)
+    return file_names
+
+def load(file_name):
+    # the written calendar and the .csv-columns using a tool of its own
+    tool = ICalTool()
+    tool.ical_load(file_name)
+    return (tool.vcalendar.ical_write(), tool.schema.csv_columns('VEVENT'))
+
+def parse(file_name, schema):
+    # the written calendar parsed using `schema` (shared by all threads)
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_read_lines(file_name), schema=schema)
+    return vcalendar.ical_write()
+
+def main():
+    calendars = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    events = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    rounds = int(sys.argv[4]) if len(sys.argv) > 4 else 5
+
+    logging.disable(logging.WARNING)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        file_names = write_calendars(directory, calendars, events)
+        print('calendars: {}, events each: {}, threads: {}, rounds: {}'
+            .format(calendars, events, threads, rounds))
+
+        start = time.perf_counter()
+        expected = [load(file_name) for file_name in file_names]
+        print('one after the other: {:.2f}s'.format(
+            time.perf_counter() - start))
+
+        with concurrent.futures.ThreadPoolExecutor(threads) as executor:
+            for number in range(rounds):
+                start = time.perf_counter()
+                results = list(executor.map(load, file_names))
+                duration = time.perf_counter() - start
+                wrong = sum(1 for result, reference in zip(results, expected)
+                    if not result == reference)
+                failures += wrong
+                print('round {}, a tool per calendar: {:.2f}s, {} wrong'
+                    .format(number, duration, wrong))
+
+                schema = datatypes.Schema()
+                start = time.perf_counter()
+                results = list(executor.map(parse, file_names,
+                    [schema] * calendars))
+                duration = time.perf_counter() - start
+                wrong = sum(1 for result, reference in zip(results, expected)
+                    if not result == reference[0])
+                # every X-property of every calendar, each added once
+                columns = schema.csv_columns('VEVENT')
+                missing = sum(1 for reference in expected
+                    for name in reference[1] if not name in columns)
+                if missing or not len(columns) == len(set(columns)):
+                    wrong += 1
+                failures += wrong
+                print('round {}, one shared schema: {:.2f}s, {} wrong'
+                    .format(number, duration, wrong))
+
+                tool = ICalTool()
+                start = time.perf_counter()
+                tool.load_many(file_names, concurrency=threads,
+                    executor=executor)
+                duration = time.perf_counter() - start
+                # properties are added in the order of the sources
+                columns = [name for name in tool.schema.csv_columns('VEVENT')
+                    if name[:10] == 'X-CALENDAR']
+                ordered = [name for reference in expected
+                    for name in reference[1] if name[:10] == 'X-CALENDAR']
+                wrong = 0 if columns == ordered else 1
+                failures += wrong
+                print('round {}, load_many: {:.2f}s, {} wrong'.format(
+                    number, duration, wrong))
+
+    # nothing leaks into the classes or the default schema
+    leaked = [name for name in datatypes.VEVENT.defined_properties
+        if name[:10] == 'X-CALENDAR'] + [name for name in
+        datatypes.default_schema.csv_columns('VEVENT')
+        if name[:10] == 'X-CALENDAR']
+    if leaked:
+        failures += 1
+        print('leaked into the defaults: {}'.format(', '.join(leaked)))
+    print('ok' if failures == 0 else '{} failures'.format(failures))
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
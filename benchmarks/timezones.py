@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare converting local times to UTC using the cached offset tables of
+`timezones` against asking zoneinfo for every value.
+
+Usage: python3 benchmarks/timezones.py [NUMBER_OF_VALUES]
+"""
+
+import datetime
+import os
+import random
+import sys
+import time
+import zoneinfo
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import timezones
+
+ZONES = ['Europe/Berlin', 'America/New_York', 'Asia/Kolkata',
+    'Australia/Sydney']
+
+def to_utc_zoneinfo(tzid, local):
+    # the way a `DateTime` would be converted without tables
+    value = datetime.datetime.fromtimestamp(local, datetime.timezone.utc)
+    value = value.replace(tzinfo=zoneinfo.ZoneInfo(tzid))
+    return int(value.timestamp())
+
+def measure(function, values):
+    start = time.perf_counter()
+    for tzid, local in values:
+        function(tzid, local)
+    return time.perf_counter() - start
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    random.seed(42)
+    values = [(random.choice(ZONES), random.randint(631152000, 1893456000))
+        for _ in range(number)]
+
+    zones = timezones.Zones()
+    start = time.perf_counter()
+    for tzid in ZONES:
+        zones.zone(tzid)
+    print('tables for {} time zones: {:.3f}s'.format(len(ZONES),
+        time.perf_counter() - start))
+
+    def to_utc(tzid, local):
+        return zones.zone(tzid).to_utc(local)
+
+    old = measure(to_utc_zoneinfo, values)
+    new = measure(to_utc, values)
+    wrong = sum(1 for tzid, local in values
+        if not to_utc(tzid, local) == to_utc_zoneinfo(tzid, local))
+    print('{} values  zoneinfo: {:.3f}s  tables: {:.3f}s  speedup: {:.1f}x  '
+        'different: {}'.format(number, old, new, old / new, wrong))
+
+if __name__ == '__main__':
+    main()
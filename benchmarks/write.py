@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Measure the throughput of writing `.ics`- and `.csv`-files.
+
+Usage: python3 benchmarks/write.py [NUMBER_OF_EVENTS]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool.icaltool import ICalTool
+from icaltool import datatypes
+from generate import write_calendar
+
+def ical_write_list(tool, file_name):
+    # the way `ICalTool.ical_write` used to write files
+    with open(file_name, 'w') as file_handle:
+        lines = tool.vcalendar.ical_write()
+        for line in lines:
+            text = ''
+            while True:
+                text += line[:74] + "\r\n"
+                line = ' ' + line[74:]
+                if line == ' ':
+                    break
+            file_handle.write(text)
+
+def csv_write_join(tool, file_name):
+    # the way `ICalTool.csv_write` used to write files
+    with open(file_name, 'w') as file_handle:
+        properties = datatypes.VEVENT.csv_columns()
+        lines = ['"' + '","'.join(properties) + '"']
+        for component in tool.vcalendar._components:
+            columns = []
+            for name in properties:
+                columns.append(datatypes.VEVENT.delimiter.join(
+                    [prop.csv_write() for prop in component.get_all(name)]))
+            lines.append(','.join(columns))
+        file_handle.write("\r\n".join(lines))
+
+def measure(function, tool, file_name):
+    start = time.perf_counter()
+    function(tool, file_name)
+    duration = time.perf_counter() - start
+    size = os.path.getsize(file_name)
+    return '{:.2f}s {:.1f} MB/s'.format(duration, size / duration / 2**20)
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'benchmark.ics')
+        write_calendar(file_name, events=events)
+        tool = ICalTool()
+        tool.load(file_name)
+
+        output = os.path.join(directory, 'output')
+        print('events: {}'.format(events))
+        print('ics (list, concatenation): ' + measure(ical_write_list, tool,
+            output + '.ics'))
+        print('ics (streaming writer):    ' + measure(
+            lambda tool, name: tool.ical_write(name), tool, output + '.ics'))
+        print('csv (join):                ' + measure(csv_write_join, tool,
+            output + '.csv'))
+        print('csv (streaming writer):    ' + measure(
+            lambda tool, name: tool.csv_write(name), tool, output + '.csv'))
+
+if __name__ == '__main__':
+    main()
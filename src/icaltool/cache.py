@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+
+import gc
+import hashlib
+import logging
+import os
+import pickle
+
+from . import datatypes
+
+logger = logging.getLogger(__name__)
+
+# change whenever the classes in `datatypes` are pickled differently or
+# parsing results in a different tree
+FORMAT_VERSION = 4
+# an entry takes about as much space as the file it was parsed from (0.9 -
+# 1.1 times measured for files of 140 KiB - 80 MiB, small files take more
+# because of the time zone tables), files too large for the cache even at
+# this ratio are not even hashed and pickled
+ENTRY_RATIO = 0.9
+
+def default_directory():
+    # $ICALTOOL_CACHE_DIR or $XDG_CACHE_HOME/icaltool or ~/.cache/icaltool
+    directory = os.environ.get('ICALTOOL_CACHE_DIR')
+    if directory:
+        return directory
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'icaltool')
+
+def file_hash(file_name, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_name, 'rb') as file_handle:
+        while True:
+            block = file_handle.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+class ParseCache:
+    """
+    Cache of parsed calendars on disk so loading the same `.ics`-file again
+    only needs to unpickle a snapshot instead of parsing the file.
+
+    There is one entry per path, property schema (see `ICalTool.setup`) and
+    `lazy`. An entry is used if the size of the file did not change and
+    either the mtime or (if the file was only touched) the content hash
+    matches. If the entries take more than `max_size` bytes the least
+    recently used ones are removed.
+
+    Entries are pickles, only use a directory nobody else can write to.
+    """
+    def __init__(self, directory=None, max_size=1 << 30):
+        if directory is None:
+            directory = default_directory()
+        self.directory = directory
+        self.max_size = max_size
+
+    def load(self, file_name, lazy=False, schema=None):
+        """
+        Return the cached `datatypes.VCALENDAR` for `file_name` or `None`.
+        Properties which were unknown when the file was parsed are registered
+        in `schema` (default: `datatypes.default_schema`), just as if the
+        file had been parsed using it.
+        """
+        if schema is None:
+            schema = datatypes.default_schema
+        entry = self._entry_name(file_name, lazy, schema.as_dict())
+        try:
+            status = os.stat(file_name)
+            with open(entry, 'rb') as file_handle:
+                header = pickle.load(file_handle)
+                if not self._is_valid(header, file_name, status):
+                    logger.info('cache entry for {} is outdated'.format(
+                        file_name))
+                    return None
+                # the garbage collector would look at every new object
+                # again and again while unpickling
+                gc_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    vcalendar = pickle.load(file_handle)
+                finally:
+                    if gc_enabled:
+                        gc.enable()
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError,
+            TypeError, ValueError) as error:
+            logger.warning('could not read cache entry {} ({})'.format(
+                entry, error))
+            return None
+
+        schema.register(header['unknown_properties'])
+        # mark the entry as recently used
+        os.utime(entry)
+        logger.info('loaded {} from cache'.format(file_name))
+        return vcalendar
+
+    def store(self, file_name, vcalendar, unknown_properties, lazy=False,
+        schema=None):
+        """
+        Save `vcalendar` parsed from `file_name`, `unknown_properties` is a
+        list of tuples (class name, list of property names) registered while
+        parsing, `schema` the definitions before parsing (see
+        `datatypes.Schema.as_dict`). Entries larger than `max_size` are not
+        stored (and no other entry is removed for them).
+        """
+        status = os.stat(file_name)
+        if status.st_size * ENTRY_RATIO > self.max_size:
+            logger.info('not storing {} in cache, it is larger than the ' \
+                'cache'.format(file_name))
+            return
+        entry = self._entry_name(file_name, lazy, schema)
+        header = {
+            'version': FORMAT_VERSION,
+            'size': status.st_size,
+            'mtime': status.st_mtime_ns,
+            'hash': file_hash(file_name),
+            'unknown_properties': unknown_properties,
+        }
+        temporary = '{}.{}.tmp'.format(entry, os.getpid())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temporary, 'wb') as file_handle:
+                pickle.dump(header, file_handle, pickle.HIGHEST_PROTOCOL)
+                pickle.dump(vcalendar, file_handle, pickle.HIGHEST_PROTOCOL)
+                size = file_handle.tell()
+            if size > self.max_size:
+                os.remove(temporary)
+                logger.info('not storing {} in cache, its entry is larger ' \
+                    'than the cache'.format(file_name))
+                return
+            # replace the old entry at once so no one reads half an entry
+            os.replace(temporary, entry)
+        except OSError as error:
+            logger.warning('could not write cache entry {} ({})'.format(
+                entry, error))
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+        logger.info('stored {} in cache'.format(file_name))
+        self.evict()
+
+    def evict(self):
+        # remove the least recently used entries until all entries fit into
+        # `max_size`
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.pickle'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, path))
+            total += status.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            logger.info('removed {} from cache'.format(path))
+
+    def clear(self):
+        max_size = self.max_size
+        self.max_size = 0
+        try:
+            self.evict()
+        finally:
+            self.max_size = max_size
+
+    def _entry_name(self, file_name, lazy, schema):
+        # the schema is part of the name so changing it using
+        # `ICalTool.setup` results in a new entry
+        if schema is None:
+            schema = datatypes.default_schema.as_dict()
+        key = repr((FORMAT_VERSION, os.path.abspath(file_name), lazy,
+            sorted((name, sorted(properties.items()))
+                for name, properties in schema.items())))
+        return os.path.join(self.directory,
+            hashlib.sha256(key.encode('utf-8')).hexdigest() + '.pickle')
+
+    def _is_valid(self, header, file_name, status):
+        if not header.get('version') == FORMAT_VERSION or \
+            not header['size'] == status.st_size:
+            return False
+        if header['mtime'] == status.st_mtime_ns:
+            return True
+        # the file may have been touched or copied without being changed
+        return header['hash'] == file_hash(file_name)
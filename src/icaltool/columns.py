@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import logging
+
+try:
+    import numpy
+except ImportError:
+    # optional, needed for `ColumnStore` only
+    numpy = None
+
+from . import recurrence
+from . import rules
+
+logger = logging.getLogger(__name__)
+
+class Column:
+    """
+    All values of one property: `rows[i]` is the row of the component
+    `values[i]` belongs to (a component may have several values, e.g.
+    ATTENDEE, or none).
+
+    Dates are stored as seconds since the epoch (`int64`), everything else
+    is dictionary encoded: `values` holds codes (`int32`) into `dictionary`.
+    """
+    __slots__ = ('rows', 'values', 'dictionary')
+
+    def __init__(self, rows, values, dictionary=None):
+        self.rows = rows
+        self.values = values
+        # `None` for dates
+        self.dictionary = dictionary
+
+    def decoded(self):
+        # the values as list (strings or seconds since the epoch)
+        if self.dictionary is None:
+            return self.values.tolist()
+        return [self.dictionary[code] for code in self.values.tolist()]
+
+class ColumnStore:
+    """
+    Columnar copy of the properties of the top-level components of the
+    given types (`components`) of a `datatypes.VCALENDAR`, so rules can be
+    evaluated as vectorized masks instead of per component. Needs `numpy`.
+
+    Rows are numbered in the order of the components, `positions` maps a
+    row to the position of its component in `vcalendar._components`.
+    """
+    def __init__(self, vcalendar, components=('VEVENT', 'VTODO')):
+        if numpy is None:
+            logger.error('the column store needs numpy')
+            raise ImportError('numpy')
+        self.vcalendar = vcalendar
+        self.component_types = frozenset(components)
+        positions = []
+        names = []
+        # positions of the components not held by the store
+        self.other_positions = []
+        # property name -> (rows, values, all values are dates)
+        collected = {}
+        # rows of the components with RRULE or RDATE
+        recurring = []
+        for position, component in enumerate(vcalendar._components):
+            if not component.name in self.component_types:
+                self.other_positions.append(position)
+                continue
+            row = len(positions)
+            positions.append(position)
+            names.append(component.name)
+            if recurrence.is_recurring(component):
+                recurring.append(row)
+            for prop in component._properties:
+                try:
+                    entry = collected[prop.name]
+                except KeyError:
+                    entry = [[], [], True]
+                    collected[prop.name] = entry
+                value = prop.value
+                if entry[2] and not isinstance(value, int):
+                    # not parsed as `DateTime`
+                    entry[2] = False
+                entry[0].append(row)
+                entry[1].append(value)
+
+        self.positions = numpy.array(positions, dtype=numpy.int64)
+        self.names = _encode(names)
+        self.recurring = numpy.array(recurring, dtype=numpy.int64)
+        self.columns = {}
+        # properties with dates and other values mixed (checked one by one)
+        self.mixed = set()
+        for name, (rows, values, dates) in collected.items():
+            rows = numpy.array(rows, dtype=numpy.int64)
+            if dates:
+                self.columns[name] = Column(rows,
+                    numpy.array(values, dtype=numpy.int64))
+            elif all(isinstance(value, str) for value in values):
+                column = _encode(values)
+                self.columns[name] = Column(rows, column.values,
+                    column.dictionary)
+            else:
+                self.mixed.add(name)
+        logger.info('built column store with {} rows and {} columns'.format(
+            len(self), len(self.columns)))
+
+    def __len__(self):
+        return len(self.positions)
+
+    def mask(self, rule_filter):
+        """
+        Evaluate `rule_filter` (a `rules.Filter`) for every row, returns a
+        boolean array.
+        """
+        codes = [code for code, name in enumerate(self.names.dictionary)
+            if rule_filter.accepts_component(name)]
+        mask = numpy.isin(self.names.values, codes)
+        for name, rule in rule_filter.property_rules.items():
+            if not mask.any():
+                break
+            rule_mask = self._rule_mask(name, rule)
+            if rule_filter.occurrences and \
+                name in recurrence.DATE_PROPERTIES:
+                self._occurrence_mask(rule_mask, name, rule)
+            mask &= rule_mask
+        return mask
+
+    def equals(self, name, values):
+        """
+        Boolean array of the rows with a property `name` having one of
+        `values` (compared without the parameters of the property, like
+        `rules.TermList` with `'exact'`).
+        """
+        rule = rules.PropertyRule(name, [])
+        rule.terms.append(rules.TermList(values, True, 'exact'))
+        return self._rule_mask(name, rule)
+
+    def counts(self, name):
+        # value -> number of times it occurs in column `name`
+        column = self.columns[name]
+        if column.dictionary is None:
+            values, counts = numpy.unique(column.values, return_counts=True)
+            return dict(zip(values.tolist(), counts.tolist()))
+        counts = numpy.bincount(column.values,
+            minlength=len(column.dictionary))
+        return dict(zip(column.dictionary, counts.tolist()))
+
+    def components(self, mask):
+        # the components of the rows selected by `mask`
+        components = self.vcalendar._components
+        return [components[position]
+            for position in self.positions[mask].tolist()]
+
+    def matching_positions(self, rule_filter):
+        """
+        The positions (ascending) in `vcalendar._components` of all
+        components meeting `rule_filter`, components not held by the store
+        are checked one by one.
+        """
+        positions = self.positions[self.mask(rule_filter)].tolist()
+        components = self.vcalendar._components
+        others = [position for position in self.other_positions
+            if components[position].meets_criteria(rule_filter)]
+        if others:
+            positions = sorted(positions + others)
+        return positions
+
+    def keep(self, kept_positions):
+        """
+        Drop the rows of all components but the ones at `kept_positions`
+        (ascending) and number the positions as if only those components
+        were left, see `datatypes.VCALENDAR.filter`.
+        """
+        size = len(self.vcalendar._components)
+        new_positions = numpy.full(size, -1, dtype=numpy.int64)
+        new_positions[kept_positions] = numpy.arange(len(kept_positions))
+        others = new_positions[numpy.array(self.other_positions,
+            dtype=numpy.int64)]
+        self.other_positions = others[others > -1].tolist()
+        row_kept = new_positions[self.positions] > -1
+        new_rows = numpy.cumsum(row_kept) - 1
+        self.recurring = new_rows[self.recurring[row_kept[self.recurring]]]
+        self.positions = new_positions[self.positions[row_kept]]
+        self.names = Column(None, self.names.values[row_kept],
+            self.names.dictionary)
+        for column in self.columns.values():
+            kept = row_kept[column.rows]
+            column.rows = new_rows[column.rows[kept]]
+            column.values = column.values[kept]
+
+    def _rule_mask(self, name, rule):
+        mask = numpy.zeros(len(self), dtype=bool)
+        if name in self.mixed:
+            components = self.vcalendar._components
+            for row, position in enumerate(self.positions.tolist()):
+                for prop in components[position].get_all(name):
+                    if prop.meets_criteria(rule):
+                        mask[row] = True
+                        break
+            return mask
+        try:
+            column = self.columns[name]
+        except KeyError:
+            # no component has the property
+            return mask
+
+        # values satisfying every term
+        satisfied = numpy.ones(len(column.values), dtype=bool)
+        if column.dictionary is None:
+            for term in rule.terms:
+                satisfied &= _date_mask(term, column.values)
+        else:
+            # evaluate the terms once per distinct value
+            matching = [code for code, value in enumerate(column.dictionary)
+                if rule.matches(value)]
+            satisfied = numpy.isin(column.values, matching)
+        mask[column.rows[satisfied]] = True
+        return mask
+
+    def _occurrence_mask(self, mask, name, rule):
+        # recurring components match if any of their occurrences does, see
+        # `recurrence.Recurrence.matches`
+        components = self.vcalendar._components
+        for row in self.recurring.tolist():
+            component = components[self.positions[row]]
+            if name in component._property_index:
+                mask[row] = component.recurrence().matches(name, rule)
+
+def _date_mask(term, values):
+    if not isinstance(term, rules.Term):
+        return numpy.full(len(values), term.matches_date(0), dtype=bool)
+    start, end = term.date_range()
+    inside = (values >= start) & (values < end)
+    return inside if term.include else ~inside
+
+def _encode(values):
+    # dictionary encode a list of strings
+    dictionary = {}
+    codes = [dictionary.setdefault(value, len(dictionary)) for value in values]
+    return Column(None, numpy.array(codes, dtype=numpy.int32),
+        list(dictionary))
@@ -1,12 +1,46 @@
 #!/usr/bin/env python3
 
 import time
-import re
+import contextlib
+import contextvars
+import datetime
+import functools
 import logging
+import sys
+import threading
+
+from . import columns
+from . import index
+from . import recurrence
+from . import rules
+from . import timezones
+from . import view
+from . import writer
 
 logger = logging.getLogger(__name__)
 
+# `stats.Stats` counting parsed / dropped components and properties, set by
+# `ICalTool` (see `counting`) while statistics are enabled, every thread /
+# task sees its own
+_stats = contextvars.ContextVar('stats', default=None)
+
+def current_stats():
+    # the `stats.Stats` counting in this thread / task or `None`
+    return _stats.get()
+
+@contextlib.contextmanager
+def counting(stats):
+    # count using `stats` (`stats.Stats` or `None`) in this thread / task
+    # until the block ends
+    token = _stats.set(stats)
+    try:
+        yield
+    finally:
+        _stats.reset(token)
+
 class Component:
+    __slots__ = ('_components', '_properties', '_property_index',
+        '_recurrence')
     name = 'COMPONENT'
     defined_properties = {}
     delimiter = '@@'
@@ -14,10 +48,40 @@ class Component:
     def __init__(self):
         self._components = []
         self._properties = []
+        # property name -> list of properties with that name (in order)
+        self._property_index = {}
+        # `recurrence.Recurrence`, see `recurrence()`
+        self._recurrence = None
+
+    def __getstate__(self):
+        # used by `pickle`, the index of the properties is rebuilt
+        return (self._components, self._properties)
 
-    def csv_parse(self, component, rows, column_mapping):
+    def __setstate__(self, state):
+        self.__init__()
+        self._components = state[0]
+        for property_object in state[1]:
+            self.add_property(property_object)
+
+    def csv_parse(self, component, rows, column_mapping, schema=None):
+        # `schema` (default: `default_schema`) defines the properties and
+        # gets the unknown ones
+        for current_component in self.csv_iter(component, rows,
+            column_mapping, schema):
+            self._components.append(current_component)
+
+    def csv_iter(self, component, rows, column_mapping, schema=None):
+        # like `csv_parse` but yields every component as soon as its row is
+        # parsed instead of storing it
+        stats = current_stats()
+        if schema is None:
+            schema = default_schema
+        component_class = component_class_for(component)
+        table = schema.table(component_class, 'csv_parse')
+        # `.csv`-files have no VTIMEZONEs, only zoneinfo is asked
+        zones = timezones.Zones()
         for row in rows:
-            current_component = globals()[component]()
+            current_component = component_class()
             try:
                 for property_name, column_index in column_mapping.items():
                     values = row[column_index]
@@ -25,57 +89,119 @@ class Component:
                         # split multiple values by delimiter and create a
                         # property instance per value
                         current_component._parse_property(
-                            property_name, value, 'csv_parse')
-                self._components.append(current_component)
+                            property_name, value, table, zones)
+                if not stats is None:
+                    stats.count('components_parsed')
+                yield current_component
             except ValueError:
                 # there is no required property, which can have multiple values
                 # https://upload.wikimedia.org/wikipedia/commons/c/c0/ICalendarSpecification.png
                 logger.warning(
                     'dropped row due to missing or malformed required value')
+                if not stats is None:
+                    stats.count('components_dropped')
+
+    def ical_parse(self, lines, lazy=False, schema=None, zones=None):
+        # with `lazy` the values of properties are kept as they are and only
+        # parsed once they are needed (see `Property.ical_parse_lazy`),
+        # `schema` (default: `default_schema`) defines the properties and
+        # gets the unknown ones, `zones` (default: new
+        # `timezones.Zones`) resolves the TZIDs and gets the VTIMEZONEs
+        for current_component in self.ical_iter(lines, lazy, schema, zones):
+            self._components.append(current_component)
 
-    def ical_parse(self, lines):
-        current_component = None
-        logger.debug('begin parsing {}'.format(self.name))
+    def ical_iter(self, lines, lazy=False, schema=None, zones=None):
+        # like `ical_parse` but yields every direct child component as soon as
+        # its "END:" line is reached instead of storing it, so `lines` may be
+        # a generator and only one child component is held in memory
+        #
+        # times using a VTIMEZONE found later are converted using it, too,
+        # unless their value was asked for before (e.g. by a filter of
+        # the yielded components)
+        #
+        # every line is handled once: it begins a component, ends the
+        # innermost open component or is a property of it, components of
+        # unknown types (e.g. "BEGIN:X-CUSTOM") are skipped up to their
+        # "END:"
+        stats = current_stats()
+        if schema is None:
+            schema = default_schema
+        if zones is None:
+            zones = timezones.Zones()
+        function_name = 'ical_parse_lazy' if lazy else 'ical_parse'
+        # the open components, `self` at the bottom
+        stack = [self]
+        # the parse table (see `Schema.table`) of the component at the same
+        # position in `stack`
+        tables = [schema.table(self.__class__, function_name)]
+        # whether the component at the same position in `stack` is dropped
+        # (a required property is missing / not parseable)
+        dropped = [False]
+        # the name of the unknown component skipped and how many components
+        # of the same name it contains which are open
+        skipped = None
+        nested = 0
+        # log lazily, this runs for every component
+        logger.debug('begin parsing %s', self.name)
         for line in lines:
-            if current_component:
-                # the line belongs to the current_component so:
-                # 1. it may end it
-                if line[:4] == "END:" and line[4:] == current_component.name:
-                    if not drop_current_component:
-                        current_component.ical_parse(recorded)
-                        self._components.append(current_component)
+            if not skipped is None:
+                if line[6:] == skipped and line[:6] == 'BEGIN:':
+                    nested += 1
+                elif line[4:] == skipped and line[:4] == 'END:':
+                    if nested == 0:
+                        skipped = None
                     else:
-                        logger.warning('dropped {} due to an error.'.format(
-                            current_component.name))
-                    logger.debug('finished recording {}'.format(
-                        current_component.name))
-                    current_component = None
-                # 2. belong to the current_component
+                        nested -= 1
+                continue
+            if line[:6] == 'BEGIN:':
+                try:
+                    component_class = component_class_for(line[6:])
+                except KeyError:
+                    logger.warning('skipping unknown component "{}"'.format(
+                        line[6:]))
+                    if not stats is None:
+                        stats.count('components_dropped')
+                    skipped = line[6:]
+                    continue
+                # create an instance for the component
+                current_component = component_class()
+                stack.append(current_component)
+                tables.append(schema.table(current_component.__class__,
+                    function_name))
+                dropped.append(False)
+                logger.debug('begin parsing %s', current_component.name)
+            elif line[:4] == 'END:' and _unwind(line[4:], stack, tables,
+                dropped):
+                finished_component = stack.pop()
+                tables.pop()
+                if dropped.pop():
+                    logger.warning('dropped {} due to an error.'.format(
+                        finished_component.name))
+                    if not stats is None:
+                        stats.count('components_dropped')
+                    continue
+                logger.debug('finished parsing %s', finished_component.name)
+                if not stats is None:
+                    stats.count('components_parsed')
+                if finished_component.name == 'VTIMEZONE':
+                    # for all times of the calendar
+                    zones.define(finished_component)
+                if len(stack) == 1:
+                    yield finished_component
                 else:
-                    recorded.append(line)
+                    stack[-1]._components.append(finished_component)
             else:
-                # the line does not yet belong to a component other than the
-                # calling container so it may
-                # 1. begin a new component
-                if line[:6] == 'BEGIN:':
-                    # create an instance for the component
-                    current_component = globals()[line[6:]]()
-                    # and start recording lines
-                    recorded = []
-                    drop_current_component = False
-                    logger.debug('recording new {}'.format(
-                        current_component.name))
-                # 2. be a property of the calling component
-                else:
-                    try:
-                        self._ical_parse_line(line)
-                    except ValueError:
-                        # required property missing / not parseable
-                        drop_current_component = True
+                try:
+                    stack[-1]._ical_parse_line(line, tables[-1], zones)
+                except ValueError:
+                    # required property missing / not parseable, `self` is
+                    # kept anyway
+                    dropped[-1] = True
 
-        logger.debug('finished parsing {}'.format(self.name))
+        _unwind(None, stack, tables, dropped)
+        logger.debug('finished parsing %s', self.name)
 
-    def _ical_parse_line(self, line):
+    def _ical_parse_line(self, line, table, zones=None):
         # split line:
         # NAME:VALUE                  -> [0] NAME     [1] VALUE
         # NAME;PARAM=PARAMVALUE:VALUE -> [0] NAME     [1] PARAM=PARAMVALUE:VALUE
@@ -91,24 +217,24 @@ class Component:
 
         if name == '':
             logger.warning('ignoring malformatted line "{}"'.format(line))
+            stats = current_stats()
+            if not stats is None:
+                stats.count('properties_dropped')
+            return
 
-        self._parse_property(name, content, "ical_parse")
+        self._parse_property(name, content, table, zones)
 
-    def _parse_property(self, name, content, function_name):
-        # the property may be:
-        try:
-            # 1. known (there is an entry in self.__class__.defined_properties)
-            required, property_class = self.__class__.defined_properties[name]
-        except KeyError:
-            # 2. unknown
-            if not name == '':
-                # add the property to the list using "accept" and `Property`
-                required = 0
-                property_class = 'Property'
-                self.__class__.defined_properties[name] = [required,
-                    property_class]
-                logger.warning('unknown property "{}" added to {}'.format(
-                    name, self.name))
+    def _parse_property(self, name, content, table, zones=None):
+        # `table` (see `Schema.table`) tells how to handle the property,
+        # `zones` (`timezones.Zones`, default: `timezones.default_zones`)
+        # resolves TZIDs
+        stats = current_stats()
+        entry = table[name]
+        if not stats is None and not entry[3] is name:
+            # the property references the name from the entry instead
+            stats.count('strings_shared')
+            stats.count('bytes_saved_by_sharing', sys.getsizeof(name))
+        required, property_class, function, name, shared, dated = entry
 
         if content == '':
             if required == 1:
@@ -121,14 +247,19 @@ class Component:
         if not required == -1:
             # property is required or accepted
             try:
-                property_object = globals()[property_class](name)
-                function = getattr(property_object, function_name)
-                function(content)
+                property_object = property_class(name)
+                function(property_object, content)
+                if dated:
+                    property_object.use_zones(zones)
+                if shared:
+                    property_object.value = share(property_object.value)
             except ValueError:
                 if required == 1:
                     logger.warning(
                         'required property "{}" not parseable ("{}")'.format(
                             name, content))
+                    if not stats is None:
+                        stats.count('properties_dropped')
                     raise ValueError
                 else:
                     # ignore the property
@@ -140,125 +271,283 @@ class Component:
              property_object = None
 
         if not property_object is None:
-            self._properties.append(property_object)
+            self.add_property(property_object)
+            if not stats is None:
+                stats.count('properties_parsed')
+        elif not stats is None:
+            stats.count('properties_dropped')
 
-    def csv_write(self, component):
-        if not self.__class__.name == component:
+    def add_property(self, property_object):
+        self._properties.append(property_object)
+        try:
+            self._property_index[property_object.name].append(property_object)
+        except KeyError:
+            self._property_index[property_object.name] = [property_object]
+
+    def get(self, name, default=None):
+        # the first property called `name`
+        try:
+            return self._property_index[name][0]
+        except KeyError:
+            return default
+
+    def recurrence(self):
+        # the occurrences of the component (created once, the component is
+        # expected not to change afterwards)
+        if self._recurrence is None:
+            self._recurrence = recurrence.Recurrence(self)
+        return self._recurrence
+
+    def get_all(self, name):
+        # all properties called `name` in the order they were parsed
+        return list(self._property_index.get(name, ()))
+
+    def csv_write(self, component, properties=None, schema=None):
+        # `properties` fixes the columns to write, defaults to all
+        # properties currently defined for the component by `schema`
+        # (default: `default_schema`)
+        row = self.csv_row(component, properties, schema)
+        if row is None:
             return ''
-        columns = []
-        for def_prop, attributes in self.__class__.defined_properties.items():
-            if attributes[0] == 2:
+        return writer.csv_format_row(row)
+
+    def csv_row(self, component, properties=None, schema=None):
+        # the values of the columns (`None` if the component has no such
+        # property) or `None` if this is not a `component`, see `csv_write`
+        if not self.__class__.name == component:
+            return None
+        if properties is None:
+            properties = self.csv_columns(schema)
+        row = []
+        for def_prop in properties:
+            try:
+                props = self._property_index[def_prop]
+            except KeyError:
+                row.append(None)
                 continue
-            values = ''
-            for prop in self._properties:
-                if prop.name == def_prop:
-                    # see if the component entity has this property
-                    if values == '':
-                        values = prop.csv_write()
-                    else:
-                        # in case of multiple allowed values try to append to
-                        # an existing value
-                        values += self.__class__.delimiter + prop.csv_write()
-            columns.append(values)
-        return ','.join(columns)
+            # in case of multiple allowed values join them using the delimiter
+            row.append(self.__class__.delimiter.join(
+                [prop.csv_value() for prop in props]))
+        return row
+
+    @classmethod
+    def csv_columns(cls, schema=None):
+        # names of the properties that make up the columns of a `.csv`-file
+        if schema is None:
+            schema = default_schema
+        return schema.csv_columns(cls)
 
     def ical_write(self):
+        return list(self.ical_lines())
+
+    def ical_lines(self):
+        # generate the (unfolded) lines of the component and its children
+        yield from self.ical_write_head()
+        for component in self._components:
+            yield from component.ical_lines()
+        yield from self.ical_write_tail()
+
+    def ical_write_head(self):
+        # "BEGIN:" and the properties, i.e., everything before the first
+        # child component
         lines = []
         lines.append('BEGIN:{}'.format(self.name))
         for prop in self._properties:
             lines.append(prop.ical_write())
-        for component in self._components:
-            lines.extend(component.ical_write())
-        lines.append('END:{}'.format(self.name))
         return lines
 
-    def filter(self, components, components_keep, property_rules):
-        logger.info('filtering component {}'.format(self.name))
+    def ical_write_tail(self):
+        return ['END:{}'.format(self.name)]
+
+    def filter(self, rule_filter):
+        # `rule_filter` is a `rules.Filter`
+        stats = current_stats()
+        logger.info('filtering component %s', self.name)
         keep = []
-        for i, component in enumerate(self._components):
-            if not component.meets_criteria(components, components_keep,
-                property_rules):
-                logger.debug('component {} does not meet criteria'.format(
-                    component.name))
+        for component in self._components:
+            if not component.meets_criteria(rule_filter):
+                logger.debug('component %s does not meet criteria',
+                    component.name)
             else:
-                logger.debug('keeping component {}'.format(component.name))
+                logger.debug('keeping component %s', component.name)
                 keep.append(component)
-                component.filter(components, components_keep, property_rules)
-        logger.info('finished filtering component {}'.format(self.name))
-        logger.info('{} had {} components before filters were applied'.format(
-            self.name, len(self._components)))
+                component.filter(rule_filter)
+        if not stats is None:
+            stats.count('components_kept', len(keep))
+            stats.count('components_removed', len(self._components) -
+                len(keep))
+        logger.info('finished filtering component %s', self.name)
+        logger.info('%s had %s components before filters were applied',
+            self.name, len(self._components))
         self._components = keep
-        logger.info('{} has {} components after filters were applied'.format(
-            self.name, len(self._components)))
+        logger.info('%s has %s components after filters were applied',
+            self.name, len(self._components))
 
-    def meets_criteria(self, components, components_keep, property_rules):
-        component_in = self.name in components
-        if component_in and not components_keep:
-            logger.debug('{} not in list of components to keep'.format(
-                self.name))
-            return False
-        elif not component_in and components_keep:
-            logger.debug('{} in list of components to remove'.format(
-                self.name))
+    def select(self, rule_filter):
+        """
+        Like `filter` but instead of removing the components not meeting the
+        criteria return a `view.View` of the kept ones, so the same
+        component can be filtered in several ways.
+        """
+        stats = current_stats()
+        positions = []
+        children = {}
+        for position, component in enumerate(self._components):
+            if component.meets_criteria(rule_filter):
+                positions.append(position)
+                if component._components:
+                    children[position] = component.select(rule_filter)
+        if not stats is None:
+            stats.count('components_selected', len(positions))
+        return view.View(self, positions, children)
+
+    def meets_criteria(self, rule_filter):
+        if not rule_filter.accepts_component(self.name):
+            logger.debug('%s filtered out by component rule', self.name)
             return False
 
         # filter by properties
 
-        property_list = {}
-        applicable_rules = 0
-        # build a dictionary of properties
-        for i, prop in enumerate(self._properties):
-            # the key will be the property name and the value a list of indices
-            # in self._properties
-            if prop.name in property_rules.keys():
-                # there is a rule for this property
-                try:
-                    # append the index to the list
-                    property_list[prop.name].append(i)
-                except KeyError:
-                    # it's the first property with this name
-                    property_list[prop.name] = [i]
-                    applicable_rules += 1
-
-        if applicable_rules < len(property_rules):
-            # not all rules
-            logger.debug('{} has {} missing properties'.format(
-                self.name, len(property_rules) - applicable_rules))
-            return False
-
-        for property_type, property_indices in property_list.items():
+        for property_type, rule in rule_filter.property_rules.items():
+            try:
+                properties = self._property_index[property_type]
+            except KeyError:
+                # not all rules can be applied
+                logger.debug('%s has no property %s', self.name,
+                    property_type)
+                return False
+            if rule_filter.occurrences and \
+                property_type in recurrence.DATE_PROPERTIES and \
+                recurrence.is_recurring(self):
+                if not self.recurrence().matches(property_type, rule):
+                    logger.debug('no occurrence of %s meets the criteria',
+                        self.name)
+                    return False
+                continue
             ok = False
-            for index in property_indices:
-                if self._properties[index].meets_criteria(
-                    property_rules[property_type]):
+            for prop in properties:
+                if prop.meets_criteria(rule):
                     ok = True
+                    break
             if not ok:
                 # none of the properties of this type satisfy the rule
-                logger.debug('{} of {} does not meet the criteria'.format(
-                    property_type, self.name))
+                logger.debug('%s of %s does not meet the criteria',
+                    property_type, self.name)
                 return False
         return True
 
 class StandardComponent(Component):
-    def meets_criteria(self, components, components_keep, property_rules):
+    __slots__ = ()
+
+    def meets_criteria(self, rule_filter):
         # always keep this component
         return True
 
 class VCALENDAR(StandardComponent):
+    __slots__ = ('time_index', 'column_store')
     name = 'VCALENDAR'
     defined_properties = {
         'PRODID': [0, 'Property'],
         'VERSION': [0, 'Property']}
 
-    def csv_write(self, component):
+    def __init__(self):
+        super().__init__()
+        # `index.TimeIndex` over the components, see `build_time_index`
+        self.time_index = None
+        # `columns.ColumnStore` of the components, see `build_column_store`
+        self.column_store = None
+
+    def build_time_index(self):
+        self.time_index = index.TimeIndex(self._components)
+        return self.time_index
+
+    def build_column_store(self, components=('VEVENT', 'VTODO')):
+        # raises an `ImportError` without numpy
+        self.column_store = columns.ColumnStore(self, components)
+        return self.column_store
+
+    def overlapping(self, start, end):
+        # components overlapping the window [start, end) (seconds since the
+        # epoch)
+        if self.time_index is None:
+            self.build_time_index()
+        return [self._components[position] for position in
+            self.time_index.overlapping(start, end)]
+
+    def filter(self, rule_filter):
+        stats = current_stats()
+        if self.time_index is None and self.column_store is None:
+            return super().filter(rule_filter)
+
+        logger.info('filtering component {} using the index'.format(
+            self.name))
+        kept_positions = self._indexed_positions(rule_filter)
+        keep = []
+        for position in kept_positions:
+            component = self._components[position]
+            keep.append(component)
+            component.filter(rule_filter)
+        logger.info('{} had {} components before filters were applied'.format(
+            self.name, len(self._components)))
+        if not stats is None:
+            stats.count('components_kept', len(keep))
+            stats.count('components_removed', len(self._components) -
+                len(keep))
+        if not self.column_store is None:
+            self.column_store.keep(kept_positions)
+        self._components = keep
+        if not self.time_index is None:
+            self.time_index.select(kept_positions)
+        logger.info('{} has {} components after filters were applied'.format(
+            self.name, len(self._components)))
+
+    def select(self, rule_filter):
+        stats = current_stats()
+        if self.time_index is None and self.column_store is None:
+            return super().select(rule_filter)
+
+        positions = self._indexed_positions(rule_filter)
+        children = {}
+        for position in positions:
+            component = self._components[position]
+            if component._components:
+                children[position] = component.select(rule_filter)
+        if not stats is None:
+            stats.count('components_selected', len(positions))
+        return view.View(self, positions, children)
+
+    def _indexed_positions(self, rule_filter):
+        # positions of the components meeting the criteria, the column store
+        # evaluates all rules at once, the index resolves date rules and
+        # only the remaining rules are checked for the candidates it returns
+        if not self.column_store is None:
+            return self.column_store.matching_positions(rule_filter)
+        positions, names = self.time_index.resolve(rule_filter)
+        if positions is None:
+            candidates = range(len(self._components))
+        else:
+            for position, component in enumerate(self._components):
+                # standard components are kept regardless of their properties
+                if isinstance(component, StandardComponent):
+                    positions.add(position)
+            candidates = sorted(positions)
+        remaining_filter = rules.Filter(rule_filter.components,
+            rule_filter.components_keep,
+            {name: rule for name, rule in rule_filter.property_rules.items()
+                if not name in names}, rule_filter.occurrences)
+        return [position for position in candidates
+            if self._components[position].meets_criteria(remaining_filter)]
+
+    def csv_write(self, component, properties=None, schema=None):
         lines = []
         for entity in self._components:
-            line = entity.csv_write(component)
+            line = entity.csv_write(component, properties, schema)
             if not line == '':
                 lines.append(line)
         return lines
 
 class VEVENT(Component):
+    __slots__ = ()
     name = 'VEVENT'
     defined_properties = {
         # handle (0: accept, 1: require, -1: ignore), target class
@@ -294,6 +583,7 @@ class VEVENT(Component):
         'X-WR-ALARMUID': [-1, 'Property']}
 
 class VTODO(Component):
+    __slots__ = ()
     name = 'VTODO'
     defined_properties = {
         'CREATED': [1, 'DateTime'],
@@ -303,19 +593,23 @@ class VTODO(Component):
         'SUMMARY': [0, 'Property']}
 
 class VJOURNAL(Component):
+    __slots__ = ()
     name = 'VJOURNAL'
     defined_properties = {}
 
 class VFREEBUSY(Component):
+    __slots__ = ()
     name = 'VFREEBUSY'
     defined_properties = {}
 
 class VTIMEZONE(StandardComponent):
+    __slots__ = ()
     name = 'VTIMEZONE'
     defined_properties = {
         'TZID': [0, 'Property']}
 
 class VALARM(Component):
+    __slots__ = ()
     name = 'VALARM'
     defined_properties = {
         'ACTION': [0, 'Property'],
@@ -329,6 +623,7 @@ class VALARM(Component):
         'X-APPLE-DEFAULT-ALARM': [-1, 'Property']}
 
 class STANDARD(StandardComponent):
+    __slots__ = ()
     name = 'STANDARD'
     defined_properties = {
         'TZOFFSETFROM': [0, 'Property'],
@@ -338,6 +633,7 @@ class STANDARD(StandardComponent):
         'RRULE': [0, 'Property']}
 
 class DAYLIGHT(StandardComponent):
+    __slots__ = ()
     name = 'DAYLIGHT'
     defined_properties = {
         'TZOFFSETFROM': [0, 'Property'],
@@ -346,11 +642,261 @@ class DAYLIGHT(StandardComponent):
         'DTSTART': [0, 'DateTime'],
         'RRULE': [0, 'Property']}
 
+def _unwind(name, stack, *parallel_lists):
+    # whether `name` is the name of an open component in `stack` (see
+    # `Component.ical_iter`), components opened after it lack their "END:"
+    # and are dropped (with `None` all open components are dropped) from
+    # `stack` and the `parallel_lists`
+    stats = current_stats()
+    position = len(stack) - 1
+    while position > 0 and not stack[position].name == name:
+        position -= 1
+    if position == 0 and not name is None:
+        # not the end of an open component, e.g. a property named "END"
+        return False
+    for component in stack[position + 1:]:
+        logger.warning('dropped {} as it does not end.'.format(
+            component.name))
+        if not stats is None:
+            stats.count('components_dropped')
+    del stack[position + 1:]
+    for values in parallel_lists:
+        del values[position + 1:]
+    return position > 0
+
+def component_classes():
+    # `Component` and all classes derived from it
+    classes = []
+    pending = [Component]
+    while pending:
+        class_object = pending.pop()
+        classes.append(class_object)
+        pending.extend(class_object.__subclasses__())
+    return classes
+
+# class name -> component class, see `component_class_for`
+component_types = {}
+
+def component_class_for(name):
+    # the class for the component called `name`, raises a `KeyError` if
+    # there is none
+    try:
+        return component_types[name]
+    except KeyError:
+        pass
+    class_object = globals().get(name)
+    if not isinstance(class_object, type) or \
+        not issubclass(class_object, Component):
+        raise KeyError(name)
+    return class_object
+
+class Schema:
+    """
+    The properties defined for every component class: a copy of their
+    `defined_properties`, changed by `definitions` (see `ICalTool.setup`).
+
+    Parsing looks properties up in tables compiled from the schema (see
+    `table`) and adds unknown properties to the schema instead of the
+    classes, so every `ICalTool` (or every single parse) can use a schema of
+    its own. A schema can be shared by threads parsing at the same time.
+    """
+    def __init__(self, definitions=None):
+        # class name -> {property name: [required, property class name]}
+        self.definitions = {}
+        for class_object in component_classes():
+            self.definitions[class_object.__name__] = dict(
+                class_object.defined_properties)
+        if not definitions is None:
+            for class_name, properties in definitions.items():
+                self.definitions.setdefault(class_name, {}).update(
+                    properties)
+        # (class, function name) -> `ParseTable`
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def define(self, class_name, name, values):
+        # define (or redefine) property `name` of `class_name` as `values`
+        # ([required, property class name])
+        with self._lock:
+            self.definitions.setdefault(class_name, {})[name] = values
+            # compiled again when needed
+            self._tables = {}
+
+    def as_dict(self):
+        # a copy of the definitions, e.g. to pass the schema to another
+        # process
+        with self._lock:
+            return {class_name: dict(properties)
+                for class_name, properties in self.definitions.items()}
+
+    def new_properties(self, definitions):
+        # (class name, property names) of all properties defined since
+        # `definitions` (see `as_dict`) were taken, e.g. unknown properties
+        # found by parsing
+        properties = []
+        for class_name, defined in self.as_dict().items():
+            known = definitions.get(class_name, ())
+            names = [name for name in defined if not name in known]
+            if names:
+                properties.append((class_name, names))
+        return properties
+
+    def register(self, properties):
+        # define properties (see `new_properties`) found while parsing
+        # somewhere else (another process, a cached calendar) as if they had
+        # been found using this schema
+        stats = current_stats()
+        for class_name, names in properties:
+            for name in names:
+                with self._lock:
+                    defined = self.definitions.setdefault(class_name, {})
+                    if name in defined:
+                        continue
+                    defined[name] = [0, 'Property']
+                if not stats is None:
+                    stats.count_unknown_property(class_name, name)
+
+    def date_properties(self):
+        # names of the properties defined as `DateTime` by any class
+        with self._lock:
+            return frozenset(name for properties in self.definitions.values()
+                for name, attributes in properties.items()
+                if attributes[1] == 'DateTime')
+
+    def csv_columns(self, component):
+        # names of the properties of `component` (class or class name) that
+        # make up the columns of a `.csv`-file
+        if not isinstance(component, str):
+            component = component.__name__
+        with self._lock:
+            defined = list(self.definitions.get(component, {}).items())
+        return [name for name, attributes in defined if not attributes[0] == 2]
+
+    def table(self, class_object, function_name):
+        """
+        The table mapping the name of every property of `class_object`
+        directly to (required, property class, unbound parse function
+        `function_name`, the name itself, whether the value is shared,
+        whether it is a `DateTime`) so
+        parsing does not need to look up classes and functions by name.
+        Unknown properties are added when they are looked up.
+        """
+        key = (class_object, function_name)
+        try:
+            return self._tables[key]
+        except KeyError:
+            pass
+        with self._lock:
+            table = self._tables.get(key)
+            if table is None:
+                table = ParseTable(self, class_object, function_name)
+                for name, (required, property_class) in \
+                    self._properties(class_object).items():
+                    try:
+                        property_class = globals()[property_class]
+                    except KeyError:
+                        # fails when the property is parsed
+                        continue
+                    table[name] = _table_entry(name, required,
+                        property_class, function_name)
+                self._tables[key] = table
+            return table
+
+    def _add(self, table, name):
+        # add property `name` to `table` (see `ParseTable.__missing__`), the
+        # property may be:
+        class_name = table.class_object.__name__
+        unknown = False
+        with self._lock:
+            defined = self._properties(table.class_object)
+            try:
+                # 1. known
+                required, property_class = defined[name]
+            except KeyError:
+                # 2. unknown
+                if name == '':
+                    return (-1, None, None, name, False, False)
+                # add the property to the schema using "accept" and
+                # `Property`
+                required = 0
+                property_class = 'Property'
+                defined[name] = [required, property_class]
+                unknown = True
+            entry = _table_entry(name, required, globals()[property_class],
+                table.function_name)
+            table[name] = entry
+        if unknown:
+            logger.warning('unknown property "{}" added to {}'.format(
+                name, table.class_object.name))
+            stats = current_stats()
+            if not stats is None:
+                stats.count_unknown_property(class_name, name)
+        return entry
+
+    def _properties(self, class_object):
+        # the definitions of `class_object`, call while holding the lock
+        try:
+            return self.definitions[class_object.__name__]
+        except KeyError:
+            # a class derived after the schema was created
+            return self.definitions.setdefault(class_object.__name__,
+                dict(class_object.defined_properties))
+
+class ParseTable(dict):
+    """
+    Property name -> entry, see `Schema.table`. Names without an entry are
+    added to the schema when they are looked up.
+    """
+    __slots__ = ('schema', 'class_object', 'function_name')
+
+    def __init__(self, schema, class_object, function_name):
+        super().__init__()
+        self.schema = schema
+        self.class_object = class_object
+        self.function_name = function_name
+
+    def __missing__(self, name):
+        return self.schema._add(self, name)
+
+def _table_entry(name, required, property_class, function_name):
+    # every parsed property references `name` from the entry instead of
+    # its own copy
+    return (required, property_class, getattr(property_class,
+        function_name), name, property_class is Property and
+        name in shared_properties, issubclass(property_class, DateTime))
+
+# properties with few distinct values (the value includes the parameters),
+# every property with the same value references the same string (see
+# `share`), change before parsing
+shared_properties = {'ACTION', 'CALSCALE', 'CATEGORIES', 'CLASS', 'METHOD',
+    'ORGANIZER', 'PRIORITY', 'PRODID', 'STATUS', 'TRANSP', 'TZNAME',
+    'TZOFFSETFROM', 'TZOFFSETTO', 'VERSION'}
+
+def share(value):
+    # the one string equal to `value` (using `sys.intern`), it is freed once
+    # no property references it anymore, so a long running process does not
+    # keep the values of every calendar it ever loaded
+    stats = current_stats()
+    shared = sys.intern(value)
+    if not stats is None and not shared is value:
+        stats.count('strings_shared')
+        stats.count('bytes_saved_by_sharing', sys.getsizeof(value))
+    return shared
+
 class Property:
+    __slots__ = ('name', 'value')
+
     def __init__(self, name):
         self.name = name
         self.value = None
 
+    def __getstate__(self):
+        # a tuple instead of a dict of slots keeps pickles small
+        return (self.name, self.value)
+
+    def __setstate__(self, state):
+        self.name, self.value = state
+
     def csv_parse(self, value):
         if value[0] == '"' and value[-1] == '"':
             # remove '"' around the value
@@ -360,6 +906,11 @@ class Property:
     def ical_parse(self, value):
         return self._parse(value)
 
+    def ical_parse_lazy(self, value):
+        # keep `value` (";PARAMS:VALUE") and parse it once it is needed, a
+        # plain property keeps its text anyway
+        return self.ical_parse(value)
+
     def _parse(self, value):
         self.value = value
         return self.value
@@ -368,7 +919,11 @@ class Property:
         return self.value
 
     def csv_write(self):
-        return '"{}"'.format(self._write()[1:])
+        return '"{}"'.format(self.csv_value())
+
+    def csv_value(self):
+        # the value as written to a `.csv`-file (without quotes)
+        return self._write()[1:]
 
     def ical_write(self):
         return self.name + self._write()
@@ -376,157 +931,290 @@ class Property:
     def _write(self):
         return self.value
 
-    def meets_criteria(self, rules):
-        for rule in rules:
-            in_property = rule[0] == '+'
-            search = rule[1:]
+    def meets_criteria(self, rule):
+        # `rule` is a `rules.PropertyRule`
+        return rule.matches(self.value)
 
-            if search[:3] == 're(' and search[-1] == ')':
-                logger.debug('applying regex "{}" to {} ("{}")'.format(
-                        search[3:-1], self.name, self.value))
-                is_in_property = re.match(search[3:-1], self.value) == True
-            else:
-                logger.debug('searching for "{}" in {} ("{}")'.format(
-                    search, self.name, self.value))
-                is_in_property = self.value.find(search) > -1
+class DateTime(Property):
+    # `value` holds the date / time as seconds since the epoch (UTC), local
+    # times with a TZID are kept as they were read and converted to UTC
+    # using the time zone of their calendar (see `timezones.Zones`) when
+    # `value` is asked for, dates and local times without TZID are treated
+    # as UTC
+    __slots__ = ('type', '_tzid', '_raw', '_zone', '_utc')
 
-            if not in_property and is_in_property:
-                logger.debug('{} includes "{}" but it may not'.format(
-                    self.name, search))
-                return False
-            if in_property and not is_in_property:
-                logger.debug('{} does not include "{}"'.format(
-                    self.name, search))
-                return False
-        return True
+    # the slot of `Property` holding the parsed value (the local time for
+    # local times with a TZID), `value` parses `_raw` first if the property
+    # was loaded lazily
+    _value = Property.value
 
-class DateTime(Property):
     def __init__(self, name):
-        super().__init__(name)
+        # None: not parsed yet (see `ical_parse_lazy`)
         # 0: invalid
         # 1: date
         # 2: datetime (local)
         # 3: datetime (UTC)
         self.type = 0
         self._tzid = None
+        # the text as read (";PARAMS:VALUE") if loaded lazily, written
+        # verbatim
+        self._raw = None
+        # the `timezones.Zone` of a local time with a TZID (see
+        # `use_zones`), the `timezones.Zones` to find it in while not parsed
+        # yet
+        self._zone = None
+        # (`timezones.OffsetTable` used, UTC) of a local time with a TZID,
+        # see `value`
+        self._utc = None
+        # last, setting `value` looks at the slots above
+        super().__init__(name)
+
+    def __getstate__(self):
+        # don't parse lazily loaded values just to pickle them
+        return (self.name, self._value, self.type, self._tzid, self._raw,
+            self._zone)
+
+    def __setstate__(self, state):
+        self.name, self._value, self.type, self._tzid, self._raw, \
+            self._zone = state
+        self._utc = None
+
+    @property
+    def value(self):
+        if self.type is None:
+            self._parse_raw()
+        zone = self._zone
+        if zone is None:
+            return self._value
+        # converted once, unless the time zone is defined again (see
+        # `timezones.Zones.define`)
+        utc = self._utc
+        if utc is None or not utc[0] is zone.table:
+            utc = (zone.table, zone.to_utc(self._value))
+            self._utc = utc
+        return utc[1]
+
+    @value.setter
+    def value(self, value):
+        if self.type is None:
+            # type, TZID and zone of the lazily loaded text stay
+            self._parse_raw()
+        if self.type == 2 and not self._zone is None and not value is None:
+            value = self._zone.from_utc(value)
+        self._value = value
+        self._utc = None
+        # the text read is not the value anymore
+        self._raw = None
 
     def ical_parse(self, value):
-        value = value[1:]
-        self.value = self._parse(value)
-        return self.value
+        self._raw = None
+        parsed = self._parse(value[1:])
+        if self.type > 1 and parsed % 60 == 59 and \
+            not value.rstrip('Z')[-2:] == '59':
+            # a leap second (taken as :59) is written as it was read
+            self._raw = value
+        return parsed
+
+    def ical_parse_lazy(self, value):
+        self._raw = value
+        self.type = None
+        return value
+
+    def use_zones(self, zones):
+        # resolve the TZID using `zones` (`timezones.Zones`, default:
+        # `timezones.default_zones`), called once parsed
+        if zones is None:
+            zones = timezones.default_zones
+        if self.type is None:
+            # see `_parse_raw`
+            self._zone = zones
+        elif self.type == 2 and not self._tzid is None:
+            self._zone = zones.zone(self._tzid)
+
+    def _parse_raw(self):
+        zones = self._zone
+        self._zone = None
+        try:
+            self._parse(self._raw[1:])
+        except ValueError:
+            # unlike `ical_parse` the property can't be dropped anymore
+            self._value = None
+            self.type = 0
+            return
+        self.use_zones(zones)
 
     def csv_parse(self, value):
-        self.value = self._parse(value)
-        return self.value
+        self._raw = None
+        return self._parse(value)
 
     def _parse(self, value):
-        self.type = None
+        self.type = -1
+        self._utc = None
         if value[:4] == 'TZID':
             # omit "0" following "TZID"
             tmp = value[5:].split(':', 1)
-            self._tzid = tmp[0]
+            self._tzid = share(tmp[0])
             value = tmp[1]
             del tmp
         elif value[:11] == 'VALUE=DATE:':
             value = value[11:]
 
-        self.value, self.type = self._guess_date_format(value)
-        return self.value
+        # local times with a TZID stay local, see `use_zones`
+        self._value, self.type = self._guess_date_format(value)
+        return self._value
 
-    def _guess_date_format(self, value):
-        length = len(value)
-        if length == 8:
-            format_string = '%Y%m%d'
-            date_type = 1
-        elif length == 15:
-            format_string = '%Y%m%dT%H%M%S'
-            date_type = 2
-        elif length == 16:
-            format_string = '%Y%m%dT%H%M%SZ'
-            date_type = 3
-        elif length == 4:
-            format_string = '%Y'
-            date_type = 4
-        elif length == 7:
-            format_string = '%Y-%m'
-            date_type = 4
-        elif length == 10:
-            format_string = '%Y-%m-%d'
-            date_type = 1
-        elif length == 17:
-            format_string = '%Y-%m-%dT%H%M%S'
-            date_type = 2
-        elif length == 19:
-            format_string = '%Y-%m-%dT%H:%M:%S'
-            date_type = 2
-        elif length == 18:
-            format_string = '%Y-%m-%dT%H%M%SZ'
-            date_type = 3
-        elif length == 20:
-            format_string = '%Y-%m-%dT%H:%M:%SZ'
-            date_type = 3
-        else:
-            format_string = ''
+    def get_value(self):
+        # the date / time as read (the local time for local times) as
+        # `time.struct_time` like `time.strptime` returns, see
+        # `get_utc_value`
+        if self.type is None:
+            self._parse_raw()
+        return time.struct_time(time.gmtime(self._value)[:8] + (-1,))
+
+    def get_utc_value(self):
+        # the date / time in UTC (local times converted using their TZID) as
+        # `time.struct_time`
+        return time.struct_time(time.gmtime(self.value)[:8] + (-1,))
 
+    def _guess_date_format(self, value):
         try:
-            date = time.strptime(value, format_string)
+            return parse_date(value)
         except ValueError:
             logger.warning('Could not guess date format for "{}"'.format(
                 value))
             raise ValueError
-        return (date, date_type)
 
     def _write(self):
-        datetime = ''
+        # untouched lazily loaded values are written as they were read
+        if not self._raw is None:
+            return self._raw
+        if self.type == 1:
+            # the default type of dates is DATE-TIME (RFC 5545 3.2.20)
+            return ';VALUE=DATE' + self._format()
+        return self._format()
+
+    def csv_value(self):
+        # `.csv`-files get the parsed value so they look the same with or
+        # without lazy loading
+        return self._format()[1:]
+
+    def _format(self):
+        if self.type is None:
+            self._parse_raw()
+        text = ''
         if not self._tzid is None:
-            datetime = ';TZID={}'.format(self._tzid)
+            text = ';TZID={}'.format(self._tzid)
         if self.type == 0:
             return ''
-        elif self.type == 1:
-            datetime += time.strftime(':%Y%m%d', self.value)
+        # local times are written as they were read
+        value = time.gmtime(self._value)
+        if self.type == 1:
+            text += time.strftime(':%Y%m%d', value)
         elif self.type == 2:
-            datetime += time.strftime(':%Y%m%dT%H%M%S', self.value)
+            text += time.strftime(':%Y%m%dT%H%M%S', value)
         else:
-            datetime += time.strftime(':%Y%m%dT%H%M%SZ', self.value)
-        return datetime
+            text += time.strftime(':%Y%m%dT%H%M%SZ', value)
+        return text
+
+    def meets_criteria(self, rule):
+        # `rule` is a `rules.PropertyRule`
+        value = self.value
+        if value is None:
+            return False
+        return rule.matches_date(value)
 
-    def meets_criteria(self, rules):
-        for rule in rules:
-            in_property = rule[0] == '+'
-            raw_rule = rule[1:]
+# days between 0001-01-01 and 1970-01-01
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
 
-            if raw_rule.find('to') > -1:
-                start, end = raw_rule.split('to')
+@functools.lru_cache(maxsize=4096)
+def parse_date(value):
+    """
+    Parse a date / date-time as used by RFC 5545 (`YYYYMMDD`,
+    `YYYYMMDDTHHMMSS`, `YYYYMMDDTHHMMSSZ`) or ISO 8601 (`YYYY`, `YYYY-MM`,
+    `YYYY-MM-DD`, `YYYY-MM-DDTHHMMSS[Z]`, `YYYY-MM-DDTHH:MM:SS[Z]`) into
+    a tuple (seconds since the epoch, type), see `DateTime` for the types.
+
+    Raises a `ValueError` if the value does not match any of the formats or
+    is out of range. Leap seconds (`:60`, `:61`) are taken as `:59`.
+    Results are cached as the same values (e.g. DTSTAMP)
+    tend to appear over and over again.
+    """
+    length = len(value)
+    month = 1
+    day = 1
+    time_of_day = None
+    if length == 8:
+        # YYYYMMDD
+        digits = value
+        month = value[4:6]
+        day = value[6:8]
+        date_type = 1
+    elif length == 15 or (length == 16 and value[15] == 'Z'):
+        # YYYYMMDDTHHMMSS[Z]
+        if not value[8] == 'T':
+            raise ValueError
+        digits = value[:8] + value[9:15]
+        month = value[4:6]
+        day = value[6:8]
+        time_of_day = (value[9:11], value[11:13], value[13:15])
+        date_type = 2 if length == 15 else 3
+    elif length == 4:
+        # YYYY
+        digits = value
+        date_type = 4
+    elif length == 7:
+        # YYYY-MM
+        if not value[4] == '-':
+            raise ValueError
+        digits = value[:4] + value[5:]
+        month = value[5:]
+        date_type = 4
+    elif length == 10 or length == 17 or length == 18 or length == 19 or \
+        length == 20:
+        # YYYY-MM-DD[...]
+        if not (value[4] == '-' and value[7] == '-'):
+            raise ValueError
+        digits = value[:4] + value[5:7] + value[8:10]
+        month = value[5:7]
+        day = value[8:10]
+        date_type = 1
+        if length > 10:
+            if not value[10] == 'T':
+                raise ValueError
+            if length == 17 or (length == 18 and value[17] == 'Z'):
+                # YYYY-MM-DDTHHMMSS[Z]
+                time_of_day = (value[11:13], value[13:15], value[15:17])
+                date_type = 2 if length == 17 else 3
+            elif (length == 19 or (length == 20 and value[19] == 'Z')) and \
+                value[13] == ':' and value[16] == ':':
+                # YYYY-MM-DDTHH:MM:SS[Z]
+                time_of_day = (value[11:13], value[14:16], value[17:19])
+                date_type = 2 if length == 19 else 3
             else:
-                start = raw_rule
-                end = raw_rule
-
-            if len(start) == 4:
-                start = '{}0101T000000'.format(start)
-            elif len(start) == 7:
-                start = '{}{}01T000000'.format(start[:4], start[5:])
-            elif len(start) == 10:
-                start = '{}{}{}T000000'.format(start[:4], start[5:7], start[8:])
-
-            if len(end) == 4:
-                end = '{}0101T000000'.format(str(int(end)+1))
-            elif len(end) == 7:
-                end = '{}{}01T000000'.format(end[:4], str(int(end[5:])+1))
-            elif len(end) == 10:
-                end = '{}{}{}T000000'.format(end[:4], end[5:7], str(int(end[8:])+1))
-
-            datetime_start = time.strptime(start, '%Y%m%dT%H%M%S')
-            datetime_end = time.strptime(end, '%Y%m%dT%H%M%S')
-
-            logger.debug('checking if {} <= {} < {}'.format(
-                start, time.strftime('%Y-%m-%d %H:%M:%S', self.value), end))
-            is_in_range = datetime_start <= self.value < datetime_end
-
-            if not in_property and is_in_range:
-                logger.debug('{} in exclusion range'.format(self.value))
-                return False
-            if in_property and not is_in_range:
-                logger.debug('{} not in inclusion range'.format(self.value))
-                return False
-        return True
+                raise ValueError
+            digits += ''.join(time_of_day)
+    else:
+        raise ValueError
+
+    if not (digits.isascii() and digits.isdigit()):
+        raise ValueError
+
+    # raises a ValueError if the date does not exist
+    seconds = (datetime.date(int(value[:4]), int(month), int(day)).toordinal()
+        - _EPOCH_ORDINAL) * 86400
+    if not time_of_day is None:
+        hour = int(time_of_day[0])
+        minute = int(time_of_day[1])
+        second = int(time_of_day[2])
+        # like `time.strptime` accept up to two leap seconds, they count as
+        # the last second of the minute (and not as the next minute)
+        if hour > 23 or minute > 59 or second > 61:
+            raise ValueError
+        seconds += hour * 3600 + minute * 60 + min(second, 59)
+    return (seconds, date_type)
+
+component_types.update((class_object.__name__, class_object)
+    for class_object in component_classes())
 
+# used when parsing without a schema of its own
+default_schema = Schema()
@@ -2,13 +2,23 @@
 import csv
 import logging
 import logging.config
-import re
 import argparse
+import asyncio
+import contextlib
 import json
 import sys
 
 from .log import log
+from . import cache as parse_cache
 from . import datatypes
+from . import merge
+from . import reader
+from . import sorting
+from . import sources as calendar_sources
+from . import writer
+from . import parallel
+from . import rules as filter_rules
+from . import stats as run_stats
 
 logger = logging.getLogger(__name__)
 
@@ -68,12 +78,39 @@ class ICalTool:
     Tool for handling calendar data (ical) as defined in:
     RFC 2445 (https://datatracker.ietf.org/doc/html/rfc2445)
     """
-    def __init__(self):
+    def __init__(self, stats=False, trace_memory=False, cache=None):
+        # `stats.Stats`, counts components / properties if `stats` is `True`
+        self.stats = run_stats.Stats(stats, trace_memory)
+        # `cache.ParseCache` used by `ical_load` (if not `None`)
+        self.cache = cache
+        # `datatypes.Schema` used for parsing, changed by `setup`
+        self.schema = datatypes.Schema()
+        # date rules (DTSTART / DTEND) given as string match any occurrence
+        # of recurring components, see `rules.Filter`
+        self.occurrences = False
+        # window (seconds since the epoch, start inclusive, end exclusive)
+        # `.csv`-files get a row per occurrence starting in, see
+        # `writer.CSVWriter`
+        self.expand = None
+        # property the components written are sorted by (if not `None`) and
+        # the bytes all sorted outputs may buffer together before writing
+        # sorted runs to temporary files, see `sorting.SortedWriter`
+        self.sort_by = None
+        self.sort_memory = sorting.MEMORY_LIMIT
         self._reset()
 
     def _reset(self):
         self.vcalendar = None
 
+    @contextlib.contextmanager
+    def _step(self, name, detail=''):
+        # measure a step and let the datatypes count while it runs (in this
+        # thread / task only, see `datatypes.counting`)
+        with self.stats.step(name, detail):
+            with datatypes.counting(self.stats if self.stats.enabled
+                else None):
+                yield
+
     def setup(self, options):
         # currently only understands
         # {
@@ -84,17 +121,16 @@ class ICalTool:
         #   },
         #   ...
         # }
+        # the changes only apply to this tool, see `self.schema`
         for key, value in options.items():
             if key in standard_components:
-                class_object = getattr(datatypes, key)
                 try:
                     for prop, values in value['defined_properties'].items():
                         if not len(values) == 2:
                             logger.warning('illegal value for property {} in ' +
                                 'defined_properties'.format(prop))
                             continue
-                        #setattr(class_object.defined_properties, prop, values)
-                        class_object.defined_properties[prop] = values
+                        self.schema.define(key, prop, values)
                 except KeyError:
                     logger.warning('did not unterstand option "{}"'.format(
                         key))
@@ -102,13 +138,13 @@ class ICalTool:
     def load(self, file_name, component='VEVENT',
         has_header=True, custom_column_names=custom_column_names,
         column_mapping=default_column_mapping,
-        delimiter=',', quotechar='"'):
+        delimiter=',', quotechar='"', jobs=1, lazy=False):
 
         if file_name[-3:] == 'csv':
             self.csv_load(file_name, component, has_header, custom_column_names,
                 column_mapping, delimiter, quotechar)
         elif file_name[-3:] == 'ics':
-            self.ical_load(file_name)
+            self.ical_load(file_name, jobs, lazy)
         else:
             logger.error('invalid file given ("{}")'.format(file_name))
             sys.exit()
@@ -118,22 +154,25 @@ class ICalTool:
         column_mapping=default_column_mapping,
         delimiter=',', quotechar='"'):
 
-        with open(file_name, 'r', newline='', encoding='utf-8-sig') as \
-            file_handle:
+        with self._step('load', file_name):
+            with open(file_name, 'r', newline='', encoding='utf-8-sig') as \
+                file_handle:
 
-            logger.info('opening {}'.format(file_name))
-            data = csv.reader(
-                file_handle, delimiter=delimiter, quotechar=quotechar)
+                logger.info('opening {}'.format(file_name))
+                data = csv.reader(
+                    file_handle, delimiter=delimiter, quotechar=quotechar)
 
-            if has_header:
-                header = next(data)
+                if has_header:
+                    header = next(data)
 
-            column_mapping = self._csv_get_column_mapping(
-                default_column_mapping, has_header, header, custom_column_names)
+                column_mapping = self._csv_get_column_mapping(
+                    default_column_mapping, has_header, header,
+                    custom_column_names)
 
-            self.vcalendar = datatypes.VCALENDAR()
-            self.vcalendar.csv_parse(component, data, column_mapping)
-            logger.info('loaded {}'.format(file_name))
+                self.vcalendar = datatypes.VCALENDAR()
+                self.vcalendar.csv_parse(component, data, column_mapping,
+                    self.schema)
+                logger.info('loaded {}'.format(file_name))
 
     def _csv_get_column_mapping(self, default_column_mapping, has_header,
         header, custom_column_names):
@@ -169,141 +208,362 @@ class ICalTool:
                     column_mapping[column_name]
         return new_mapping
 
-    def ical_load(self, file_name):
-        with open(file_name, 'r', newline='', encoding='utf-8-sig') as \
-            file_handle:
+    def ical_load(self, file_name, jobs=1, lazy=False):
+        # `jobs` > 1 parses the components using that many processes, with
+        # `lazy` values are only parsed when needed and written unchanged
+        with self._step('load', file_name):
+            definitions = None
+            if not self.cache is None:
+                definitions = self.schema.as_dict()
+                self.vcalendar = self.cache.load(file_name, lazy, self.schema)
+                if not self.vcalendar is None:
+                    if self.stats.enabled:
+                        self.stats.count('cache_hits')
+                    return
+                if self.stats.enabled:
+                    self.stats.count('cache_misses')
 
             logger.info('opening {}'.format(file_name))
-            raw = file_handle.readlines()
-            lines = []
-            vcalendar = False
-            # clean up
-            for line in raw:
-                # remove the trailing "\n"
-                line = line.rstrip("\r\n")
-                # do not use empty lines
-                if not line == '':
-                    if not vcalendar and line == 'BEGIN:VCALENDAR':
-                        vcalendar = True
-                        logger.debug('recording new VCALENDAR')
-                    elif vcalendar:
-                        if line == 'END:VCALENDAR':
-                            vcalendar = False
-                            logger.debug('finished recording VCALENDAR')
-                        # unfold lines (folded lines begin with a single whitespace
-                        # or tab)
-                        elif line[0] == ' ' or line[0] == "\t":
-                            # append to previous line
-                            lines[len(lines) - 1] += line[1:]
-                        else:
-                            lines.append(line)
+            lines = reader.ical_read_lines(file_name)
             self.vcalendar = datatypes.VCALENDAR()
-            self.vcalendar.ical_parse(lines)
+            if jobs > 1:
+                parallel.ical_parse(self.vcalendar, lines, jobs, lazy=lazy,
+                    schema=self.schema)
+            else:
+                self.vcalendar.ical_parse(lines, lazy, self.schema)
             logger.info('loaded {}'.format(file_name))
 
-    def write(self, file_name, component):
+            if not self.cache is None:
+                self.cache.store(file_name, self.vcalendar,
+                    self.schema.new_properties(definitions), lazy,
+                    definitions)
+
+    def load_merged(self, file_names, **options):
+        """
+        Load several files (see `load` for the `options`) and merge them
+        into one calendar, see `merge.merge`.
+        """
+        calendars = []
+        for file_name in file_names:
+            self.load(file_name, **options)
+            calendars.append(self.vcalendar)
+        self.vcalendar = merge.merge(calendars)
+
+    def dedupe(self):
+        """
+        Keep only the newest revision (by SEQUENCE, DTSTAMP, LAST-MODIFIED)
+        of components with the same UID and RECURRENCE-ID, see
+        `merge.dedupe`. Returns the number of duplicates dropped.
+        """
+        if self.vcalendar is None:
+            logger.warning('cannot remove duplicates before calendar data ' +
+                'has been loaded')
+            return 0
+        with self._step('dedupe'):
+            return merge.dedupe(self.vcalendar)
+
+    async def aload_many(self, sources, fetchers=None, concurrency=8,
+        executor=None, lazy=False):
+        """
+        Load many `.ics`-files or URLs concurrently and merge them into one
+        calendar (`self.vcalendar`), see `sources.aload_many` for the
+        arguments. Returns the list of sources that could not be loaded.
+
+        Other sources (or a stand-in for a server) can be used by passing
+        `fetchers`, see `sources.Fetcher`.
+        """
+        with self._step('load', '{} sources'.format(len(sources))):
+            self.vcalendar, failed = await calendar_sources.aload_many(
+                sources, fetchers, concurrency, executor, lazy, self.schema)
+        return failed
+
+    def load_many(self, sources, **options):
+        # `aload_many` for code not using asyncio
+        return asyncio.run(self.aload_many(sources, **options))
+
+    def write(self, file_name, component, source=None):
+        # `source` may be a `view.View` (see `select`) to write instead of
+        # the loaded calendar
         if file_name[-3:] == 'csv':
-            self.csv_write(file_name, component)
+            self.csv_write(file_name, component, source)
         elif file_name[-3:] == 'ics':
-            self.ical_write(file_name)
+            self.ical_write(file_name, source)
         else:
             logger.error('invalid file given ("{}")'.format(file_name))
             sys.exit()
 
-    def csv_write(self, file_name, component='VEVENT'):
-        lines = []
+    def csv_write(self, file_name, component='VEVENT', source=None):
         # can only write components of one type
-        with open(file_name, 'w') as file_handle:
-            logger.info('writing to {}'.format(file_name))
-
-            # get a list of known properties to use as column names
-            class_object = getattr(datatypes, component)
-            properties = []
-            for prop, attributes in class_object.defined_properties.items():
-                if attributes[0] == 2:
-                    continue
-                else:
-                    properties.append(prop)
-
-            # build header
-            lines.append('"' + '","'.join(properties) + '"')
-
-            # fill with data
-            lines.extend(self.vcalendar.csv_write(component))
-
-            file_handle.write("\r\n".join(lines))
-            logger.info('finished writing to {}'.format(file_name))
-
-    def ical_write(self, file_name):
-        with open(file_name, 'w') as file_handle:
-            logger.info('writing to {}'.format(file_name))
-            lines = self.vcalendar.ical_write()
-            for line in lines:
-                text = ''
-                while True:
-                    text += line[:74] + "\r\n"
-                    line = ' ' + line[74:]
-                    if line == ' ':
-                        break
-                file_handle.write(text)
-            logger.info('finished writing to {}'.format(file_name))
+        # get a list of known properties to use as column names
+        properties = self.schema.csv_columns(component)
+        with self._step('output', file_name):
+            csv_writer = self._sorted(writer.CSVWriter(file_name, component,
+                properties, self.expand))
+            try:
+                # fill with data
+                for entity in self._source_components(source):
+                    csv_writer.write(entity)
+            finally:
+                csv_writer.close()
+
+    def ical_write(self, file_name, source=None):
+        with self._step('output', file_name):
+            ical_writer = self._sorted(writer.ICalWriter(file_name,
+                self.vcalendar if source is None else source))
+            try:
+                for component in self._source_components(source):
+                    ical_writer.write(component)
+            finally:
+                ical_writer.close()
+
+    def _sorted(self, output, outputs=1):
+        # `output` sorting by `self.sort_by` (if set) using a share of
+        # `self.sort_memory` for each of `outputs` outputs
+        if self.sort_by is None:
+            return output
+        return sorting.SortedWriter(output, self.sort_by,
+            self.sort_memory // outputs)
+
+    def _source_components(self, source):
+        if source is None:
+            return self.vcalendar._components
+        return source.components()
 
     def filter(self, rules):
+        """
+        Apply `rules` to the loaded calendar, `rules` may be a rule string,
+        see `rules.compile_rules`, or an already compiled `rules.Filter`.
+        """
         if self.vcalendar is None:
             logger.warning('cannot apply rules before calendar data has been '+
                 'loaded')
             return
 
-        # example component rule:
-        #  - keep only events:
-        #    COMPONENT:+VEVENT
-        #  - filter out all events:
-        #    COMPONENT:-VEVENT
-        #  - filter out all events and alarms
-        #    COMPONENT:-VEVENT,VALARM
-        # example property rules:
-        #  - filter out all components with a start date between 2015 and 2017:
-        #    DTSTART:-2015to2017
-        #  - keep only components with a start date between 2015-10 and 2017-11:
-        #    DTSTART:+2015-10to2017-11
-        #  - ... attended by john.doe@mail.domain:
-        #    DTSTART:+2015-10to2017-11;ATTENDEE:+john.doe@mail.domain
-        #  - ... but not by jane.doe@mail.domain:
-        #    ...;ATTENDEE:+john.doe@mail.domain|-jane.doe@mail.domain
-
-        raw_rules = rules.split(';')
-        parsed_rules = {}
-        for raw_rule in raw_rules:
-            try:
-                name, rule = raw_rule.split(':')
-            except ValueError:
-                # no ':'
-                logger.warning('malformed rule {}'.format(raw_rule))
-                continue
-            logger.info('found rule for {}: "{}"'.format(name, rule))
-            parsed_rules[name] = rule.split('|')
+        with self._step('filter',
+            rules if isinstance(rules, str) else ''):
+            rule_filter = self._compile_rules(rules)
+            if rule_filter is None:
+                return
+
+            self.vcalendar.filter(rule_filter)
 
+    def filter_terms(self, name, terms, include=True, match='contains'):
+        """
+        Keep the components with a property `name` matching one of `terms`
+        (or, if `include` is `False`, none of them). `match` is either
+        `'contains'`, `'exact'` or `'regex'`, see `rules.TermList`.
+
+        To combine term lists with other rules use `rules.Filter.add_terms`
+        and pass the filter to `filter`, `select` or `split`.
+        """
+        rule_filter = filter_rules.Filter([], False, {})
+        try:
+            rule_filter.add_terms(name, terms, include, match)
+        except ValueError:
+            return
+        self.filter(rule_filter)
+
+    def select(self, rules):
+        """
+        Like `filter` but the loaded calendar is left unchanged, the
+        components meeting `rules` are returned as `view.View` which can be
+        written using `write(..., source=VIEW)`.
+        """
+        if self.vcalendar is None:
+            logger.warning('cannot apply rules before calendar data has been '+
+                'loaded')
+            return None
+
+        with self._step('select',
+            rules if isinstance(rules, str) else ''):
+            rule_filter = self._compile_rules(rules)
+            if rule_filter is None:
+                return None
+            return self.vcalendar.select(rule_filter)
+
+    def split(self, splits, component='VEVENT'):
+        """
+        Write the components meeting different rules to different files
+        without loading the calendar again, `splits` is a list of tuples
+        `(RULES, FILENAME)`. The loaded calendar is left unchanged.
+        """
+        for rules, file_name in splits:
+            selection = self.select(rules)
+            if not selection is None:
+                self.write(file_name, component, selection)
+
+    def build_index(self):
+        """
+        Build an index over DTSTART / DTEND of the loaded components so date
+        rules and `overlapping` do not need to look at every component.
+        """
+        if self.vcalendar is None:
+            logger.warning('cannot build an index before calendar data has ' +
+                'been loaded')
+            return
+        self.vcalendar.build_time_index()
+        logger.info('built index over {} components'.format(
+            len(self.vcalendar.time_index)))
+
+    def build_columns(self, components=('VEVENT', 'VTODO')):
+        """
+        Build a columnar copy (`columns.ColumnStore`, needs numpy) of the
+        loaded components of the given types, rules are then evaluated on
+        whole columns at once. Returns the store or `None`.
+        """
+        if self.vcalendar is None:
+            logger.warning('cannot build columns before calendar data has ' +
+                'been loaded')
+            return None
+        try:
+            column_store = self.vcalendar.build_column_store(components)
+        except ImportError:
+            logger.error('building columns needs numpy ("pip install numpy")')
+            return None
+        logger.info('built columns over {} components'.format(
+            len(column_store)))
+        return column_store
+
+    def overlapping(self, window):
+        """
+        Return the components overlapping `window`, either a tuple of seconds
+        since the epoch (start inclusive, end exclusive) or a date range as
+        used in rules, e.g. `2015-10to2017-11`.
+        """
+        if self.vcalendar is None:
+            logger.warning('cannot search components before calendar data ' +
+                'has been loaded')
+            return []
+        if isinstance(window, str):
+            window = filter_rules.parse_date_range(window)
+        return self.vcalendar.overlapping(*window)
+
+    def _compile_rules(self, rules):
+        if isinstance(rules, filter_rules.Filter):
+            return rules
         try:
-            component_rule = parsed_rules['COMPONENT'][0]
-            logger.debug('found component rule: "{}"'.format(component_rule))
+            rule_filter = filter_rules.compile_rules(rules,
+                self.schema.date_properties())
+        except ValueError:
+            return None
+        rule_filter.occurrences = self.occurrences
+        return rule_filter
+
+    def stream(self, file_name, actions, component='VEVENT',
+        has_header=True, custom_column_names=custom_column_names,
+        column_mapping=default_column_mapping,
+        delimiter=',', quotechar='"', lazy=False):
+        """
+        Load, filter and write calendar data one top-level component at a
+        time so only a single component needs to be held in memory.
+
+        `actions` is a list of tuples `('filter', RULES)`,
+        `('output', FILENAME)` or `('split', (RULES, FILENAME))` which are
+        applied in order to every component, just like `-f`, `-o` and
+        `--split` on the command line. Only the properties of
+        the calendar itself are kept in `self.vcalendar`.
+
+        With `self.sort_by` set the outputs are written sorted once the
+        whole file was read, beyond `self.sort_memory` using temporary
+        files.
+        """
+        steps = []
+        outputs = []
+        sorted_outputs = sum(1 for action, _ in actions
+            if action in ('output', 'split'))
+        self.vcalendar = datatypes.VCALENDAR()
+        try:
+            for action, value in actions:
+                if action == 'filter':
+                    rule_filter = self._compile_rules(value)
+                    if not rule_filter is None:
+                        steps.append((action, rule_filter))
+                elif action == 'output':
+                    if value[-3:] == 'csv':
+                        output = writer.CSVWriter(value, component,
+                            self.schema.csv_columns(component), self.expand)
+                    elif value[-3:] == 'ics':
+                        output = writer.ICalWriter(value, self.vcalendar)
+                    else:
+                        logger.error('invalid file given ("{}")'.format(value))
+                        sys.exit()
+                    output = self._sorted(output, sorted_outputs)
+                    outputs.append(output)
+                    steps.append((action, output))
+                elif action == 'split':
+                    rules, output_name = value
+                    rule_filter = self._compile_rules(rules)
+                    if rule_filter is None:
+                        continue
+                    if output_name[-3:] == 'csv':
+                        output = writer.CSVWriter(output_name, component,
+                            self.schema.csv_columns(component), self.expand)
+                    elif output_name[-3:] == 'ics':
+                        output = writer.ICalWriter(output_name, self.vcalendar)
+                    else:
+                        logger.error('invalid file given ("{}")'.format(
+                            output_name))
+                        sys.exit()
+                    output = self._sorted(output, sorted_outputs)
+                    outputs.append(output)
+                    steps.append((action, (rule_filter, output)))
+
+            with self._step('stream', file_name):
+                for current_component in self._stream_components(file_name,
+                    component, has_header, custom_column_names,
+                    column_mapping, delimiter, quotechar, lazy):
+                    for action, value in steps:
+                        if action == 'filter':
+                            if not current_component.meets_criteria(value):
+                                if self.stats.enabled:
+                                    self.stats.count('components_removed')
+                                break
+                            current_component.filter(value)
+                        elif action == 'split':
+                            rule_filter, output = value
+                            if current_component.meets_criteria(rule_filter):
+                                output.write(current_component.select(
+                                    rule_filter))
+                        else:
+                            value.write(current_component)
+        finally:
+            if self.sort_by is None:
+                for output in outputs:
+                    output.close()
+            else:
+                # sorted outputs are only written now
+                with self._step('sort', self.sort_by):
+                    for output in outputs:
+                        output.close()
+
+    def _stream_components(self, file_name, component, has_header,
+        custom_column_names, column_mapping, delimiter, quotechar, lazy):
+        if file_name[-3:] == 'csv':
+            with open(file_name, 'r', newline='', encoding='utf-8-sig') as \
+                file_handle:
 
-            # sanity check
-            if not re.match('[+-]{1}[A-Z,]+', component_rule):
-                logger.error('component filter cannot have inclusion and ' +
-                    'exclusion criteria, "{}" given'.format(component_rule))
-                return
+                logger.info('opening {}'.format(file_name))
+                data = csv.reader(
+                    file_handle, delimiter=delimiter, quotechar=quotechar)
 
-            components_keep = component_rule[0] == '+'
-            components = component_rule[1:].split(',')
-            del parsed_rules['COMPONENT']
-        except KeyError:
-            # no component rule
-            # create an empty list of components to remove
-            components = []
-            components_keep = False
+                header = None
+                if has_header:
+                    header = next(data)
 
-        self.vcalendar.filter(components, components_keep,
-            parsed_rules)
+                column_mapping = self._csv_get_column_mapping(
+                    column_mapping, has_header, header, custom_column_names)
+
+                yield from self.vcalendar.csv_iter(component, data,
+                    column_mapping, self.schema)
+                logger.info('loaded {}'.format(file_name))
+        elif file_name[-3:] == 'ics':
+            logger.info('opening {}'.format(file_name))
+            yield from self.vcalendar.ical_iter(
+                reader.ical_read_lines(file_name), lazy, self.schema)
+            logger.info('loaded {}'.format(file_name))
+        else:
+            logger.error('invalid file given ("{}")'.format(file_name))
+            sys.exit()
 
 # taken from :
 # https://stackoverflow.com/questions/9027028/argparse-argument-order
@@ -329,7 +589,9 @@ def main():
         epilog='')
     parser.add_argument(
         'file',
-        help='the file to load, either .csv or .ics (preferred)',
+        help='the file to load, either .csv or .ics (preferred), several ' +
+            'files are merged',
+        nargs='+',
         type=str)
     parser.add_argument(
         '-o',
@@ -344,6 +606,13 @@ def main():
             'journals, freebusy-indicators) to keep / sort out',
         type=str,
         action=CustomAction)
+    parser.add_argument(
+        '--split',
+        help='RULES=OUTPUTFILE: write the components meeting RULES to ' +
+            'OUTPUTFILE without changing the loaded data, may be given ' +
+            'several times',
+        type=str,
+        action=CustomAction)
     parser.add_argument(
         '-s',
         '--setup',
@@ -361,6 +630,91 @@ def main():
             'events [VEVENT] are assumed to be the input / desired output',
         type=str,
         default='VEVENT')
+    parser.add_argument(
+        '-j',
+        '--jobs',
+        help='number of processes used to parse .ics-files',
+        type=int,
+        default=1)
+    parser.add_argument(
+        '--index',
+        help='build an index over the start and end dates after loading ' +
+            'which speeds up applying several date rules',
+        action='store_true')
+    parser.add_argument(
+        '--dedupe',
+        help='keep only the newest revision of components with the same ' +
+            'UID and RECURRENCE-ID',
+        action='store_true')
+    parser.add_argument(
+        '--columns',
+        help='filter using a columnar copy of the events and todos ' +
+            '(needs numpy)',
+        action='store_true')
+    parser.add_argument(
+        '--occurrences',
+        help='date rules on DTSTART / DTEND match recurring components ' +
+            '(RRULE, RDATE) if any of their occurrences does',
+        action='store_true')
+    parser.add_argument(
+        '--expand',
+        help='WINDOW: write a row for every occurrence starting in WINDOW ' +
+            '(a date range as used in rules, e.g. 2015-10to2017-11) to ' +
+            '.csv-files',
+        type=str)
+    parser.add_argument(
+        '--sort-by',
+        help='PROPERTY: write the components sorted by the value of ' +
+            'PROPERTY (e.g. DTSTART, dates by their time in UTC); time ' +
+            'zones come first, components without PROPERTY last',
+        type=str)
+    parser.add_argument(
+        '--sort-memory',
+        help='memory in MiB used for sorting (by all outputs together), ' +
+            'beyond that sorted runs are written to temporary files ' +
+            '(default: 256)',
+        type=float,
+        default=256)
+    parser.add_argument(
+        '--stream',
+        help='read, filter and write one component at a time instead of ' +
+            'loading the whole file into memory; columns of .csv-files ' +
+            'written this way are fixed before reading',
+        action='store_true')
+    parser.add_argument(
+        '--lazy',
+        help='parse the values of properties (e.g. dates) of .ics-files ' +
+            'only when filters need them and write them unchanged',
+        action='store_true')
+    parser.add_argument(
+        '--no-cache',
+        help='do not use (or fill) the cache of parsed .ics-files',
+        action='store_true')
+    parser.add_argument(
+        '--cache-dir',
+        help='directory of the cache of parsed .ics-files (default: ' +
+            '$ICALTOOL_CACHE_DIR or ~/.cache/icaltool)',
+        type=str)
+    parser.add_argument(
+        '--cache-size',
+        help='size of the cache in MiB, the least recently used files ' +
+            'are removed first (default: 1024)',
+        type=float,
+        default=1024)
+    parser.add_argument(
+        '--stats',
+        help='print the time and memory every step took and how many ' +
+            'components and properties were parsed, dropped and kept',
+        action='store_true')
+    parser.add_argument(
+        '--trace-memory',
+        help='measure the peak memory of every step using tracemalloc ' +
+            '(slow), implies --stats',
+        action='store_true')
+    parser.add_argument(
+        '--profile',
+        help='profile the run using cProfile and save the result to this file',
+        type=str)
     parser.add_argument(
         '-v',
         '--verbosity',
@@ -386,14 +740,28 @@ def main():
 
     # setup ICalTool
 
-    tool = ICalTool()
+    cache = None
+    if not args.no_cache:
+        cache = parse_cache.ParseCache(args.cache_dir,
+            int(args.cache_size * 2**20))
+    # measuring the memory is pointless without reporting it
+    tool = ICalTool(stats=args.stats or args.trace_memory,
+        trace_memory=args.trace_memory, cache=cache)
 
     if not args.setup is None:
         tool.setup(json.loads(args.setup))
 
-    # load file
-
-    tool.load(args.file, component=args.component)
+    tool.occurrences = args.occurrences
+    if not args.sort_by is None:
+        tool.sort_by = args.sort_by.upper()
+        tool.sort_memory = int(args.sort_memory * 2**20)
+    if not args.expand is None:
+        try:
+            tool.expand = filter_rules.parse_date_range(args.expand)
+        except ValueError:
+            logger.error('invalid window "{}" for --expand'.format(
+                args.expand))
+            return
 
     # do whatever
 
@@ -401,17 +769,78 @@ def main():
         logger.error('nothing to do with the loaded data - exiting')
         return
 
-    # process actions in order of flags
+    actions = []
     for arg, value in args.ordered_args:
-        if arg == 'output':
-            if value == args.file:
-                logger.error('please don\'t attempt to overwrite your input ' +
-                    'file - while it is technically possible it seems unwise ' +
-                    "\n cancelling")
+        if arg == 'split':
+            # RULES=FILENAME, rules may contain "=" themselves
+            rules, separator, file_name = value.rpartition('=')
+            if separator == '' or rules == '' or file_name == '':
+                logger.error('--split needs RULES=FILENAME, got "{}"'.format(
+                    value))
                 continue
+            value = (rules, file_name)
+        if (arg == 'output' and value in args.file) or \
+            (arg == 'split' and value[1] in args.file):
+            logger.error('please don\'t attempt to overwrite your input ' +
+                'file - while it is technically possible it seems unwise ' +
+                "\n cancelling")
+            continue
+        actions.append((arg, value))
+
+    if not args.profile is None:
+        tool.stats.start_profile()
+
+    try:
+        run(tool, args, actions)
+    finally:
+        if not args.profile is None:
+            tool.stats.stop_profile(args.profile)
+        if tool.stats.enabled:
+            print(tool.stats.report(), file=sys.stderr)
+
+def run(tool, args, actions):
+    if args.stream:
+        # these need the whole calendar loaded
+        rejected = [option for option, given in (('--dedupe', args.dedupe),
+            ('--jobs', args.jobs != 1), ('--index', args.index),
+            ('--columns', args.columns)) if given]
+        if len(args.file) > 1 or rejected:
+            logger.error('--stream works with one input file and without ' +
+                '--dedupe, --jobs, --index and --columns' + (
+                ' (given: {})'.format(', '.join(rejected)) if rejected
+                else ''))
+            return
+        tool.stream(args.file[0], actions, component=args.component,
+            lazy=args.lazy)
+        return
+
+    # load file(s)
+
+    if len(args.file) == 1:
+        tool.load(args.file[0], component=args.component, jobs=args.jobs,
+            lazy=args.lazy)
+    else:
+        tool.load_merged(args.file, component=args.component, jobs=args.jobs,
+            lazy=args.lazy)
+
+    if args.dedupe:
+        duplicates = tool.dedupe()
+        print('resolved {} duplicates'.format(duplicates), file=sys.stderr)
+
+    if args.index:
+        tool.build_index()
+
+    if args.columns:
+        tool.build_columns()
+
+    # process actions in order of flags
+    for arg, value in actions:
+        if arg == 'output':
             tool.write(value, component=args.component)
         elif arg == 'filter':
             tool.filter(value)
+        elif arg == 'split':
+            tool.split([value], component=args.component)
 
 if __name__ == '__main__':
     main()
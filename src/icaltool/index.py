@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import bisect
+import logging
+
+from . import recurrence
+from . import rules
+
+logger = logging.getLogger(__name__)
+
+class TimeIndex:
+    """
+    Sorted index over the DTSTART and DTEND properties of a list of
+    components (usually the top-level components of a `VCALENDAR`).
+
+    Values are seconds since the epoch as stored by `datatypes.DateTime`.
+    Date rules on indexed properties can be resolved by bisection and
+    `overlapping()` finds all components overlapping a time window.
+    """
+    properties = ('DTSTART', 'DTEND')
+
+    def __init__(self, components):
+        # property name -> (sorted values, positions of the components)
+        self._entries = {}
+        for name in self.__class__.properties:
+            entries = []
+            for position, component in enumerate(components):
+                for prop in component.get_all(name):
+                    if not isinstance(prop.value, int):
+                        # not parsed as `DateTime` (e.g. unknown to the
+                        # component) so rules need to be checked one by one
+                        entries = None
+                        break
+                    entries.append((prop.value, position))
+                if entries is None:
+                    break
+            if entries is None:
+                logger.debug('cannot index {}'.format(name))
+                continue
+            entries.sort()
+            self._entries[name] = ([entry[0] for entry in entries],
+                [entry[1] for entry in entries])
+
+        intervals = []
+        for position, component in enumerate(components):
+            start = component.get('DTSTART')
+            if start is None or not isinstance(start.value, int):
+                continue
+            end = component.get('DTEND')
+            if end is None or not isinstance(end.value, int):
+                end = start.value
+            else:
+                end = max(start.value, end.value)
+            intervals.append((start.value, end, position))
+        self._buckets = _buckets(intervals)
+        self._size = len(components)
+        logger.debug('indexed {} intervals'.format(len(intervals)))
+
+    def __len__(self):
+        return self._size
+
+    def overlapping(self, start, end):
+        """
+        Return the positions (ascending) of all components overlapping the
+        window [start, end). Components without DTEND (or with DTSTART ==
+        DTEND) overlap if DTSTART is inside the window.
+        """
+        positions = []
+        for starts, intervals, max_duration in self._buckets:
+            first = bisect.bisect_left(starts, start - max_duration)
+            last = bisect.bisect_left(starts, end)
+            for interval_start, interval_end, position in \
+                intervals[first:last]:
+                if interval_end > start or (interval_start == interval_end
+                    and interval_start >= start):
+                    positions.append(position)
+        positions.sort()
+        return positions
+
+    def resolve(self, rule_filter):
+        """
+        Resolve the rules of `rule_filter` that target indexed properties.
+
+        Returns a tuple (positions, names): the set of positions of the
+        components satisfying those rules and the names of the rules that
+        were resolved. If no rule could be resolved positions is `None`.
+        """
+        positions = None
+        names = []
+        for name, rule in rule_filter.property_rules.items():
+            if not name in self._entries:
+                continue
+            if rule_filter.occurrences and \
+                name in recurrence.DATE_PROPERTIES:
+                # only the first occurrences are indexed
+                continue
+            values, entry_positions = self._entries[name]
+            # ranges of entries (i.e. properties) satisfying every term
+            selected = [(0, len(values))]
+            for term in rule.terms:
+                if not isinstance(term, rules.Term) or \
+                    not term.regex is None:
+                    selected = None
+                    break
+                start, end = term.date_range()
+                first = bisect.bisect_left(values, start)
+                last = bisect.bisect_left(values, end)
+                if term.include:
+                    selected = _intersect(selected, first, last)
+                else:
+                    selected = _subtract(selected, first, last)
+            if selected is None:
+                # cannot be resolved using the index
+                continue
+            matching_positions = set()
+            for first, last in selected:
+                matching_positions.update(entry_positions[first:last])
+            positions = matching_positions if positions is None else \
+                positions & matching_positions
+            names.append(name)
+        return (positions, names)
+
+    def select(self, kept):
+        """
+        Adjust the index after the indexed list was reduced to the
+        components at the positions `kept` (ascending).
+        """
+        new_positions = {}
+        for new_position, old_position in enumerate(kept):
+            new_positions[old_position] = new_position
+
+        for name, (values, positions) in self._entries.items():
+            new_values = []
+            new_entry_positions = []
+            for value, position in zip(values, positions):
+                if position in new_positions:
+                    new_values.append(value)
+                    new_entry_positions.append(new_positions[position])
+            self._entries[name] = (new_values, new_entry_positions)
+
+        intervals = []
+        for _, bucket_intervals, _ in self._buckets:
+            for interval_start, interval_end, position in bucket_intervals:
+                if position in new_positions:
+                    intervals.append((interval_start, interval_end,
+                        new_positions[position]))
+        self._buckets = _buckets(intervals)
+        self._size = len(kept)
+
+def _buckets(intervals):
+    # intervals [start, end) grouped by their duration (durations with the
+    # same number of bits), every bucket is a tuple (starts, intervals
+    # sorted by start, longest duration): an interval overlapping a window
+    # starts at most the longest duration of its bucket before the window,
+    # so a few long intervals do not make every window look back that far
+    grouped = {}
+    for interval in intervals:
+        grouped.setdefault((interval[1] - interval[0]).bit_length(),
+            []).append(interval)
+    buckets = []
+    for _, bucket_intervals in sorted(grouped.items()):
+        bucket_intervals.sort()
+        buckets.append(([interval[0] for interval in bucket_intervals],
+            bucket_intervals, max(interval[1] - interval[0]
+            for interval in bucket_intervals)))
+    return buckets
+
+def _intersect(ranges, first, last):
+    # intersect a list of ranges [first, last) with [first, last)
+    result = []
+    for range_first, range_last in ranges:
+        range_first = max(range_first, first)
+        range_last = min(range_last, last)
+        if range_first < range_last:
+            result.append((range_first, range_last))
+    return result
+
+def _subtract(ranges, first, last):
+    # remove [first, last) from a list of ranges [first, last)
+    result = []
+    for range_first, range_last in ranges:
+        if range_first < first:
+            result.append((range_first, min(range_last, first)))
+        if range_last > last:
+            result.append((max(range_first, last), range_last))
+    return result
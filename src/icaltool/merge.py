@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import logging
+
+from . import datatypes
+
+logger = logging.getLogger(__name__)
+
+def merge(calendars):
+    """
+    Merge `datatypes.VCALENDAR`s into a new one: the components are kept in
+    order, the properties of the calendar (PRODID, ...) are taken from the
+    first calendar having any and time zones (VTIMEZONE) with a TZID already
+    seen are left out.
+    """
+    vcalendar = datatypes.VCALENDAR()
+    timezones = set()
+    for calendar in calendars:
+        if not vcalendar._properties:
+            for property_object in calendar._properties:
+                vcalendar.add_property(property_object)
+        for component in calendar._components:
+            if component.name == 'VTIMEZONE':
+                tzid = component.get('TZID')
+                if not tzid is None:
+                    if tzid.value in timezones:
+                        continue
+                    timezones.add(tzid.value)
+            vcalendar._components.append(component)
+    return vcalendar
+
+def dedupe(vcalendar):
+    """
+    Keep only the newest revision of every component of `vcalendar` in one
+    pass, components are identified by their type, UID and RECURRENCE-ID
+    (see `identity`), the newest has the highest SEQUENCE, then the latest
+    DTSTAMP (RFC 5545) and then the latest LAST-MODIFIED (see `revision`).
+    The newest revision takes the place of the first one, components without
+    UID are kept.
+
+    Returns the number of components dropped.
+    """
+    keep = []
+    # identity -> position in `keep`
+    seen = {}
+    duplicates = 0
+    for component in vcalendar._components:
+        key = identity(component)
+        if key is None:
+            keep.append(component)
+            continue
+        try:
+            position = seen[key]
+        except KeyError:
+            seen[key] = len(keep)
+            keep.append(component)
+            continue
+        duplicates += 1
+        if revision(component) > revision(keep[position]):
+            keep[position] = component
+
+    if duplicates:
+        vcalendar._components = keep
+        # the positions of the components changed
+        if not vcalendar.time_index is None:
+            vcalendar.build_time_index()
+        if not vcalendar.column_store is None:
+            vcalendar.build_column_store(
+                vcalendar.column_store.component_types)
+    stats = datatypes.current_stats()
+    if not stats is None:
+        stats.count('duplicates_resolved', duplicates)
+    logger.info('resolved {} duplicates'.format(duplicates))
+    return duplicates
+
+def identity(component):
+    # (type, UID, RECURRENCE-ID) or `None` if the component has no UID
+    uid = component.get('UID')
+    if uid is None:
+        return None
+    recurrence_id = component.get('RECURRENCE-ID')
+    if not recurrence_id is None:
+        recurrence_id = recurrence_id.value
+    return (component.name, uid.value, recurrence_id)
+
+def revision(component):
+    # comparable tuple, the greater the newer
+    return (_sequence(component), _date(component, 'DTSTAMP'),
+        _date(component, 'LAST-MODIFIED'))
+
+def _sequence(component):
+    sequence = component.get('SEQUENCE')
+    if sequence is None:
+        return 0
+    try:
+        # ":NUMBER", the value follows the last ":"
+        return int(sequence.value.rpartition(':')[2])
+    except ValueError:
+        return 0
+
+def _date(component, name):
+    date = component.get(name)
+    if date is None or not isinstance(date.value, int):
+        return float('-inf')
+    return date.value
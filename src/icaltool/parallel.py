@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import collections
+import concurrent.futures
+import logging
+
+from . import datatypes
+from . import stats as run_stats
+from . import timezones
+
+logger = logging.getLogger(__name__)
+
+# chunks parsed or waiting for a worker at the same time per process
+MAX_PENDING_CHUNKS_PER_JOB = 2
+
+# whether the worker parses lazily, the `datatypes.Schema` it uses and the
+# `stats.Stats` it counts with (or `None`), set by `_init_worker`
+_lazy = False
+_schema = None
+_stats = None
+
+def ical_parse(vcalendar, lines, jobs, chunk_size=20000, lazy=False,
+    schema=None):
+    """
+    Parse the unfolded `lines` of a calendar into `vcalendar` using `jobs`
+    worker processes.
+
+    The lines are split into chunks of whole top-level components (about
+    `chunk_size` lines each) which are parsed by the workers and merged back
+    in their original order. Properties of the calendar itself are parsed in
+    this process. `lazy` and `schema` are passed on to
+    `Component.ical_parse`. The time zones (VTIMEZONE) of the calendar are
+    defined for the times of every chunk once all chunks are parsed, like
+    when parsing in one process.
+    """
+    if schema is None:
+        schema = datatypes.default_schema
+    definitions = schema.as_dict()
+    stats = datatypes.current_stats()
+    count = not stats is None
+    # the `timezones.Zones` of the calendar's own properties and of every
+    # chunk
+    zones = [timezones.Zones()]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs,
+        initializer=_init_worker, initargs=(definitions, count, lazy)) as \
+        executor:
+        chunks = _split(vcalendar, lines, chunk_size, lazy, schema, zones[0])
+        # the chunks submitted but not merged yet (in order), only a few are
+        # read ahead so the file is not queued for the workers as a whole
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_parse_chunk, chunk))
+            if len(pending) >= MAX_PENDING_CHUNKS_PER_JOB * jobs:
+                _merge(vcalendar, pending.popleft().result(), schema, zones,
+                    stats)
+        while pending:
+            _merge(vcalendar, pending.popleft().result(), schema, zones,
+                stats)
+    for chunk_zones in zones:
+        chunk_zones.define_all(vcalendar._components)
+    logger.debug('finished parsing {} using {} processes'.format(
+        vcalendar.name, jobs))
+
+def _merge(vcalendar, result, schema, zones, stats):
+    # add what `_parse_chunk` returned to `vcalendar`
+    components, chunk_zones, unknown_properties, counters = result
+    vcalendar._components.extend(components)
+    zones.append(chunk_zones)
+    if not stats is None:
+        stats.counters.update(counters)
+    # register properties the workers did not know in this process, too, as
+    # if the lines had been parsed here
+    schema.register(unknown_properties)
+
+def _split(vcalendar, lines, chunk_size, lazy, schema, zones):
+    # yield the lines of chunks each containing complete top-level
+    # components, lines outside of components are properties of `vcalendar`
+    # (parsed using `zones`)
+    table = schema.table(vcalendar.__class__,
+        'ical_parse_lazy' if lazy else 'ical_parse')
+    chunk = []
+    current_component = None
+    for line in lines:
+        if current_component is None:
+            if line[:6] == 'BEGIN:':
+                current_component = line[6:]
+                chunk.append(line)
+            else:
+                try:
+                    vcalendar._ical_parse_line(line, table, zones)
+                except ValueError:
+                    # required property missing / not parseable (and logged),
+                    # the calendar is kept anyway like in
+                    # `Component.ical_iter`
+                    pass
+        else:
+            chunk.append(line)
+            if line[:4] == 'END:' and line[4:] == current_component:
+                current_component = None
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+    if chunk:
+        yield chunk
+
+def _init_worker(definitions, count, lazy):
+    global _lazy, _schema, _stats
+    _lazy = lazy
+    _schema = datatypes.Schema(definitions)
+    if count:
+        _stats = run_stats.Stats(True)
+
+def _parse_chunk(lines):
+    definitions = _schema.as_dict()
+
+    counters = None
+    if not _stats is None:
+        _stats.counters.clear()
+    container = datatypes.VCALENDAR()
+    # the times refer to the `Zone`s of `zones`, they are pickled together
+    zones = timezones.Zones()
+    with datatypes.counting(_stats):
+        container.ical_parse(lines, _lazy, _schema, zones)
+    if not _stats is None:
+        counters = dict(_stats.counters)
+
+    return (container._components, zones,
+        _schema.new_properties(definitions),
+        counters)
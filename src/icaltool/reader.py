@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import mmap
+import logging
+
+logger = logging.getLogger(__name__)
+
+BOM = b'\xef\xbb\xbf'
+
+def ical_read_lines(file_name, encoding='utf-8', block_size=1 << 20):
+    """
+    Yield the unfolded lines between "BEGIN:VCALENDAR" and "END:VCALENDAR"
+    of an `.ics`-file one by one.
+
+    The file is memory-mapped and processed in blocks of about `block_size`
+    bytes that end on a line break which does not start a folded line. Folds
+    are removed on the bytes of a block in one step (so every folded line is
+    put together in a single allocation instead of repeated concatenation)
+    before the block is decoded. Memory use is bounded by the block size.
+    """
+    with open(file_name, 'rb') as file_handle:
+        try:
+            data = mmap.mmap(file_handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # mmap cannot map empty files
+            logger.warning('{} is empty'.format(file_name))
+            return
+        with data:
+            yield from _calendar_lines(data, encoding, block_size)
+
+def ical_data_lines(data, encoding='utf-8', block_size=1 << 20):
+    """
+    Like `ical_read_lines` but for the content of an `.ics`-file already
+    read into memory (`bytes`), e.g. fetched from a server.
+    """
+    yield from _calendar_lines(data, encoding, block_size)
+
+def _calendar_lines(data, encoding, block_size):
+    vcalendar = False
+    for lines in _blocks(data, encoding, block_size):
+        for line in lines:
+            # do not use empty lines
+            if line == '':
+                continue
+            if not vcalendar:
+                if line == 'BEGIN:VCALENDAR':
+                    vcalendar = True
+                    logger.debug('recording new VCALENDAR')
+            elif line == 'END:VCALENDAR':
+                vcalendar = False
+                logger.debug('finished recording VCALENDAR')
+            else:
+                yield line
+
+def _blocks(data, encoding, block_size):
+    # yield the unfolded lines of the file block by block
+    size = len(data)
+    position = len(BOM) if data[:len(BOM)] == BOM else 0
+    # lines end with "\r\n" or "\n", in files without any "\n" with "\r"
+    line_break = b'\n' if data.find(b'\n', position) > -1 else b'\r'
+    while position < size:
+        end = _block_end(data, position + block_size, size, line_break)
+        block = data[position:end]
+        if b'\r' in block:
+            block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        # a line break followed by a whitespace or tab marks a folded line
+        block = block.replace(b'\n ', b'').replace(b'\n\t', b'')
+        yield str(block, encoding).split('\n')
+        position = end
+
+def _block_end(data, end, size, line_break=b'\n'):
+    # find the first `line_break` at or after `end` that is not followed by
+    # a whitespace or tab, i.e. that does not split a folded line
+    while end < size:
+        end = data.find(line_break, end)
+        if end == -1:
+            return size
+        end += 1
+        if end == size or not data[end] in (32, 9):
+            return end
+    return size
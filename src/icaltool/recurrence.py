@@ -0,0 +1,649 @@
+#!/usr/bin/env python3
+
+import bisect
+import calendar
+import datetime
+import heapq
+import logging
+import re
+
+from . import datatypes
+from . import rules
+from . import timezones
+
+logger = logging.getLogger(__name__)
+
+# properties date rules can match per occurrence, see `Recurrence.matches`
+DATE_PROPERTIES = ('DTSTART', 'DTEND')
+
+FREQUENCIES = ('SECONDLY', 'MINUTELY', 'HOURLY', 'DAILY', 'WEEKLY', 'MONTHLY',
+    'YEARLY')
+# length of the periods of the frequencies shorter than a day in seconds
+_PERIOD_SECONDS = {'SECONDLY': 1, 'MINUTELY': 60, 'HOURLY': 3600}
+# shortest length of the periods of the other frequencies in days
+_PERIOD_DAYS = {'DAILY': 1, 'WEEKLY': 7, 'MONTHLY': 28, 'YEARLY': 365}
+WEEKDAYS = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+# give up on a rule after this many periods in a row without an occurrence
+# (e.g. BYMONTH=2;BYMONTHDAY=30), but not before the periods cover
+# `MAX_EMPTY_DAYS`: rules which do have occurrences may skip up to 40 years
+# (e.g. BYMONTH=2;BYMONTHDAY=29;BYDAY=MO, or 8 years without BYDAY as 2100
+# is no leap year)
+MAX_EMPTY_PERIODS = 1000
+MAX_EMPTY_DAYS = 41 * 366
+# the occurrences of a window are only kept (see `Recurrence.between`) if
+# there are at most this many
+MAX_KEPT_OCCURRENCES = 1000
+
+_DAY = 86400
+# days between 0001-01-01 (ordinal 1, a Monday) and 1970-01-01
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+# 10000-01-01, occurrences end before
+_END = (datetime.date.max.toordinal() + 1 - _EPOCH_ORDINAL) * _DAY
+
+_DURATION = re.compile(
+    r'([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?\Z')
+
+def is_recurring(component):
+    # whether `component` has more occurrences than its DTSTART
+    index = component._property_index
+    return 'RRULE' in index or 'RDATE' in index
+
+class Recurrence:
+    """
+    The occurrences of a component as defined by its DTSTART, RRULEs, RDATEs
+    and EXDATEs (RFC 5545), as seconds since the epoch (UTC, like
+    `datatypes.DateTime`). Rules are expanded in the time zone of DTSTART,
+    from DTSTART as written, so occurrences keep their local time across
+    daylight saving time. Only occurrences at a local time skipped by
+    daylight saving time are moved (RFC 5545 3.3.5), each on its own.
+
+    Occurrences are only expanded for the windows asked for, rules without
+    COUNT start right at the window. The occurrences of the last window are
+    kept (if there are at most `MAX_KEPT_OCCURRENCES`) so asking for it (or
+    a window inside it) again does not expand anything.
+    """
+    def __init__(self, component):
+        start = component.get('DTSTART')
+        self.start = None
+        # DTSTART as written (the wall-clock time for local times with a
+        # TZID, even if that time is skipped by daylight saving time)
+        self.local_start = None
+        self.date_only = False
+        # the `timezones.Zone` of DTSTART if it is a local time with a TZID
+        self.zone = None
+        if not start is None and isinstance(start.value, int):
+            self.start = start.value
+            self.local_start = self.start
+            self.date_only = start.type == 1
+            if start.type == 2 and not start._zone is None:
+                self.zone = start._zone
+                self.local_start = start._value
+        # the time zones of the calendar for the TZIDs of RDATE / EXDATE
+        zones = None if self.zone is None else self.zone.zones
+        self.duration = _duration(component, self.start, self.date_only)
+        self.rules = []
+        for prop in component.get_all('RRULE'):
+            if self.start is None:
+                break
+            try:
+                self.rules.append(RecurrenceRule(prop.value,
+                    self.local_start, self.date_only, self.zone))
+            except (ValueError, KeyError):
+                logger.warning('ignoring invalid rule "{}"'.format(
+                    prop.value))
+        self.dates = sorted(set(value for prop in component.get_all('RDATE')
+            for value, _ in parse_dates(prop.value, zones)))
+        self.excluded = set()
+        # wall-clock times excluded by EXDATEs in the time zone of DTSTART,
+        # matched against the occurrences as generated (before times
+        # skipped by daylight saving time are moved)
+        self.excluded_local = set()
+        # local days (since the epoch) excluded by EXDATEs without time
+        self.excluded_days = set()
+        for prop in component.get_all('EXDATE'):
+            tzid = _tzid(prop.value)
+            local = not (self.zone is None or tzid is None) and \
+                zones.zone(tzid) is self.zone
+            for value, date_type in parse_dates(prop.value, zones, local):
+                if date_type == 1:
+                    self.excluded_days.add(value // _DAY)
+                elif local and date_type == 2:
+                    self.excluded_local.add(value)
+                else:
+                    self.excluded.add(value)
+        # the occurrences in [window[0], window[1])
+        self._window = None
+        self._occurrences = []
+
+    def between(self, start, end):
+        """
+        The list of occurrences starting in [start, end) (ascending).
+        """
+        window = self._window
+        if not window is None and window[0] <= start and end <= window[1]:
+            occurrences = self._occurrences
+            return occurrences[bisect.bisect_left(occurrences, start):
+                bisect.bisect_left(occurrences, end)]
+        occurrences = list(self.iter_between(start, end))
+        if len(occurrences) > MAX_KEPT_OCCURRENCES:
+            self._window = None
+            self._occurrences = []
+            return occurrences
+        self._window = (start, end)
+        self._occurrences = occurrences
+        return list(occurrences)
+
+    def iter_between(self, start=None, end=None):
+        """
+        Generate the occurrences starting in [start, end) in ascending order,
+        `None` leaves the window open on that side. Nothing is kept.
+        """
+        for occurrence, _ in self.iter_local_between(start, end):
+            yield occurrence
+
+    def iter_local_between(self, start=None, end=None):
+        """
+        Like `iter_between` but generate tuples (occurrence, wall-clock
+        time), the wall-clock time is the local time the occurrence was
+        generated for (RFC 5545 3.3.5), e.g. 02:30 for an occurrence moved to
+        03:30 as daylight saving time skips 02:30.
+        """
+        if self.start is None:
+            return
+        if self.zone is None:
+            sources = [((value, value) for value in rule.iter_from(start))
+                for rule in self.rules]
+        else:
+            # a day early as local times and UTC do not map one to one, every
+            # occurrence is mapped to UTC on its own
+            local_start = None if start is None else \
+                self._local(start) - _DAY
+            to_utc = self.zone.to_utc
+            sources = [((to_utc(value), value) for value in
+                rule.iter_from(local_start)) for rule in self.rules]
+        first = 0 if start is None else bisect.bisect_left(self.dates, start)
+        sources.append((value, self._local(value))
+            for value in self.dates[first:])
+        # DTSTART is always the first occurrence
+        sources.append(iter([(self.start, self.local_start)]))
+        previous = None
+        for occurrence, local in heapq.merge(*sources):
+            if not end is None and occurrence >= end:
+                return
+            if occurrence == previous or (not start is None and
+                occurrence < start):
+                continue
+            previous = occurrence
+            if occurrence in self.excluded or local in self.excluded_local \
+                or (self.excluded_days and
+                local // _DAY in self.excluded_days):
+                continue
+            yield (occurrence, local)
+
+    def _local(self, value):
+        # `value` (UTC) in the time zone of DTSTART
+        if self.zone is None:
+            return value
+        return self.zone.from_utc(value)
+
+    def first_between(self, start=None, end=None):
+        # the first occurrence in [start, end) or `None`
+        if start is None or end is None:
+            return next(self.iter_between(start, end), None)
+        occurrences = self.between(start, end)
+        return occurrences[0] if occurrences else None
+
+    def matches(self, name, rule):
+        """
+        Whether any occurrence satisfies the date `rule` (a
+        `rules.PropertyRule`) for `name` (DTSTART: the start of the
+        occurrence, DTEND: its end).
+        """
+        offset = self.duration if name == 'DTEND' else 0
+        for start, end in _allowed_ranges(rule):
+            if not start is None:
+                start -= offset
+            if not end is None:
+                end -= offset
+            if not self.first_between(start, end) is None:
+                return True
+        return False
+
+class RecurrenceRule:
+    """
+    An RRULE, e.g. `FREQ=MONTHLY;BYDAY=-1FR;COUNT=10`. Supports FREQ,
+    INTERVAL, COUNT, UNTIL, BYMONTH, BYMONTHDAY, BYDAY, BYHOUR, BYMINUTE,
+    BYSECOND, BYSETPOS and WKST, raises a `ValueError` for other rules (e.g.
+    using BYYEARDAY or BYWEEKNO).
+
+    Occurrences are created one period (a year, month, week, ... of the
+    frequency times INTERVAL) at a time.
+    """
+    def __init__(self, text, start, date_only=False, zone=None):
+        # `start` is DTSTART in local time, `zone` its `timezones.Zone`
+        # (UNTIL is given in UTC then)
+        parts = {}
+        for part in text.rpartition(':')[2].split(';'):
+            name, _, value = part.partition('=')
+            parts[name.upper()] = value.upper()
+        self.frequency = parts.pop('FREQ')
+        if not self.frequency in FREQUENCIES:
+            raise ValueError
+        self.interval = int(parts.pop('INTERVAL', 1))
+        if self.interval < 1:
+            raise ValueError
+        self.count = None
+        if 'COUNT' in parts:
+            self.count = int(parts.pop('COUNT'))
+        self.until = None
+        if 'UNTIL' in parts:
+            self.until, until_type = datatypes.parse_date(parts.pop('UNTIL'))
+            if until_type == 3 and not zone is None:
+                self.until = zone.from_utc(self.until)
+            if date_only:
+                # the whole day
+                self.until += _DAY - 1
+        self.months = _numbers(parts.pop('BYMONTH', ''), 1, 12)
+        self.month_days = _numbers(parts.pop('BYMONTHDAY', ''), -31, 31)
+        self.weekdays = _weekdays(parts.pop('BYDAY', ''))
+        self.hours = _numbers(parts.pop('BYHOUR', ''), 0, 23)
+        self.minutes = _numbers(parts.pop('BYMINUTE', ''), 0, 59)
+        self.seconds = _numbers(parts.pop('BYSECOND', ''), 0, 60)
+        self.positions = _numbers(parts.pop('BYSETPOS', ''), -366, 366)
+        self.week_start = WEEKDAYS[parts.pop('WKST', 'MO')]
+        if parts:
+            logger.warning('unsupported parts of rule: {}'.format(
+                ', '.join(sorted(parts))))
+            raise ValueError
+
+        self.start = start
+        day, time_of_day = divmod(start, _DAY)
+        self._start_ordinal = day + _EPOCH_ORDINAL
+        start_date = datetime.date.fromordinal(self._start_ordinal)
+        self._start_day = start_date.day
+        self._start_month = start_date.year * 12 + start_date.month - 1
+        self._start_year = start_date.year
+        # ordinal of the first day of the week DTSTART is in
+        self._start_week = self._start_ordinal - (
+            (start_date.weekday() - self.week_start) % 7)
+        if not self.weekdays:
+            self._plain_weekdays = {start_date.weekday()}
+        else:
+            self._plain_weekdays = {weekday for _, weekday in self.weekdays}
+        hour, minute = divmod(time_of_day // 60, 60)
+        second = time_of_day % 60
+        # times of the day (in seconds) of the occurrences
+        self._times = sorted(h * 3600 + m * 60 + s
+            for h in (self.hours or [hour]) if not date_only or h == hour
+            for m in (self.minutes or [minute]) if not date_only or
+                m == minute
+            for s in (self.seconds or [second]) if not date_only or
+                s == second)
+
+    def iter_from(self, start=None):
+        """
+        Generate the occurrences from `start` on (ascending) up to UNTIL or
+        COUNT (or year 9999), the periods before `start` are skipped unless
+        the occurrences need to be counted.
+        """
+        count = self.count
+        period = 0
+        if count is None and not start is None and start > self.start:
+            try:
+                period = self._period_of(start)
+            except (OverflowError, ValueError):
+                return
+        if self.frequency in _PERIOD_SECONDS:
+            max_empty = MAX_EMPTY_DAYS * _DAY // \
+                _PERIOD_SECONDS[self.frequency]
+        else:
+            max_empty = MAX_EMPTY_DAYS // _PERIOD_DAYS[self.frequency]
+        max_empty = max(MAX_EMPTY_PERIODS, max_empty)
+        last_found = period
+        while True:
+            try:
+                candidates = self._candidates(period)
+            except (OverflowError, ValueError):
+                # beyond year 9999
+                return
+            if candidates:
+                last_found = period
+            elif period - last_found > max_empty:
+                return
+            for occurrence in candidates:
+                if occurrence < self.start:
+                    continue
+                if occurrence >= _END or (not self.until is None and
+                    occurrence > self.until):
+                    return
+                if start is None or occurrence >= start:
+                    yield occurrence
+                if not count is None:
+                    count -= 1
+                    if count == 0:
+                        return
+            period = self._next_period(period, candidates)
+
+    def _period_of(self, value):
+        # the number of the period `value` is in
+        frequency = self.frequency
+        if frequency in _PERIOD_SECONDS:
+            return (value - self.start) // (
+                _PERIOD_SECONDS[frequency] * self.interval)
+        ordinal = value // _DAY + _EPOCH_ORDINAL
+        if frequency == 'DAILY':
+            return (ordinal - self._start_ordinal) // self.interval
+        if frequency == 'WEEKLY':
+            return (ordinal - self._start_week) // (7 * self.interval)
+        date = datetime.date.fromordinal(ordinal)
+        if frequency == 'MONTHLY':
+            return (date.year * 12 + date.month - 1 - self._start_month) // \
+                self.interval
+        return (date.year - self._start_year) // self.interval
+
+    def _next_period(self, period, candidates):
+        # the next period that may have occurrences, frequencies shorter
+        # than a day skip the rest of days (hours, minutes) not matching
+        # BYxxx
+        frequency = self.frequency
+        if candidates or not frequency in _PERIOD_SECONDS:
+            return period + 1
+        length = _PERIOD_SECONDS[frequency] * self.interval
+        value = self.start + period * length
+        day, time_of_day = divmod(value, _DAY)
+        if not self._day_matches(day + _EPOCH_ORDINAL):
+            skip_to = (day + 1) * _DAY
+        elif self.hours and not time_of_day // 3600 in self.hours:
+            skip_to = value - time_of_day % 3600 + 3600
+        elif self.minutes and not time_of_day // 60 % 60 in self.minutes:
+            skip_to = value - time_of_day % 60 + 60
+        else:
+            return period + 1
+        # the first period starting at or after `skip_to`
+        return max(period + 1, -((self.start - skip_to) // length))
+
+    def _candidates(self, period):
+        # the occurrences of period number `period` (ascending), may be
+        # before DTSTART
+        frequency = self.frequency
+        if frequency in _PERIOD_SECONDS:
+            value = self.start + period * self.interval * \
+                _PERIOD_SECONDS[frequency]
+            day, time_of_day = divmod(value, _DAY)
+            hour, minute = divmod(time_of_day // 60, 60)
+            if not self._day_matches(day + _EPOCH_ORDINAL) or \
+                (self.hours and not hour in self.hours) or \
+                (self.minutes and not minute in self.minutes) or \
+                (self.seconds and not time_of_day % 60 in self.seconds):
+                return []
+            candidates = [value]
+        else:
+            if frequency == 'DAILY':
+                days = [self._start_ordinal + period * self.interval]
+                days = [day for day in days if self._day_matches(day)]
+            elif frequency == 'WEEKLY':
+                first = self._start_week + period * 7 * self.interval
+                days = [day for day in range(first, first + 7)
+                    if (day - 1) % 7 in self._plain_weekdays and
+                    self._month_matches(day)]
+            elif frequency == 'MONTHLY':
+                year, month = divmod(self._start_month +
+                    period * self.interval, 12)
+                month += 1
+                if self.months and not month in self.months:
+                    return []
+                days = self._month_days(year, month)
+            else:
+                days = self._year_days(self._start_year +
+                    period * self.interval)
+            candidates = [(day - _EPOCH_ORDINAL) * _DAY + time_of_day
+                for day in sorted(set(days)) for time_of_day in self._times]
+        if self.positions:
+            candidates = _set_positions(candidates, self.positions)
+        return candidates
+
+    def _year_days(self, year):
+        if year > 9999:
+            raise OverflowError
+        if self.months:
+            months = self.months
+        elif self.month_days:
+            months = range(1, 13)
+        elif self.weekdays:
+            # BYDAY relative to the year
+            first = datetime.date(year, 1, 1).toordinal()
+            last = datetime.date(year, 12, 31).toordinal()
+            return _expand_weekdays(first, last, self.weekdays)
+        else:
+            months = [self._start_month % 12 + 1]
+        days = []
+        for month in months:
+            days.extend(self._month_days(year, month))
+        return days
+
+    def _month_days(self, year, month):
+        # the days (ordinals) of `month` selected by BYMONTHDAY / BYDAY or
+        # the day of DTSTART
+        length = calendar.monthrange(year, month)[1]
+        first = datetime.date(year, month, 1).toordinal()
+        if self.month_days:
+            days = []
+            for month_day in self.month_days:
+                if month_day < 0:
+                    month_day += length + 1
+                if 1 <= month_day <= length:
+                    days.append(first + month_day - 1)
+            if self.weekdays:
+                days = [day for day in days
+                    if (day - 1) % 7 in self._plain_weekdays]
+            return days
+        if self.weekdays:
+            return _expand_weekdays(first, first + length - 1, self.weekdays)
+        if self._start_day > length:
+            return []
+        return [first + self._start_day - 1]
+
+    def _day_matches(self, ordinal):
+        # BYMONTH, BYMONTHDAY and BYDAY limit daily (and shorter) rules
+        if not (self.months or self.month_days or self.weekdays):
+            return True
+        if self.weekdays and not (ordinal - 1) % 7 in self._plain_weekdays:
+            return False
+        if not self._month_matches(ordinal):
+            return False
+        if self.month_days:
+            date = datetime.date.fromordinal(ordinal)
+            length = calendar.monthrange(date.year, date.month)[1]
+            if not (date.day in self.month_days or
+                date.day - length - 1 in self.month_days):
+                return False
+        return True
+
+    def _month_matches(self, ordinal):
+        return not self.months or \
+            datetime.date.fromordinal(ordinal).month in self.months
+
+def _expand_weekdays(first, last, weekdays):
+    # the days (ordinals) in [first, last] matching BYDAY `weekdays`, a list
+    # of tuples (n, weekday): every weekday (n == 0) or the n-th (from the
+    # end if n < 0)
+    days = []
+    for number, weekday in weekdays:
+        # the first day in the range with that weekday
+        day = first + (weekday - (first - 1) % 7) % 7
+        matching = range(day, last + 1, 7)
+        if number == 0:
+            days.extend(matching)
+        elif -len(matching) <= number <= len(matching) and not number == 0:
+            days.append(matching[number - 1 if number > 0 else number])
+    return days
+
+def _set_positions(candidates, positions):
+    # BYSETPOS: the candidates at `positions` (1-based, negative from the
+    # end)
+    selected = set()
+    for position in positions:
+        if 0 < position <= len(candidates):
+            selected.add(candidates[position - 1])
+        elif 0 < -position <= len(candidates):
+            selected.add(candidates[position])
+    return sorted(selected)
+
+def _numbers(text, lowest, highest):
+    if text == '':
+        return []
+    numbers = [int(number) for number in text.split(',')]
+    for number in numbers:
+        if not lowest <= number <= highest or number == 0 and lowest < 0:
+            raise ValueError
+    return numbers
+
+def _weekdays(text):
+    # "MO,-1FR" -> [(0, 0), (-1, 4)]
+    if text == '':
+        return []
+    weekdays = []
+    for day in text.split(','):
+        number = day[:-2]
+        weekdays.append((int(number) if number else 0, WEEKDAYS[day[-2:]]))
+    return weekdays
+
+def parse_dates(text, zones=None, local=False):
+    # the dates of an RDATE / EXDATE (";PARAMS:DATE,DATE,..."), as tuples
+    # (seconds since the epoch, `DateTime` type), local times with a TZID
+    # are converted to UTC using `zones` (`timezones.Zones`, default:
+    # `timezones.default_zones`) unless `local` is `True`
+    tzid = None if local else _tzid(text)
+    values = text.rpartition(':')[2]
+    dates = []
+    for value in values.split(','):
+        # a PERIOD ("START/END" or "START/DURATION") starts at START
+        value = value.partition('/')[0]
+        try:
+            value, date_type = datatypes.parse_date(value)
+        except ValueError:
+            logger.warning('ignoring invalid date "{}"'.format(value))
+            continue
+        if date_type == 2 and not tzid is None:
+            if zones is None:
+                zones = timezones.default_zones
+            value = zones.zone(tzid).to_utc(value)
+        dates.append((value, date_type))
+    return dates
+
+def _tzid(text):
+    # the TZID parameter of ";PARAMS:VALUE" or `None`
+    tzid = None
+    for parameter in text.rpartition(':')[0].split(';'):
+        if parameter[:5] == 'TZID=':
+            tzid = parameter[5:]
+    return tzid
+
+def _duration(component, start, date_only):
+    # the length of an occurrence in seconds: DTEND - DTSTART, DURATION or
+    # a day for dates (RFC 5545 3.6.1)
+    if start is None:
+        return 0
+    end = component.get('DTEND')
+    if not end is None and isinstance(end.value, int):
+        return max(0, end.value - start)
+    duration = component.get('DURATION')
+    if not duration is None:
+        found = _DURATION.match(duration.value.rpartition(':')[2])
+        if not found is None:
+            weeks, days, hours, minutes, seconds = [int(number or 0)
+                for number in found.groups()[1:]]
+            return max(0, (((weeks * 7 + days) * 24 + hours) * 60 +
+                minutes) * 60 + seconds)
+    return _DAY if date_only else 0
+
+def _allowed_ranges(rule):
+    # the ranges [start, end) (`None`: open) of dates satisfying every term
+    # of `rule`
+    ranges = [(None, None)]
+    for term in rule.terms:
+        if not isinstance(term, rules.Term):
+            # lists never match dates
+            if term.matches_date(0):
+                continue
+            return []
+        start, end = term.date_range()
+        if term.include:
+            ranges = [(_max(range_start, start), _min(range_end, end))
+                for range_start, range_end in ranges]
+        else:
+            excluded = []
+            for range_start, range_end in ranges:
+                excluded.append((range_start, _min(range_end, start)))
+                excluded.append((_max(range_start, end), range_end))
+            ranges = excluded
+        ranges = [(range_start, range_end) for range_start, range_end
+            in ranges if range_start is None or range_end is None or
+            range_start < range_end]
+    return ranges
+
+def _max(value, other):
+    # `None` is the open lower end
+    return other if value is None else max(value, other)
+
+def _min(value, other):
+    # `None` is the open upper end
+    return other if value is None else min(value, other)
+
+def csv_rows(component, name, properties, start, end):
+    """
+    The `.csv`-rows (see `Component.csv_row`) of the occurrences of
+    `component` starting in [start, end), one per occurrence: DTSTART, DTEND
+    (if the component has one) and RECURRENCE-ID are those of the
+    occurrence, the columns of RRULE, RDATE and EXDATE are left empty.
+    Components without DTSTART have no occurrences.
+    """
+    row = component.csv_row(name, properties)
+    if row is None:
+        return []
+    recurrence = component.recurrence()
+    occurrences = recurrence.between(start, end)
+    if not occurrences:
+        return []
+    if not (recurrence.rules or recurrence.dates):
+        return [row]
+    columns = {}
+    for column, property_name in enumerate(properties):
+        columns[property_name] = column
+    for property_name in ('RRULE', 'RDATE', 'EXDATE'):
+        if property_name in columns:
+            row[columns[property_name]] = None
+    dtstart = component.get('DTSTART')
+    has_end = not component.get('DTEND') is None
+    if recurrence.zone is None:
+        times = [(occurrence, None) for occurrence in occurrences]
+    else:
+        # the wall-clock times the occurrences were generated for
+        times = recurrence.iter_local_between(start, end)
+    rows = []
+    for occurrence, local in times:
+        occurrence_row = list(row)
+        values = [('DTSTART', occurrence, local),
+            ('RECURRENCE-ID', occurrence, local)]
+        if has_end:
+            values.append(('DTEND', occurrence + recurrence.duration, None))
+        for property_name, value, local_value in values:
+            if property_name in columns:
+                occurrence_row[columns[property_name]] = _csv_date(
+                    property_name, value, dtstart, local_value)
+        rows.append(occurrence_row)
+    return rows
+
+def _csv_date(name, value, dtstart, local=None):
+    # formatted like DTSTART (type and TZID), `local` is the wall-clock time
+    # to write instead of `value` converted to the time zone of DTSTART
+    date = datatypes.DateTime(name)
+    date.type = dtstart.type
+    date._tzid = dtstart._tzid
+    date._zone = dtstart._zone
+    if local is None:
+        date.value = value
+    else:
+        date._value = local
+    return date.csv_value()
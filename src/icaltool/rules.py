@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+
+import datetime
+import calendar
+import re
+import logging
+
+from . import datatypes
+
+logger = logging.getLogger(__name__)
+
+def compile_rules(rules, date_properties=None):
+    """
+    Turn a rule string, e.g., `COMPONENT:+VEVENT;DTSTART:+2015to2017` into a
+    `Filter` which can be applied to any number of calendars.
+
+    The terms of rules on `date_properties` (names of properties holding
+    dates, default: those of `datatypes.default_schema`) are parsed as date
+    ranges right away. Raises a `ValueError` if the rules cannot be
+    compiled.
+    """
+    # example component rule:
+    #  - keep only events:
+    #    COMPONENT:+VEVENT
+    #  - filter out all events:
+    #    COMPONENT:-VEVENT
+    #  - filter out all events and alarms
+    #    COMPONENT:-VEVENT,VALARM
+    # example property rules:
+    #  - filter out all components with a start date between 2015 and 2017:
+    #    DTSTART:-2015to2017
+    #  - keep only components with a start date between 2015-10 and 2017-11:
+    #    DTSTART:+2015-10to2017-11
+    #  - ... attended by john.doe@mail.domain:
+    #    DTSTART:+2015-10to2017-11;ATTENDEE:+john.doe@mail.domain
+    #  - ... but not by jane.doe@mail.domain:
+    #    ...;ATTENDEE:+john.doe@mail.domain|-jane.doe@mail.domain
+    #  - ... nor by anyone listed in deny.txt (one term per line):
+    #    ...;ATTENDEE:+john.doe@mail.domain|-@in(deny.txt)
+
+    raw_rules = rules.split(';')
+    parsed_rules = {}
+    for raw_rule in raw_rules:
+        try:
+            name, rule = raw_rule.split(':')
+        except ValueError:
+            # no ':'
+            logger.warning('malformed rule {}'.format(raw_rule))
+            continue
+        logger.info('found rule for {}: "{}"'.format(name, rule))
+        parsed_rules[name] = rule.split('|')
+
+    try:
+        component_rule = parsed_rules['COMPONENT'][0]
+        logger.debug('found component rule: "{}"'.format(component_rule))
+
+        # sanity check
+        if not re.match('[+-]{1}[A-Z,]+', component_rule):
+            logger.error('component filter cannot have inclusion and ' +
+                'exclusion criteria, "{}" given'.format(component_rule))
+            raise ValueError
+
+        components_keep = component_rule[0] == '+'
+        components = component_rule[1:].split(',')
+        del parsed_rules['COMPONENT']
+    except KeyError:
+        # no component rule
+        # create an empty list of components to remove
+        components = []
+        components_keep = False
+
+    if date_properties is None:
+        date_properties = datatypes.default_schema.date_properties()
+    property_rules = {}
+    for name, terms in parsed_rules.items():
+        property_rules[name] = PropertyRule(name, terms)
+        if name in date_properties:
+            property_rules[name].check_dates()
+
+    return Filter(components, components_keep, property_rules)
+
+class Filter:
+    """
+    Compiled rules for filtering components.
+
+    `components` is a set of component names which are to be kept
+    (`components_keep == True`) or removed, `property_rules` maps a property
+    name to a `PropertyRule`. With `occurrences` date rules on DTSTART /
+    DTEND are satisfied by recurring components if any of their occurrences
+    satisfies them (see `recurrence.Recurrence.matches`).
+    """
+    def __init__(self, components, components_keep, property_rules,
+        occurrences=False):
+        self.components = frozenset(components)
+        self.components_keep = components_keep
+        self.property_rules = property_rules
+        self.occurrences = occurrences
+
+    def accepts_component(self, name):
+        # decide by the name of the component
+        return (name in self.components) == self.components_keep
+
+    def add_terms(self, name, terms, include=True, match='contains'):
+        """
+        Add a list of terms for the property `name`, see `TermList`. With
+        `include` the property needs to match one of the terms, otherwise it
+        may not match any of them.
+        """
+        try:
+            rule = self.property_rules[name]
+        except KeyError:
+            rule = PropertyRule(name, [])
+            self.property_rules[name] = rule
+        rule.terms.append(TermList(terms, include, match))
+
+class PropertyRule:
+    """
+    All terms applied to properties of one name, a property needs to satisfy
+    every term.
+    """
+    # number of plain exclusion terms (e.g. `-jane.doe@mail.domain`) from
+    # which on they are searched for using a single `TermList`
+    combine_terms = 8
+
+    def __init__(self, name, terms):
+        self.name = name
+        # the terms as given, dates (and the index, the columns) use them
+        self.terms = []
+        for term in terms:
+            list_term = _list_term(term)
+            if list_term is None:
+                self.terms.append(Term(term))
+            else:
+                self.terms.append(list_term)
+        # the terms used by `matches`, compiled again if `terms` grew (see
+        # `Filter.add_terms`)
+        self._text_terms = None
+        self._compiled_terms = -1
+
+    def check_dates(self):
+        # parse the date ranges of all terms now, raises a `ValueError` if
+        # one cannot be parsed or is a regular expression (dates are compared
+        # as times, not as text)
+        for term in self.terms:
+            if isinstance(term, Term):
+                if not term.regex is None:
+                    logger.error('regular expression "{}" in rule for {} '
+                        'which holds dates, use a date range'.format(
+                        term.search, self.name))
+                    raise ValueError
+                try:
+                    term.date_range()
+                except ValueError:
+                    logger.error('invalid date range "{}" in rule for {}'
+                        .format(term.search, self.name))
+                    raise
+
+    def _compile_text_terms(self):
+        # plain exclusion terms are searched for at once
+        text_terms = []
+        excluded = []
+        for term in self.terms:
+            if isinstance(term, Term) and not term.include and \
+                term.regex is None:
+                excluded.append(term)
+            else:
+                text_terms.append(term)
+        if len(excluded) >= self.__class__.combine_terms:
+            # the value may not contain any of them
+            text_terms.append(TermList([term.search for term in excluded],
+                False, 'contains'))
+        else:
+            text_terms.extend(excluded)
+        self._text_terms = text_terms
+        self._compiled_terms = len(self.terms)
+
+    def matches(self, value):
+        # `value` is the value of a `datatypes.Property` (`str`)
+        if not self._compiled_terms == len(self.terms):
+            self._compile_text_terms()
+        for term in self._text_terms:
+            if not term.matches(value):
+                return False
+        return True
+
+    def matches_date(self, value):
+        # `value` is the value of a `datatypes.DateTime` (seconds since the
+        # epoch)
+        for term in self.terms:
+            if not term.matches_date(value):
+                return False
+        return True
+
+class Term:
+    """
+    A single term, e.g., `+john.doe@mail.domain`, `-re(^Meeting)` or
+    `+2015-10to2017-11`.
+
+    Plain terms are searched for in the whole value (including the
+    parameters of the property), regular expressions are matched (like
+    `re.match`) against the value without the parameters, e.g.
+    `mailto:john@mail.domain` for `ATTENDEE;CN=John:mailto:john@mail.domain`.
+
+    Regular expressions are compiled once (a `ValueError` is raised if one
+    is invalid), date ranges are only parsed the first time the term is
+    applied to a date (see `PropertyRule.check_dates`).
+    """
+    def __init__(self, term):
+        self.term = term
+        # "+": the value needs to match, "-": the value may not match
+        self.include = term[:1] == '+'
+        self.search = term[1:]
+        self.regex = None
+        if self.search[:3] == 're(' and self.search[-1:] == ')':
+            try:
+                self.regex = re.compile(self.search[3:-1])
+            except re.error as error:
+                logger.error('invalid regular expression "{}" ({})'.format(
+                    self.search[3:-1], error))
+                raise ValueError
+        self._date_range = None
+
+    def matches(self, value):
+        if self.regex is None:
+            found = value.find(self.search) > -1
+        else:
+            found = not self.regex.match(value_part(value)) is None
+        return found == self.include
+
+    def matches_date(self, value):
+        start, end = self.date_range()
+        return (start <= value < end) == self.include
+
+    def date_range(self):
+        if self._date_range is None:
+            self._date_range = parse_date_range(self.search)
+        return self._date_range
+
+# "@" keeps plain terms like `+in(person)` searched for as they are
+_LIST_TERM = re.compile(r'@(in|is|re-in)\((.+)\)\Z')
+
+def _list_term(term):
+    # a `TermList` if `term` is `[+-]@in(FILE)`, `[+-]@is(FILE)` or
+    # `[+-]@re-in(FILE)`
+    found = _LIST_TERM.match(term[1:])
+    if found is None:
+        return None
+    match = {'in': 'contains', 'is': 'exact', 're-in': 'regex'}[
+        found.group(1)]
+    return TermList(read_terms(found.group(2)), term[:1] == '+', match)
+
+def read_terms(file_name):
+    """
+    Read a list of terms from a file, one per line. Empty lines and lines
+    starting with "#" are skipped. Raises a `ValueError` if the file cannot
+    be read.
+    """
+    try:
+        with open(file_name, 'r', encoding='utf-8') as file_handle:
+            terms = []
+            for line in file_handle:
+                line = line.rstrip('\r\n')
+                if line == '' or line[:1] == '#':
+                    continue
+                terms.append(line)
+    except OSError as error:
+        logger.error('could not read terms from "{}" ({})'.format(file_name,
+            error))
+        raise ValueError
+    logger.info('read {} terms from {}'.format(len(terms), file_name))
+    return terms
+
+class TermList:
+    """
+    Many terms evaluated at once: the value matches if it
+     - contains one of the terms (`match == 'contains'`, using an
+       `AhoCorasick` automaton),
+     - is one of the terms (`'exact'`, using a set), the value without the
+       parameters of the property is compared, e.g. `mailto:john@mail.domain`
+       for `ATTENDEE;CN=John:mailto:john@mail.domain`,
+     - matches one of the regular expressions (`'regex'`, like `re.match`
+       using a single combined expression), the value without the
+       parameters is matched.
+
+    Like `Term` it is satisfied if the value matches and `include` is `True`
+    or the value does not match and `include` is `False`.
+    """
+    def __init__(self, terms, include=True, match='contains'):
+        terms = list(terms)
+        self.include = include
+        self.match = match
+        self.size = len(terms)
+        if match == 'contains':
+            self._matcher = AhoCorasick(terms).search
+        elif match == 'exact':
+            terms = frozenset(terms)
+            self._matcher = lambda value: value_part(value) in terms
+        elif match == 'regex':
+            try:
+                regex = re.compile('|'.join(['(?:{})'.format(term)
+                    for term in terms]))
+            except re.error as error:
+                logger.error('invalid regular expression in term list ' +
+                    '({})'.format(error))
+                raise ValueError
+            self._matcher = lambda value: not regex.match(
+                value_part(value)) is None
+        else:
+            logger.error('unknown kind of match "{}"'.format(match))
+            raise ValueError
+
+    def matches(self, value):
+        return self._matcher(value) == self.include
+
+    def matches_date(self, value):
+        # dates never match any of the terms
+        return not self.include
+
+def value_part(value):
+    # ";PARAM=PARAMVALUE:VALUE" or ":VALUE" -> "VALUE", parameter values may
+    # contain ":" if they are quoted
+    if value[:1] == ':':
+        return value[1:]
+    quoted = False
+    for position, character in enumerate(value):
+        if character == '"':
+            quoted = not quoted
+        elif character == ':' and not quoted:
+            return value[position + 1:]
+    return value
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton finding any of a list of strings in a text in
+    one pass over the text, regardless of the number of strings.
+    """
+    def __init__(self, patterns):
+        # per state: transitions (character -> state), failure link and
+        # whether a pattern ends here (or at a state reached by failure
+        # links)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [False]
+        for pattern in patterns:
+            state = 0
+            for character in pattern:
+                try:
+                    state = self._goto[state][character]
+                except KeyError:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(False)
+                    self._goto[state][character] = len(self._goto) - 1
+                    state = len(self._goto) - 1
+            self._out[state] = True
+
+        # failure links in breadth-first order
+        queue = list(self._goto[0].values())
+        position = 0
+        while position < len(queue):
+            state = queue[position]
+            position += 1
+            for character, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and not character in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(character, 0)
+                self._fail[next_state] = fail
+                if self._out[fail]:
+                    self._out[next_state] = True
+
+    def search(self, text):
+        # `True` if `text` contains any of the patterns
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        if out[0]:
+            # the empty string is contained in everything
+            return True
+        state = 0
+        for character in text:
+            while True:
+                next_state = goto[state].get(character)
+                if not next_state is None:
+                    state = next_state
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if out[state]:
+                return True
+        return False
+
+def parse_date_range(search):
+    """
+    Parse `YYYY`, `YYYY-MM`, `YYYY-MM-DD` or `STARTtoEND` into a tuple of
+    seconds since the epoch (start inclusive, end exclusive).
+    """
+    if search.find('to') > -1:
+        start, end = search.split('to')
+    else:
+        start = search
+        end = search
+
+    start = _parse_date(start)
+    end = _parse_date(end)
+    # the end is exclusive so move it to the beginning of the next
+    # year / month / day
+    if end[1] == 'year':
+        end = end[0].replace(year=end[0].year + 1)
+    elif end[1] == 'month':
+        if end[0].month == 12:
+            end = end[0].replace(year=end[0].year + 1, month=1)
+        else:
+            end = end[0].replace(month=end[0].month + 1)
+    elif end[1] == 'day':
+        end = end[0] + datetime.timedelta(days=1)
+    else:
+        end = end[0]
+
+    return (_epoch(start[0]), _epoch(end))
+
+def _parse_date(value):
+    try:
+        if len(value) == 4:
+            return (datetime.datetime(int(value), 1, 1), 'year')
+        elif len(value) == 7:
+            return (datetime.datetime(int(value[:4]), int(value[5:]), 1),
+                'month')
+        elif len(value) == 10:
+            return (datetime.datetime(
+                int(value[:4]), int(value[5:7]), int(value[8:])), 'day')
+        return (datetime.datetime.strptime(value, '%Y%m%dT%H%M%S'), None)
+    except ValueError:
+        logger.error('could not parse date "{}" in rule'.format(value))
+        raise
+
+def _epoch(value):
+    # use the same representation as `datatypes.DateTime`
+    return calendar.timegm(value.timetuple())
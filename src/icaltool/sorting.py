@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+
+import heapq
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+
+from . import datatypes
+from . import rules
+
+logger = logging.getLogger(__name__)
+
+# bytes of text buffered (all sorted outputs together) before sorted runs are
+# written to temporary files, see `SortedWriter`
+MEMORY_LIMIT = 256 * 2**20
+# what a buffered record costs besides its text (tuples, key, list entry)
+RECORD_SIZE = 200
+# bytes of text pickled at once, a run is read back one batch at a time so
+# merging needs about `MERGE_WIDTH` batches of memory
+BATCH_SIZE = 1 << 16
+# runs merged at once, more runs are merged in several passes so only this
+# many files are open
+MERGE_WIDTH = 64
+
+# properties an occurrence of a recurring component has a value of its own
+# for (see `writer.CSVWriter` expanding occurrences)
+OCCURRENCE_PROPERTIES = ('DTSTART', 'DTEND', 'RECURRENCE-ID')
+
+def sort_key(component, name):
+    """
+    The key sorting `component` by its property `name`: time zones
+    (VTIMEZONE) come first, then the components having the property by its
+    value (dates by their time in UTC, other values by their text without
+    parameters) and components without it last.
+    """
+    if component.name == 'VTIMEZONE':
+        return (0,)
+    prop = component.get(name)
+    if prop is None:
+        return (3,)
+    value = prop.value
+    if value is None:
+        return (3,)
+    if isinstance(value, str):
+        return (2, rules.value_part(value))
+    return (1, value)
+
+class SortedWriter:
+    """
+    Write components to `output` (a `writer.ICalWriter` or
+    `writer.CSVWriter`) sorted by their property `name` (see `sort_key`),
+    the order of components with equal keys is kept.
+
+    The text `output` would write for a component is buffered together with
+    its key when the component is written, so the component may change
+    afterwards (e.g. when streaming). Once the buffer holds more than
+    `memory_limit` bytes it is sorted and written to a temporary file in
+    `directory` (default: the system's) as a run. On `close()` the buffer
+    and the runs are merged and written to `output`, the temporary files
+    are removed. If everything fits into the buffer no file is written.
+    """
+    def __init__(self, output, name, memory_limit=MEMORY_LIMIT,
+        directory=None):
+        self.output = output
+        self.name = name
+        self.memory_limit = memory_limit
+        self.directory = directory
+        # list of tuples (key, number written before, text)
+        self._buffer = []
+        self._size = 0
+        self._written = 0
+        # file names of the runs written so far
+        self._runs = []
+        self._run_number = 0
+        self._temporary_directory = None
+
+    def write(self, component):
+        texts = self.output.format(component)
+        if not texts:
+            return
+        keys = self._keys(component, len(texts))
+        buffer = self._buffer
+        for key, text in zip(keys, texts):
+            buffer.append((key, self._written, text))
+            self._written += 1
+            self._size += len(text) + RECORD_SIZE
+        if self._size > self.memory_limit:
+            self._spill()
+
+    def _keys(self, component, count):
+        key = sort_key(component, self.name)
+        expand = getattr(self.output, 'expand', None)
+        if count == 1 or expand is None or \
+            not self.name in OCCURRENCE_PROPERTIES or \
+            (self.name == 'DTEND' and component.get('DTEND') is None):
+            return [key] * count
+        # a row per occurrence (see `recurrence.csv_rows`), sorted by the
+        # values of the occurrence
+        recurrence = component.recurrence()
+        offset = recurrence.duration if self.name == 'DTEND' else 0
+        return [(1, occurrence + offset) for occurrence
+            in recurrence.between(*expand)]
+
+    def _spill(self):
+        # write the sorted buffer to a new run
+        self._buffer.sort()
+        self._runs.append(self._write_run(self._buffer))
+        logger.info('sorted run {} of {} ({} records) written'.format(
+            len(self._runs), self.output.file_name, len(self._buffer)))
+        stats = datatypes.current_stats()
+        if not stats is None:
+            stats.count('sort_runs_spilled')
+        self._buffer = []
+        self._size = 0
+
+    def _write_run(self, records):
+        if self._temporary_directory is None:
+            self._temporary_directory = tempfile.mkdtemp(
+                prefix='icaltool-sort-', dir=self.directory)
+        self._run_number += 1
+        file_name = os.path.join(self._temporary_directory,
+            '{}.run'.format(self._run_number))
+        with open(file_name, 'wb') as file_handle:
+            batch = []
+            size = 0
+            for record in records:
+                batch.append(record)
+                size += len(record[2])
+                if size >= BATCH_SIZE:
+                    pickle.dump(batch, file_handle, pickle.HIGHEST_PROTOCOL)
+                    batch = []
+                    size = 0
+            if batch:
+                pickle.dump(batch, file_handle, pickle.HIGHEST_PROTOCOL)
+        return file_name
+
+    def _merge_runs(self):
+        # merge runs until at most `MERGE_WIDTH` are left
+        while len(self._runs) > MERGE_WIDTH:
+            runs = self._runs[:MERGE_WIDTH]
+            merged = self._write_run(heapq.merge(*map(_read_run, runs)))
+            for file_name in runs:
+                os.remove(file_name)
+            self._runs = self._runs[MERGE_WIDTH:] + [merged]
+            logger.debug('merged %s runs of %s', len(runs),
+                self.output.file_name)
+
+    def close(self):
+        try:
+            self._buffer.sort()
+            if self._runs:
+                self._merge_runs()
+                records = heapq.merge(self._buffer,
+                    *map(_read_run, self._runs))
+            else:
+                records = self._buffer
+            write_text = self.output.write_text
+            for record in records:
+                write_text(record[2])
+        finally:
+            self._buffer = []
+            self.output.close()
+            if not self._temporary_directory is None:
+                shutil.rmtree(self._temporary_directory, ignore_errors=True)
+                self._temporary_directory = None
+
+def _read_run(file_name):
+    # the records of a run in order
+    with open(file_name, 'rb') as file_handle:
+        while True:
+            try:
+                batch = pickle.load(file_handle)
+            except EOFError:
+                return
+            yield from batch
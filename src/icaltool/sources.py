@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import urllib.request
+
+from . import datatypes
+from . import merge
+from . import reader
+from . import stats as run_stats
+
+logger = logging.getLogger(__name__)
+
+class Fetcher:
+    """
+    Gets the content of calendar sources, e.g. files or URLs.
+
+    Derive from this class and pass instances to `aload_many` to support
+    other kinds of sources (or to replace a server by a local stand-in).
+    """
+    def handles(self, source):
+        # whether this fetcher can get `source`
+        return False
+
+    async def fetch(self, source):
+        # return the content of `source` (`bytes`), raise an `OSError` if
+        # it cannot be read
+        raise NotImplementedError
+
+class FileFetcher(Fetcher):
+    """
+    Reads local files (in the default executor of the event loop).
+    """
+    def handles(self, source):
+        return not _is_url(source)
+
+    async def fetch(self, source):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _read_file, source)
+
+class URLFetcher(Fetcher):
+    """
+    Downloads `http://` and `https://` URLs using `urllib` (in the default
+    executor of the event loop).
+    """
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+
+    def handles(self, source):
+        return _is_url(source)
+
+    async def fetch(self, source):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._download, source)
+
+    def _download(self, source):
+        with urllib.request.urlopen(source, timeout=self.timeout) as response:
+            return response.read()
+
+def default_fetchers():
+    return [URLFetcher(), FileFetcher()]
+
+async def aload_many(sources, fetchers=None, concurrency=8, executor=None,
+    lazy=False, schema=None):
+    """
+    Fetch and parse the `.ics`-`sources` (file names or URLs) concurrently
+    and merge them into one `datatypes.VCALENDAR`.
+
+    At most `concurrency` sources are fetched and parsed at the same time.
+    Each source is fetched by the first of `fetchers` (default:
+    `default_fetchers()`) that handles it and parsed in `executor` (default:
+    the default executor of the event loop, pass a
+    `concurrent.futures.ProcessPoolExecutor` to parse using several cores).
+
+    The components are merged in the order of `sources`, see `merge.merge`.
+    Every source is parsed using a copy of `schema` (default:
+    `datatypes.default_schema`), properties unknown to it are added to
+    `schema` in the order of `sources` afterwards so the result does not
+    depend on which source was parsed first. Returns a tuple (vcalendar,
+    list of the sources that could not be loaded).
+    """
+    if fetchers is None:
+        fetchers = default_fetchers()
+    if schema is None:
+        schema = datatypes.default_schema
+    semaphore = asyncio.Semaphore(concurrency)
+    definitions = schema.as_dict()
+    # counted by `parse` wherever it runs and added up here
+    stats = datatypes.current_stats()
+
+    async def load(source):
+        async with semaphore:
+            try:
+                fetcher = next(fetcher for fetcher in fetchers
+                    if fetcher.handles(source))
+            except StopIteration:
+                logger.error('no fetcher for "{}"'.format(source))
+                return None
+            try:
+                data = await fetcher.fetch(source)
+            except (OSError, ValueError) as error:
+                logger.error('could not fetch "{}" ({})'.format(source,
+                    error))
+                return None
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(executor, parse, data,
+                    lazy, definitions, not stats is None)
+            except (UnicodeDecodeError, ValueError) as error:
+                logger.error('could not parse "{}" ({})'.format(source,
+                    error))
+                return None
+
+    results = await asyncio.gather(*[load(source) for source in sources])
+
+    calendars = []
+    failed = []
+    for source, result in zip(sources, results):
+        if result is None:
+            failed.append(source)
+            continue
+        calendar, unknown_properties, counters = result
+        schema.register(unknown_properties)
+        if not stats is None:
+            stats.counters.update(counters)
+        calendars.append(calendar)
+        logger.info('loaded {} components of {}'.format(
+            len(calendar._components), source))
+    return (merge.merge(calendars), failed)
+
+def parse(data, lazy=False, definitions=None, count=False):
+    """
+    Parse the content of an `.ics`-file using a new `datatypes.Schema` with
+    `definitions` (see `Schema.as_dict`), returns a tuple (vcalendar,
+    properties unknown to `definitions`, see `Schema.new_properties`, the
+    counters of `stats.Stats` if `count` else `None`).
+    """
+    schema = datatypes.Schema(definitions)
+    before = schema.as_dict()
+    vcalendar = datatypes.VCALENDAR()
+    stats = run_stats.Stats(True) if count else None
+    with datatypes.counting(stats):
+        vcalendar.ical_parse(reader.ical_data_lines(data), lazy, schema)
+    return (vcalendar, schema.new_properties(before),
+        None if stats is None else dict(stats.counters))
+
+def _read_file(file_name):
+    with open(file_name, 'rb') as file_handle:
+        return file_handle.read()
+
+def _is_url(source):
+    return source[:7] == 'http://' or source[:8] == 'https://'
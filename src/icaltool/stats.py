@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import collections
+import contextlib
+import cProfile
+import logging
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+class Stats:
+    """
+    Collects the wall time and memory of every step (load, filter,
+    output, ...) and counts what happens to components and properties.
+
+    Counting is only done while `enabled` is `True`. After each step the peak
+    resident set size of the process so far is recorded (where available),
+    it only grows and so does not tell which step needed the memory. With
+    `trace_memory` (and `enabled`) the peak memory every single step needed
+    on top of what was allocated before is measured using `tracemalloc` as
+    well (which slows everything down).
+    """
+    def __init__(self, enabled=False, trace_memory=False):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        # list of dicts with "step", "detail", "time", "peak_memory" (needed
+        # by the step, `None` without `trace_memory`) and "peak_rss" (of the
+        # process)
+        self.steps = []
+        self.counters = collections.Counter()
+        # "COMPONENT.PROPERTY" of every unknown property that was found
+        self.unknown_properties = []
+        self._profile = None
+
+    def count(self, key, number=1):
+        self.counters[key] += number
+
+    def count_unknown_property(self, component, name):
+        self.unknown_properties.append('{}.{}'.format(component, name))
+
+    @contextlib.contextmanager
+    def step(self, name, detail=''):
+        # memory is only traced while enabled, nothing would report it
+        trace_memory = self.enabled and self.trace_memory
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            # what was allocated before is not needed by this step
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            if trace_memory:
+                peak_memory = tracemalloc.get_traced_memory()[1] - \
+                    start_memory
+            else:
+                peak_memory = None
+            if not resource is None:
+                # kilobytes on Linux
+                peak_rss = resource.getrusage(
+                    resource.RUSAGE_SELF).ru_maxrss * 1024
+            else:
+                peak_rss = None
+            self.steps.append({'step': name, 'detail': detail,
+                'time': duration, 'peak_memory': peak_memory,
+                'peak_rss': peak_rss})
+            logger.info('{} {} took {:.3f}s'.format(name, detail, duration))
+
+    def start_profile(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop_profile(self, file_name):
+        # write the profile to `file_name` (see `pstats`)
+        if self._profile is None:
+            return
+        self._profile.disable()
+        self._profile.dump_stats(file_name)
+        self._profile = None
+
+    def report(self):
+        lines = ['step          time   peak of step  peak RSS so far  detail']
+        for step in self.steps:
+            memory = [_mebibytes(step['peak_memory']),
+                _mebibytes(step['peak_rss'])]
+            lines.append('{:10} {:8.3f}s {:>14} {:>16}  {}'.format(
+                step['step'], step['time'], *memory, step['detail']))
+        if self.counters:
+            lines.append('')
+            for key in sorted(self.counters):
+                lines.append('{:24} {}'.format(key, self.counters[key]))
+        if self.unknown_properties:
+            lines.append('')
+            lines.append('unknown properties')
+            for name in self.unknown_properties:
+                lines.append('  ' + name)
+        return "\n".join(lines)
+
+def _mebibytes(size):
+    if size is None:
+        return '-'
+    return '{:.1f} MiB'.format(size / 2**20)
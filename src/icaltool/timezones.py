@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+
+import bisect
+import datetime
+import logging
+import threading
+
+try:
+    import zoneinfo
+except ImportError:
+    # Python < 3.9, only time zones defined by the calendars are known
+    zoneinfo = None
+
+from . import recurrence
+
+logger = logging.getLogger(__name__)
+
+# transitions are computed for [FIRST_YEAR, LAST_YEAR), later dates get the
+# offset of the last transition (zoneinfo is only asked for that range)
+FIRST_YEAR = 1900
+LAST_YEAR = 2200
+# zoneinfo is asked for the offset every `PROBE_DAYS` days, a change in
+# between is then looked for by bisection
+PROBE_DAYS = 7
+
+_DAY = 86400
+
+def _epoch(year):
+    return (datetime.date(year, 1, 1).toordinal() -
+        datetime.date(1970, 1, 1).toordinal()) * _DAY
+
+_FIRST = _epoch(FIRST_YEAR)
+_LAST = _epoch(LAST_YEAR)
+
+class OffsetTable:
+    """
+    The UTC offsets (seconds) of a time zone: `offsets[0]` applies before
+    the first transition, `offsets[i + 1]` from `transitions[i]` (seconds
+    since the epoch, UTC) on.
+
+    Local times are converted by bisection of the transitions in local
+    time. Local times skipped (the offset grows) or repeated (the offset
+    shrinks) by a transition get the offset before the transition (RFC 5545
+    3.3.5), i.e. skipped times move forward and repeated times are the
+    first of the two.
+    """
+    __slots__ = ('transitions', 'local_transitions', 'offsets')
+
+    def __init__(self, offset, transitions):
+        # `offset` applies before the first of `transitions` (list of tuples
+        # (UTC time, offset from then on))
+        self.transitions = []
+        self.local_transitions = []
+        self.offsets = [offset]
+        for utc, new_offset in sorted(transitions):
+            if new_offset == offset:
+                continue
+            self.transitions.append(utc)
+            self.local_transitions.append(utc + max(offset, new_offset))
+            self.offsets.append(new_offset)
+            offset = new_offset
+
+    def __len__(self):
+        return len(self.transitions)
+
+    def to_utc(self, local):
+        return local - self.offsets[
+            bisect.bisect_right(self.local_transitions, local)]
+
+    def from_utc(self, utc):
+        return utc + self.offsets[bisect.bisect_right(self.transitions, utc)]
+
+def from_vtimezone(vtimezone):
+    """
+    The `OffsetTable` of a VTIMEZONE (`datatypes.VTIMEZONE`) or `None` if
+    it has no usable STANDARD / DAYLIGHT component. The onsets are expanded
+    until `LAST_YEAR`.
+    """
+    transitions = []
+    first = None
+    for observance in vtimezone._components:
+        start = observance.get('DTSTART')
+        offset_from = _offset(observance.get('TZOFFSETFROM'))
+        offset_to = _offset(observance.get('TZOFFSETTO'))
+        if start is None or not isinstance(start.value, int) or \
+            offset_from is None or offset_to is None:
+            continue
+        # the onsets in local time (before the transition)
+        onsets = {start.value}
+        for prop in observance.get_all('RRULE'):
+            try:
+                rule = recurrence.RecurrenceRule(prop.value, start.value)
+            except (ValueError, KeyError):
+                logger.warning('ignoring invalid rule "{}" of {}'.format(
+                    prop.value, _name(vtimezone)))
+                continue
+            for onset in rule.iter_from():
+                if onset >= _LAST:
+                    break
+                onsets.add(onset)
+        for prop in observance.get_all('RDATE'):
+            onsets.update(value for value, _
+                in recurrence.parse_dates(prop.value))
+        for onset in onsets:
+            transitions.append((onset - offset_from, offset_to))
+        if first is None or start.value < first[0]:
+            first = (start.value, offset_from)
+    if first is None:
+        return None
+    return OffsetTable(first[1], transitions)
+
+def from_zoneinfo(tzid):
+    # the `OffsetTable` of the IANA time zone `tzid` (e.g. "Europe/Berlin")
+    # or `None` if zoneinfo does not know it
+    if zoneinfo is None:
+        return None
+    try:
+        zone = zoneinfo.ZoneInfo(tzid)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError, OSError):
+        return None
+
+    def offset(utc):
+        return int(datetime.datetime.fromtimestamp(utc, zone).utcoffset()
+            .total_seconds())
+
+    transitions = []
+    step = PROBE_DAYS * _DAY
+    previous = offset(_FIRST)
+    first = previous
+    for probe in range(_FIRST + step, _LAST + step, step):
+        current = offset(probe)
+        if current == previous:
+            continue
+        # the offset changed in (probe - step, probe]
+        low = probe - step
+        high = probe
+        while high - low > 1:
+            middle = (low + high) // 2
+            if offset(middle) == previous:
+                low = middle
+            else:
+                high = middle
+        transitions.append((high, current))
+        previous = current
+    return OffsetTable(first, transitions)
+
+# lines of a VTIMEZONE -> its `OffsetTable` or `None`, the same definition
+# (e.g. in every chunk or file) is only expanded once, at most
+# `MAX_DEFINITIONS` are kept
+_definitions = {}
+MAX_DEFINITIONS = 1000
+# name -> `OffsetTable` of zoneinfo or `None` if zoneinfo does not know it
+_zoneinfo_tables = {}
+_lock = threading.Lock()
+
+class Zone:
+    """
+    A time zone as a calendar (see `Zones`) means its TZID: the VTIMEZONE of
+    the calendar defining it, even if it follows the times using it, or
+    else the time zone of that name known to zoneinfo. Times of unknown time
+    zones are treated as UTC.
+    """
+    __slots__ = ('name', 'table', 'zones', '_warned')
+
+    def __init__(self, name, table, zones):
+        self.name = name
+        # `OffsetTable` or `None` if unknown
+        self.table = table
+        # the `Zones` the zone belongs to
+        self.zones = zones
+        self._warned = False
+
+    def to_utc(self, local):
+        # `local` (seconds since the epoch as if it was UTC) as seconds
+        # since the epoch
+        table = self.table
+        if table is None:
+            self._unknown()
+            return local
+        return table.to_utc(local)
+
+    def from_utc(self, utc):
+        # the opposite of `to_utc`
+        table = self.table
+        if table is None:
+            self._unknown()
+            return utc
+        return table.from_utc(utc)
+
+    def _unknown(self):
+        if not self._warned:
+            self._warned = True
+            logger.warning('unknown time zone "{}", its times are ' \
+                'treated as UTC'.format(self.name))
+
+class Zones:
+    """
+    The time zones (`Zone`) of one calendar by TZID. Every parse (see
+    `datatypes.Component.ical_iter`) uses its own, so the times of a
+    calendar only depend on its own VTIMEZONEs and not on the calendars
+    parsed before or after it (or at the same time).
+    """
+    def __init__(self):
+        # name -> `Zone`
+        self._zones = {}
+        # TZID parameter as given (e.g. with quotes) -> `Zone`
+        self._resolved = {}
+
+    def zone(self, tzid):
+        # the `Zone` of `tzid` (as given by the TZID parameter)
+        try:
+            return self._resolved[tzid]
+        except KeyError:
+            pass
+        name = tzid.partition(';')[0].strip('"')
+        zone = self._zones.get(name)
+        if zone is None:
+            zone = Zone(name, _zoneinfo_table(name), self)
+            self._zones[name] = zone
+        self._resolved[tzid] = zone
+        return zone
+
+    def define(self, vtimezone):
+        """
+        Use the VTIMEZONE `vtimezone` for its TZID, for the times read
+        before it, too.
+        """
+        name = _name(vtimezone)
+        if name is None:
+            return
+        table = _vtimezone_table(vtimezone)
+        if table is None:
+            logger.warning('cannot use the definition of time zone ' \
+                '"{}"'.format(name))
+            return
+        zone = self._zones.get(name)
+        if zone is None:
+            self._zones[name] = Zone(name, table, self)
+        else:
+            zone.table = table
+        logger.debug('time zone %s has %s transitions', name, len(table))
+
+    def define_all(self, components):
+        # `define` the VTIMEZONEs among `components`
+        for component in components:
+            if component.name == 'VTIMEZONE':
+                self.define(component)
+
+# for times parsed outside of a calendar, only knows the time zones of
+# zoneinfo (nothing is defined in it)
+default_zones = Zones()
+
+def _vtimezone_table(vtimezone):
+    definition = tuple(vtimezone.ical_lines())
+    try:
+        return _definitions[definition]
+    except KeyError:
+        pass
+    table = from_vtimezone(vtimezone)
+    with _lock:
+        if len(_definitions) >= MAX_DEFINITIONS:
+            _definitions.clear()
+        _definitions[definition] = table
+    return table
+
+def _zoneinfo_table(name):
+    try:
+        return _zoneinfo_tables[name]
+    except KeyError:
+        pass
+    with _lock:
+        if not name in _zoneinfo_tables:
+            _zoneinfo_tables[name] = from_zoneinfo(name)
+        return _zoneinfo_tables[name]
+
+def _name(vtimezone):
+    tzid = vtimezone.get('TZID')
+    if tzid is None:
+        return None
+    return tzid.value.rpartition(':')[2]
+
+def _offset(prop):
+    # "+0100", "-0530" or "+013045" in seconds
+    if prop is None:
+        return None
+    text = prop.value.rpartition(':')[2].strip()
+    if not len(text) in (5, 7) or not text[0] in '+-' or \
+        not text[1:].isdigit():
+        return None
+    seconds = int(text[1:3]) * 3600 + int(text[3:5]) * 60 + int(text[5:7] or 0)
+    return -seconds if text[0] == '-' else seconds
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+class View:
+    """
+    The result of filtering a component without changing it (see
+    `Component.select`): the positions of the child components that were
+    kept and, for kept children which have children of their own, their
+    views.
+
+    A view can be written like the component it was made from, its children
+    are the kept components (or their views). No component is copied.
+    """
+    __slots__ = ('component', 'positions', 'children')
+
+    def __init__(self, component, positions, children=None):
+        self.component = component
+        # positions in `component._components` (ascending)
+        self.positions = positions
+        # position -> `View` of that child
+        self.children = {} if children is None else children
+
+    @property
+    def name(self):
+        return self.component.name
+
+    def __len__(self):
+        return len(self.positions)
+
+    def components(self):
+        # the kept child components (or their views) in order
+        components = self.component._components
+        children = self.children
+        for position in self.positions:
+            try:
+                yield children[position]
+            except KeyError:
+                yield components[position]
+
+    def get(self, name, default=None):
+        return self.component.get(name, default)
+
+    def get_all(self, name):
+        return self.component.get_all(name)
+
+    def recurrence(self):
+        return self.component.recurrence()
+
+    def meets_criteria(self, rule_filter):
+        return self.component.meets_criteria(rule_filter)
+
+    def select(self, rule_filter):
+        # narrow the view down further
+        components = self.component._components
+        positions = []
+        children = {}
+        for position in self.positions:
+            component = components[position]
+            if not component.meets_criteria(rule_filter):
+                continue
+            positions.append(position)
+            if position in self.children:
+                children[position] = self.children[position].select(
+                    rule_filter)
+            elif component._components:
+                children[position] = component.select(rule_filter)
+        logger.debug('view of %s narrowed from %s to %s components',
+            self.name, len(self.positions), len(positions))
+        return View(self.component, positions, children)
+
+    def ical_write(self):
+        return list(self.ical_lines())
+
+    def ical_lines(self):
+        yield from self.component.ical_write_head()
+        for component in self.components():
+            yield from component.ical_lines()
+        yield from self.component.ical_write_tail()
+
+    def ical_write_head(self):
+        return self.component.ical_write_head()
+
+    def ical_write_tail(self):
+        return self.component.ical_write_tail()
+
+    def csv_row(self, component, properties=None, schema=None):
+        return self.component.csv_row(component, properties, schema)
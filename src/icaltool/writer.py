@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import csv
+import logging
+
+from . import recurrence
+
+logger = logging.getLogger(__name__)
+
+# lines may not be longer than 75 octets (excluding the line break), stay
+# one below as earlier versions did
+FOLD_OCTETS = 74
+BUFFER_SIZE = 1 << 20
+
+def ical_fold(line):
+    # fold lines longer than `FOLD_OCTETS` octets (UTF-8), continuation lines
+    # begin with a single whitespace, multi-octet characters are not split
+    if len(line) <= FOLD_OCTETS and (line.isascii() or
+        len(line.encode('utf-8')) <= FOLD_OCTETS):
+        return line + "\r\n"
+    data = line.encode('utf-8')
+    parts = []
+    start = 0
+    # the whitespace of continuation lines counts, too
+    width = FOLD_OCTETS
+    while len(data) - start > width:
+        end = start + width
+        # move back to the first octet of a character
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end])
+        start = end
+        width = FOLD_OCTETS - 1
+    parts.append(data[start:])
+    return str(b"\r\n ".join(parts), 'utf-8') + "\r\n"
+
+def ical_fold_lines(lines):
+    # fold and join several lines, most lines are short and ASCII-only so
+    # check all of them at once first
+    lines = list(lines)
+    if not lines:
+        return ''
+    text = "\r\n".join(lines)
+    if text.isascii() and max(map(len, lines)) <= FOLD_OCTETS:
+        return text + "\r\n"
+    return ''.join(map(ical_fold, lines))
+
+class _CSVFormatter:
+    # format rows using `csv.writer` without writing them to a file
+    def __init__(self):
+        self._rows = []
+        self._writer = csv.writer(self, quoting=csv.QUOTE_NOTNULL,
+            lineterminator='')
+
+    def write(self, text):
+        self._rows.append(text)
+
+    def format(self, row):
+        self._writer.writerow(row)
+        return self._rows.pop()
+
+if hasattr(csv, 'QUOTE_NOTNULL'):
+    # quote every value except `None` which is written as empty column
+    csv_format_row = _CSVFormatter().format
+else:
+    def csv_format_row(row):
+        # same as `csv.writer` with `csv.QUOTE_NOTNULL` (Python >= 3.12)
+        return ','.join(['' if value is None else
+            '"' + value.replace('"', '""') + '"' for value in row])
+
+class ICalWriter:
+    """
+    Write components to an `.ics`-file one at a time.
+
+    The head of the calendar ("BEGIN:VCALENDAR" and its properties) is written
+    before the first component, the tail on `close()`. Properties the
+    calendar gets after the first component was written (e.g. read after
+    it while streaming) cannot be written anymore, `close()` warns about
+    them.
+    """
+    def __init__(self, file_name, vcalendar):
+        self.file_name = file_name
+        self._vcalendar = vcalendar
+        self._head_written = False
+        # number of lines of the head written
+        self._head_lines = 0
+        logger.info('writing to {}'.format(file_name))
+        self._file_handle = open(file_name, 'w', encoding='utf-8',
+            newline='', buffering=BUFFER_SIZE)
+
+    def _write_lines(self, lines):
+        self._file_handle.write(ical_fold_lines(lines))
+
+    def _write_head(self):
+        if not self._head_written:
+            head = self._vcalendar.ical_write_head()
+            self._write_lines(head)
+            self._head_written = True
+            self._head_lines = len(head)
+
+    def write(self, component):
+        self._write_head()
+        self._write_lines(component.ical_lines())
+
+    def format(self, component):
+        # the text written for `component`, see `sorting.SortedWriter`
+        return [ical_fold_lines(component.ical_lines())]
+
+    def write_text(self, text):
+        # write text returned by `format`
+        self._write_head()
+        self._file_handle.write(text)
+
+    def close(self):
+        self._write_head()
+        missing = len(self._vcalendar.ical_write_head()) - self._head_lines
+        if missing > 0:
+            logger.warning('{} properties of {} following its first ' \
+                'component are not written to {}'.format(missing,
+                self._vcalendar.name, self.file_name))
+        self._write_lines(self._vcalendar.ical_write_tail())
+        self._file_handle.close()
+        logger.info('finished writing to {}'.format(self.file_name))
+
+class CSVWriter:
+    """
+    Write components of one type to a `.csv`-file one at a time.
+
+    The columns are fixed when the file is opened, properties defined later
+    on (e.g. unknown properties found while streaming) are not written.
+    With `expand` (a tuple of seconds since the epoch, start inclusive, end
+    exclusive) a row is written for every occurrence starting in that
+    window instead, see `recurrence.csv_rows`.
+    """
+    def __init__(self, file_name, component, properties, expand=None):
+        self.file_name = file_name
+        self.component = component
+        self.properties = properties
+        self.expand = expand
+        logger.info('writing to {}'.format(file_name))
+        self._file_handle = open(file_name, 'w', encoding='utf-8',
+            newline='', buffering=BUFFER_SIZE)
+        # build header
+        self._file_handle.write(csv_format_row(properties))
+
+    def write(self, component):
+        if not self.expand is None:
+            for row in recurrence.csv_rows(component, self.component,
+                self.properties, *self.expand):
+                self._file_handle.write("\r\n" + csv_format_row(row))
+            return
+        row = component.csv_row(self.component, self.properties)
+        if not row is None:
+            self._file_handle.write("\r\n" + csv_format_row(row))
+
+    def format(self, component):
+        # the rows written for `component` (none, one or one per occurrence)
+        # as text, see `sorting.SortedWriter`
+        if not self.expand is None:
+            return ["\r\n" + csv_format_row(row) for row in
+                recurrence.csv_rows(component, self.component,
+                self.properties, *self.expand)]
+        row = component.csv_row(self.component, self.properties)
+        if row is None:
+            return []
+        return ["\r\n" + csv_format_row(row)]
+
+    def write_text(self, text):
+        # write a row returned by `format`
+        self._file_handle.write(text)
+
+    def close(self):
+        self._file_handle.close()
+        logger.info('finished writing to {}'.format(self.file_name))
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import cache
+from icaltool.icaltool import ICalTool
+
+def write_calendar(file_name, summary, events=1):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+    for number in range(events):
+        lines.extend(['BEGIN:VEVENT', 'UID:{}'.format(number),
+            'DTSTAMP:20200101T000000Z', 'DTSTART:20200101T100000Z',
+            'SUMMARY:' + summary, 'END:VEVENT'])
+    lines.append('END:VCALENDAR')
+    with open(file_name, 'w', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+class ParseCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_directory = os.path.join(self.directory, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def calendar(self, name, summary='first', events=1):
+        file_name = os.path.join(self.directory, name)
+        write_calendar(file_name, summary, events)
+        return file_name
+
+    def load(self, file_name, max_size=1 << 30):
+        # the tool and its statistics after loading `file_name`
+        tool = ICalTool(stats=True, cache=cache.ParseCache(
+            self.cache_directory, max_size))
+        tool.ical_load(file_name)
+        return tool
+
+    def entries(self):
+        if not os.path.isdir(self.cache_directory):
+            return []
+        return sorted(os.listdir(self.cache_directory))
+
+    def test_hit_and_miss(self):
+        file_name = self.calendar('a.ics')
+        tool = self.load(file_name)
+        self.assertEqual(tool.stats.counters['cache_misses'], 1)
+        tool = self.load(file_name)
+        self.assertEqual(tool.stats.counters['cache_hits'], 1)
+        self.assertEqual(tool.vcalendar._components[0].get('SUMMARY').value,
+            ':first')
+
+    def test_changed_file(self):
+        file_name = self.calendar('a.ics')
+        self.load(file_name)
+        # same size, different content and time
+        write_calendar(file_name, 'other')
+        os.utime(file_name, (1, 1))
+        tool = self.load(file_name)
+        self.assertEqual(tool.stats.counters['cache_misses'], 1)
+        self.assertEqual(tool.vcalendar._components[0].get('SUMMARY').value,
+            ':other')
+        # only touched
+        os.utime(file_name, (2, 2))
+        tool = self.load(file_name)
+        self.assertEqual(tool.stats.counters['cache_hits'], 1)
+
+    def test_least_recently_used_are_evicted(self):
+        first = self.calendar('a.ics', events=20)
+        second = self.calendar('b.ics', events=20)
+        self.load(first)
+        size = sum(os.path.getsize(os.path.join(self.cache_directory, name))
+            for name in self.entries())
+        os.utime(os.path.join(self.cache_directory, self.entries()[0]),
+            (1, 1))
+        # room for one entry only
+        self.load(second, int(size * 1.5))
+        self.assertEqual(len(self.entries()), 1)
+        self.assertEqual(self.load(second, int(size * 1.5)).stats
+            .counters['cache_hits'], 1)
+
+    def test_entry_larger_than_the_cache(self):
+        small = self.calendar('a.ics')
+        large = self.calendar('b.ics', events=200)
+        self.load(small)
+        entries = self.entries()
+        max_size = int(os.path.getsize(large) * 0.6)
+        tool = self.load(large, max_size)
+        self.assertEqual(tool.stats.counters['cache_misses'], 1)
+        # not stored and nothing else removed for it
+        self.assertEqual(self.entries(), entries)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import columns
+from icaltool import icaltool
+from icaltool.icaltool import ICalTool
+
+LINES = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+for number in range(30):
+    LINES += ['BEGIN:VEVENT', 'UID:{}'.format(number),
+        'DTSTAMP:20200101T000000Z',
+        'DTSTART:{}{:02}01T100000Z'.format(2014 + number % 6,
+            number % 12 + 1),
+        'DTEND:{}{:02}01T110000Z'.format(2014 + number % 6, number % 12 + 1),
+        'SUMMARY:{} {}'.format(('Meeting', 'Lunch', 'Party')[number % 3],
+            number)]
+    if number % 4 == 0:
+        LINES += ['ATTENDEE;CN=Jane:mailto:jane@mail.domain']
+    if number % 5 == 0:
+        LINES += ['ATTENDEE:mailto:john@mail.domain']
+    if number % 10 == 0:
+        LINES += ['RRULE:FREQ=YEARLY;COUNT=5']
+    LINES += ['END:VEVENT']
+LINES += ['BEGIN:VTODO', 'UID:todo', 'DTSTAMP:20200101T000000Z',
+    'CREATED:20160101T000000Z', 'LAST-MODIFIED:20160101T000000Z',
+    'SUMMARY:Meeting notes', 'END:VTODO', 'END:VCALENDAR']
+
+RULES = ('DTSTART:+2015to2017', 'DTSTART:-2016|-2018;SUMMARY:+Meeting',
+    'DTEND:+2015-03to2019-05', 'ATTENDEE:+jane@|-john@',
+    'COMPONENT:+VEVENT;SUMMARY:-re(^Lunch)',
+    'SUMMARY:-Meeting;COMPONENT:-VTODO')
+
+class ColumnsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, 'in.ics')
+        with open(self.input, 'w', newline='') as file_handle:
+            file_handle.write('\r\n'.join(LINES) + '\r\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_tool(self, rules, file_name, **options):
+        args = argparse.Namespace(file=[self.input], stream=False,
+            component='VEVENT', lazy=False, dedupe=False, jobs=1,
+            index=False, columns=False)
+        for name, value in options.items():
+            setattr(args, name, value)
+        output = os.path.join(self.directory, file_name)
+        icaltool.run(ICalTool(), args, [('filter', rules),
+            ('output', output)])
+        with open(output, 'rb') as file_handle:
+            return file_handle.read()
+
+    @unittest.skipUnless(columns.numpy, 'needs numpy')
+    def test_same_as_without_columns(self):
+        for rules in RULES:
+            for file_name in ('out.ics', 'out.csv'):
+                self.assertEqual(self.run_tool(rules, file_name,
+                    columns=True), self.run_tool(rules, file_name),
+                    'differs for {}'.format(rules))
+
+    @unittest.skipUnless(columns.numpy, 'needs numpy')
+    def test_occurrences(self):
+        tool = ICalTool()
+        tool.load(self.input)
+        tool.occurrences = True
+        expected = tool.select('DTSTART:+2021')
+        self.assertTrue(len(expected))
+        tool.build_columns()
+        self.assertEqual(tool.select('DTSTART:+2021').positions,
+            expected.positions)
+
+    def test_without_numpy(self):
+        with unittest.mock.patch.object(columns, 'numpy', None):
+            tool = ICalTool()
+            tool.load(self.input)
+            with self.assertLogs(icaltool.logger, 'ERROR') as logs:
+                self.assertIsNone(tool.build_columns())
+            self.assertIn('pip install numpy', logs.output[0])
+            self.assertIsNone(tool.vcalendar.column_store)
+            # rules are applied without the columns
+            with self.assertLogs(icaltool.logger, 'ERROR'):
+                output = self.run_tool(RULES[0], 'out.ics', columns=True)
+        self.assertEqual(output, self.run_tool(RULES[0], 'out.ics'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+from icaltool import rules
+
+EVENTS = [
+    # UID, DTSTART, DTEND
+    ('short', '20200101T100000Z', '20200101T110000Z'),
+    ('decades', '19900101T000000Z', '20400101T000000Z'),
+    ('week', '20200105T000000Z', '20200112T000000Z'),
+    ('point', '20200110T000000Z', None),
+    ('later', '20210101T000000Z', '20210102T000000Z'),
+]
+
+def parse(events):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+    for uid, start, end in events:
+        lines.extend(['BEGIN:VEVENT', 'UID:' + uid,
+            'DTSTAMP:20200101T000000Z', 'DTSTART:' + start])
+        if not end is None:
+            lines.append('DTEND:' + end)
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_data_lines(
+        ('\r\n'.join(lines) + '\r\n').encode('utf-8')))
+    return vcalendar
+
+class OverlappingTest(unittest.TestCase):
+
+    def uids(self, vcalendar, window):
+        return [component.get('UID').value[1:] for component in
+            vcalendar.overlapping(*rules.parse_date_range(window))]
+
+    def test_windows(self):
+        vcalendar = parse(EVENTS)
+        self.assertEqual(self.uids(vcalendar, '2020-01-01'),
+            ['short', 'decades'])
+        self.assertEqual(self.uids(vcalendar, '2020-01-10'),
+            ['decades', 'week', 'point'])
+        self.assertEqual(self.uids(vcalendar, '2021'), ['decades', 'later'])
+        self.assertEqual(self.uids(vcalendar, '2045'), [])
+
+    def test_after_filter(self):
+        vcalendar = parse(EVENTS)
+        vcalendar.build_time_index()
+        vcalendar.filter(rules.compile_rules('UID:-short'))
+        self.assertEqual(self.uids(vcalendar, '2020-01'),
+            ['decades', 'week', 'point'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import icaltool
+from icaltool import writer
+from icaltool.icaltool import ICalTool
+
+def write_calendar(file_name, late_properties=()):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+    for number in range(6):
+        lines += ['BEGIN:VEVENT', 'UID:{}'.format(number),
+            'DTSTAMP:20200101T000000Z',
+            'DTSTART;TZID=Custom:20{:02}0101T100000'.format(15 + number),
+            'SUMMARY:' + ('Meeting', 'Lunch')[number % 2]]
+        if number == 2:
+            lines += ['BEGIN:VALARM', 'ACTION:DISPLAY', 'TRIGGER:-PT15M',
+                'END:VALARM']
+        lines += ['END:VEVENT']
+        if number == 0:
+            lines += list(late_properties)
+    lines += ['BEGIN:VTODO', 'UID:todo', 'DTSTAMP:20200101T000000Z',
+        'CREATED:20160101T000000Z', 'LAST-MODIFIED:20160101T000000Z',
+        'END:VTODO', 'BEGIN:VTIMEZONE', 'TZID:Custom', 'BEGIN:STANDARD',
+        'DTSTART:19700101T000000', 'TZOFFSETFROM:+0100', 'TZOFFSETTO:+0100',
+        'END:STANDARD', 'END:VTIMEZONE', 'END:VCALENDAR']
+    with open(file_name, 'w', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+class StreamOptionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, 'in.ics')
+        self.output = os.path.join(self.directory, 'out.ics')
+        write_calendar(self.input)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def run_stream(self, actions=None, **options):
+        args = argparse.Namespace(file=[self.input], stream=True,
+            component='VEVENT', lazy=False, dedupe=False, jobs=1,
+            index=False, columns=False)
+        for name, value in options.items():
+            setattr(args, name, value)
+        if actions is None:
+            actions = [('output', self.output)]
+        icaltool.run(ICalTool(), args, actions)
+
+    def read(self, file_name):
+        with open(os.path.join(self.directory, file_name), 'rb') as \
+            file_handle:
+            return file_handle.read()
+
+    def run_both(self, actions, **options):
+        # the outputs written with and without --stream
+        outputs = []
+        for stream in (True, False):
+            self.run_stream([(action, os.path.join(self.directory, value))
+                if action == 'output' else (action, value)
+                for action, value in actions], stream=stream, **options)
+            outputs.append([self.read(value)
+                for action, value in actions if action == 'output'])
+        return outputs
+
+    def test_streamed(self):
+        for lazy in (False, True):
+            streamed, loaded = self.run_both([('output', 'all.ics'),
+                ('output', 'all.csv'), ('filter', 'DTSTART:+2016to2018'),
+                ('output', 'dates.ics'), ('filter', 'SUMMARY:-Lunch'),
+                ('output', 'meetings.ics'), ('output', 'meetings.csv')],
+                lazy=lazy)
+            self.assertEqual(streamed, loaded)
+        self.assertEqual(streamed[0], self.read('in.ics'))
+        self.assertEqual(streamed[4].count(b'\r\n'), 1)
+
+    def test_late_calendar_properties(self):
+        write_calendar(self.input, ['X-WR-CALNAME:late'])
+        with self.assertLogs(writer.logger, 'WARNING') as logs:
+            streamed, loaded = self.run_both([('output', 'out.ics'),
+                ('output', 'out.csv')])
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('1 properties of VCALENDAR', logs.output[0])
+        # left out when streaming, placed in front of the components else
+        self.assertNotIn(b'X-WR-CALNAME', streamed[0])
+        self.assertIn(b'PRODID:test\r\nX-WR-CALNAME:late\r\nBEGIN:VEVENT',
+            loaded[0])
+        self.assertEqual(streamed[0], loaded[0].replace(
+            b'X-WR-CALNAME:late\r\n', b''))
+        self.assertEqual(streamed[1], loaded[1])
+
+    def test_options_needing_the_whole_calendar(self):
+        for option, value in (('dedupe', True), ('jobs', 2), ('index', True),
+            ('columns', True), ('file', [self.input, self.input])):
+            with self.assertLogs(icaltool.logger, 'ERROR') as logs:
+                self.run_stream(**{option: value})
+            self.assertFalse(os.path.exists(self.output))
+            if option != 'file':
+                self.assertIn('given: --' + option, logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
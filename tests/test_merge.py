@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import merge
+from icaltool import reader
+
+def parse(*lines, prodid='test'):
+    text = '\r\n'.join(('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:' + prodid) +
+        lines + ('END:VCALENDAR',)) + '\r\n'
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_data_lines(text.encode('utf-8')))
+    return vcalendar
+
+def event(uid, summary, *lines):
+    return ('BEGIN:VEVENT',) + (('UID:' + uid,) if uid else ()) + (
+        'DTSTART:20200101T100000Z', 'SUMMARY:' + summary) + lines + (
+        'END:VEVENT',)
+
+def timezone(tzid):
+    return ('BEGIN:VTIMEZONE', 'TZID:' + tzid, 'BEGIN:STANDARD',
+        'DTSTART:19701025T030000', 'TZOFFSETFROM:+0200', 'TZOFFSETTO:+0100',
+        'END:STANDARD', 'END:VTIMEZONE')
+
+def summaries(vcalendar):
+    return [component.get('SUMMARY').value[1:]
+        for component in vcalendar._components if component.name == 'VEVENT']
+
+class MergeTest(unittest.TestCase):
+
+    def test_components_in_order(self):
+        vcalendar = merge.merge([
+            parse(*(timezone('Zone/A') + event('1', 'a')), prodid='first'),
+            parse(*(timezone('Zone/A') + timezone('Zone/B') +
+                event('2', 'b')), prodid='second')])
+        self.assertEqual(summaries(vcalendar), ['a', 'b'])
+        # time zones only once, the properties of the first calendar
+        self.assertEqual([component.get('TZID').value
+            for component in vcalendar._components
+            if component.name == 'VTIMEZONE'], [':Zone/A', ':Zone/B'])
+        self.assertEqual(vcalendar.get('PRODID').value, ':first')
+
+class DedupeTest(unittest.TestCase):
+
+    def test_sequence_before_dtstamp(self):
+        vcalendar = parse(*(
+            event('1', 'old', 'SEQUENCE:1', 'DTSTAMP:20200301T000000Z') +
+            event('1', 'new', 'SEQUENCE:2', 'DTSTAMP:20200101T000000Z') +
+            event('1', 'older', 'DTSTAMP:20200401T000000Z')))
+        self.assertEqual(merge.dedupe(vcalendar), 2)
+        self.assertEqual(summaries(vcalendar), ['new'])
+
+    def test_dtstamp_before_last_modified(self):
+        vcalendar = parse(*(
+            event('1', 'old', 'DTSTAMP:20200101T000000Z',
+                'LAST-MODIFIED:20200501T000000Z') +
+            event('1', 'new', 'DTSTAMP:20200201T000000Z',
+                'LAST-MODIFIED:20200101T000000Z') +
+            event('1', 'same stamp', 'DTSTAMP:20200201T000000Z')))
+        merge.dedupe(vcalendar)
+        self.assertEqual(summaries(vcalendar), ['new'])
+
+    def test_last_modified(self):
+        vcalendar = parse(*(
+            event('1', 'old', 'LAST-MODIFIED:20200101T000000Z') +
+            event('1', 'new', 'LAST-MODIFIED:20200201T000000Z')))
+        merge.dedupe(vcalendar)
+        self.assertEqual(summaries(vcalendar), ['new'])
+
+    def test_positions(self):
+        # the newest takes the place of the first revision, occurrences
+        # (RECURRENCE-ID) and components without UID are kept
+        vcalendar = parse(*(
+            event('1', 'first', 'SEQUENCE:0') +
+            event('', 'no uid') +
+            event('2', 'second') +
+            event('2', 'occurrence', 'RECURRENCE-ID:20200108T100000Z') +
+            event('', 'no uid') +
+            event('1', 'first again', 'SEQUENCE:3')))
+        vcalendar.build_time_index()
+        self.assertEqual(merge.dedupe(vcalendar), 1)
+        self.assertEqual(summaries(vcalendar), ['first again', 'no uid',
+            'second', 'occurrence', 'no uid'])
+        self.assertEqual(len(vcalendar.time_index), 5)
+
+    def test_no_duplicates(self):
+        vcalendar = parse(*(event('1', 'a') + event('2', 'b')))
+        components = vcalendar._components
+        self.assertEqual(merge.dedupe(vcalendar), 0)
+        self.assertIs(vcalendar._components, components)
+
+if __name__ == '__main__':
+    unittest.main()
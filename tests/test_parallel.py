@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import parallel
+from icaltool import reader
+from icaltool.icaltool import ICalTool
+
+def event(number, *lines):
+    return ['BEGIN:VEVENT', 'UID:{}'.format(number),
+        'DTSTAMP:20200101T000000Z',
+        'DTSTART;TZID=Custom:202001{:02}T100000'.format(number % 28 + 1),
+        'DTEND:202001{:02}T120000Z'.format(number % 28 + 1),
+        'SUMMARY:event {}'.format(number)] + list(lines) + ['END:VEVENT']
+
+LINES = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+for number in range(40):
+    if number % 7 == 3:
+        # longer than a chunk
+        LINES += event(number, 'BEGIN:VALARM', 'ACTION:DISPLAY',
+            'TRIGGER:-PT15M', 'END:VALARM', *['X-LINE{}:{}'.format(line,
+            number) for line in range(12)])
+    else:
+        LINES += event(number)
+    if number == 20:
+        # a property of the calendar between the components
+        LINES += ['X-WR-CALNAME:test']
+# defined after the times using it
+LINES += ['BEGIN:VTIMEZONE', 'TZID:Custom', 'BEGIN:STANDARD',
+    'DTSTART:19700101T000000', 'TZOFFSETFROM:+0100', 'TZOFFSETTO:+0100',
+    'END:STANDARD', 'END:VTIMEZONE']
+# does not end
+LINES += ['BEGIN:VEVENT', 'UID:unterminated', 'DTSTAMP:20200101T000000Z',
+    'DTSTART:20200101T100000Z', 'END:VCALENDAR']
+
+def parse(jobs, chunk_size):
+    vcalendar = datatypes.VCALENDAR()
+    lines = reader.ical_data_lines(('\r\n'.join(LINES) + '\r\n').encode(
+        'utf-8'))
+    if jobs == 1:
+        vcalendar.ical_parse(lines)
+    else:
+        parallel.ical_parse(vcalendar, lines, jobs, chunk_size)
+    return vcalendar
+
+def uids(vcalendar):
+    return [(component.name, component.get('UID', component.get('TZID'))
+        .value) for component in vcalendar._components]
+
+def starts(vcalendar):
+    return [component.get('DTSTART').value
+        for component in vcalendar._components if component.name == 'VEVENT']
+
+class ParallelTest(unittest.TestCase):
+
+    def test_same_as_one_process(self):
+        expected = parse(1, None)
+        self.assertEqual(len(expected._components), 41)
+        for chunk_size in (1, 10, 25, 100000):
+            vcalendar = parse(2, chunk_size)
+            self.assertEqual(uids(vcalendar), uids(expected))
+            self.assertEqual([component.ical_write()
+                for component in vcalendar._components],
+                [component.ical_write()
+                for component in expected._components])
+            self.assertEqual(vcalendar.ical_write(), expected.ical_write())
+            # converted using the VTIMEZONE of another chunk
+            self.assertEqual(starts(vcalendar), starts(expected))
+
+    def test_malformed_calendar_property(self):
+        schema = datatypes.Schema({'VCALENDAR': {'X-REQUIRED': [1,
+            'DateTime']}})
+        lines = LINES[:3] + ['X-REQUIRED:not a date'] + LINES[3:]
+        results = []
+        for jobs in (1, 2):
+            vcalendar = datatypes.VCALENDAR()
+            data_lines = reader.ical_data_lines(('\r\n'.join(lines) +
+                '\r\n').encode('utf-8'))
+            with self.assertLogs(datatypes.logger, 'WARNING') as logs:
+                if jobs == 1:
+                    vcalendar.ical_parse(data_lines, schema=schema)
+                else:
+                    parallel.ical_parse(vcalendar, data_lines, jobs, 10,
+                        schema=schema)
+            self.assertTrue(any('X-REQUIRED' in line for line in logs.output))
+            results.append(uids(vcalendar))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(results[0]), 41)
+
+    def test_bounded_chunks_in_flight(self):
+        # parses in this process, counting the chunks submitted but not
+        # merged yet
+        pending = []
+        most_pending = []
+
+        class Executor:
+            def __init__(self, max_workers, initializer, initargs):
+                initializer(*initargs)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def submit(self, function, *args):
+                future = concurrent.futures.Future()
+                future.set_result(function(*args))
+                pending.append(future)
+                most_pending.append(len(pending))
+                real_result = future.result
+                def result():
+                    pending.remove(future)
+                    return real_result()
+                future.result = result
+                return future
+
+        with unittest.mock.patch.object(parallel, '_lazy'), \
+            unittest.mock.patch.object(parallel, '_schema'), \
+            unittest.mock.patch.object(parallel, '_stats'), \
+            unittest.mock.patch.object(parallel.concurrent.futures,
+            'ProcessPoolExecutor', Executor):
+            vcalendar = parse(3, 1)
+        self.assertEqual(uids(vcalendar), uids(parse(1, None)))
+        self.assertEqual(max(most_pending), 6)
+        self.assertEqual(pending, [])
+
+    def test_load_and_write(self):
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'in.ics')
+            with open(file_name, 'w', newline='') as file_handle:
+                file_handle.write('\r\n'.join(LINES) + '\r\n')
+            outputs = []
+            for jobs in (1, 3):
+                tool = ICalTool()
+                tool.ical_load(file_name, jobs=jobs)
+                output = os.path.join(directory, 'out{}.ics'.format(jobs))
+                tool.write(output, 'VEVENT')
+                with open(output, 'rb') as file_handle:
+                    outputs.append(file_handle.read())
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertNotIn(b'unterminated', outputs[0])
+        finally:
+            shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    unittest.main()
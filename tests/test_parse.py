@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+from icaltool import rules
+from icaltool import writer
+
+def parse(*lines):
+    text = '\r\n'.join(('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test') +
+        lines + ('END:VCALENDAR',)) + '\r\n'
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_data_lines(text.encode('utf-8')))
+    return vcalendar
+
+def event(uid, *lines):
+    return ('BEGIN:VEVENT', 'UID:' + uid, 'DTSTAMP:20200101T000000Z',
+        'DTSTART:20200101T100000Z') + lines + ('END:VEVENT',)
+
+class MalformedLinesTest(unittest.TestCase):
+
+    def test_line_without_name(self):
+        vcalendar = parse(*event('test', ':orphan value', 'SUMMARY:kept'))
+        self.assertEqual([component.get('SUMMARY').value
+            for component in vcalendar._components], [':kept'])
+
+class UnknownComponentTest(unittest.TestCase):
+
+    def test_skipped_up_to_its_end(self):
+        vcalendar = parse(*(event('first') + ('BEGIN:X-CUSTOM',
+            'SUMMARY:not an event', 'BEGIN:X-CUSTOM', 'END:X-CUSTOM',
+            'BEGIN:VEVENT', 'END:VEVENT', 'END:X-CUSTOM') + event('second',
+            'BEGIN:X-NESTED', 'X-VALUE:1', 'END:X-NESTED', 'SUMMARY:kept')))
+        self.assertEqual([(component.name, component.get('UID').value)
+            for component in vcalendar._components],
+            [('VEVENT', ':first'), ('VEVENT', ':second')])
+        self.assertEqual(vcalendar._components[1]._components, [])
+        self.assertEqual(vcalendar._components[1].get('SUMMARY').value,
+            ':kept')
+
+    def test_names_of_other_classes(self):
+        vcalendar = parse(*(('BEGIN:Schema', 'END:Schema') + event('first')))
+        self.assertEqual(len(vcalendar._components), 1)
+
+def dated_event(uid, start, end, *lines):
+    return ('BEGIN:VEVENT', 'UID:' + uid, 'DTSTAMP:20200101T000000Z',
+        'DTSTART' + start, 'DTEND' + end) + lines + ('END:VEVENT',)
+
+LAZY_EVENTS = (dated_event('date', ';VALUE=DATE:20200101',
+    ';VALUE=DATE:20200103', 'CREATED:20191201T080000Z') + dated_event('zone',
+    ';TZID=Europe/Berlin:20200701T100000',
+    ';TZID="Europe/Berlin":20200701T113000',
+    'LAST-MODIFIED:20200101T120000Z', 'SUMMARY:' + 'ä' * 80) +
+    dated_event('floating', ':20200301T230000', ':20200302T010000'))
+
+class LazyTest(unittest.TestCase):
+
+    text = writer.ical_fold_lines(('BEGIN:VCALENDAR', 'VERSION:2.0',
+        'PRODID:test') + LAZY_EVENTS + ('END:VCALENDAR',))
+
+    def load(self, lazy):
+        vcalendar = datatypes.VCALENDAR()
+        vcalendar.ical_parse(reader.ical_data_lines(self.text.encode('utf-8')),
+            lazy)
+        return vcalendar
+
+    def test_written_like_eager(self):
+        lazy = writer.ical_fold_lines(self.load(True).ical_lines())
+        self.assertEqual(lazy, self.text)
+        self.assertEqual(writer.ical_fold_lines(self.load(False).ical_lines()),
+            lazy)
+        # parsing the values does not change what is written
+        vcalendar = self.load(True)
+        for component in vcalendar._components:
+            component.get('DTSTART').value
+        self.assertEqual(writer.ical_fold_lines(vcalendar.ical_lines()), lazy)
+        self.assertIn('DTSTART;VALUE=DATE:20200101', lazy)
+        self.assertIn('DTEND;TZID="Europe/Berlin":20200701T113000', lazy)
+        self.assertEqual(vcalendar.csv_write('VEVENT'),
+            self.load(False).csv_write('VEVENT'))
+
+    def test_filtered_like_eager(self):
+        for rule_text in ('DTSTART:+2020-01-01', 'DTSTART:+2020-07-01',
+            'DTSTART:-2020-03-01;DTEND:+2020', 'DTEND:+2020-01-02to2020-07',
+            'DTSTART:+20200701T080000to20200701T090000'):
+            rule_filter = rules.compile_rules(rule_text)
+            results = []
+            for lazy in (False, True):
+                vcalendar = self.load(lazy)
+                vcalendar.filter(rule_filter)
+                results.append([component.get('UID').value
+                    for component in vcalendar._components])
+            self.assertEqual(results[0], results[1], rule_text)
+        self.assertEqual(results[0], [':zone'])
+
+    def test_values_like_eager(self):
+        eager = self.load(False)
+        lazy = self.load(True)
+        for eager_component, lazy_component in zip(eager._components,
+            lazy._components):
+            for name in ('DTSTART', 'DTEND', 'DTSTAMP'):
+                eager_date = eager_component.get(name)
+                lazy_date = lazy_component.get(name)
+                self.assertEqual(lazy_date.value, eager_date.value)
+                self.assertEqual(lazy_date.type, eager_date.type)
+        # 10:00 +0200
+        self.assertEqual(lazy._components[1].get('DTSTART').value,
+            rules.parse_date_range('2020-07-01')[0] + 8 * 3600)
+
+    def test_changed_value_written(self):
+        date = datatypes.DateTime('DTSTART')
+        date.ical_parse_lazy(':20240101T100000Z')
+        date.value = 0
+        self.assertEqual(date.value, 0)
+        self.assertEqual(date.type, 3)
+        self.assertEqual(date.ical_write(), 'DTSTART:19700101T000000Z')
+
+        # local times keep their TZID
+        vcalendar = self.load(True)
+        start = vcalendar._components[1].get('DTSTART')
+        start.value = start.value + 3600
+        self.assertEqual(start.ical_write(),
+            'DTSTART;TZID=Europe/Berlin:20200701T110000')
+        start = vcalendar._components[0].get('DTSTART')
+        start.value = start.value + 86400
+        self.assertEqual(start.ical_write(), 'DTSTART;VALUE=DATE:20200102')
+
+class LeapSecondTest(unittest.TestCase):
+
+    def test_counts_as_the_last_second(self):
+        self.assertEqual(datatypes.parse_date('20161231T235960Z'),
+            datatypes.parse_date('20161231T235959Z'))
+        self.assertEqual(datatypes.parse_date('2016-12-31T23:59:60Z'),
+            datatypes.parse_date('20161231T235959Z'))
+        with self.assertRaises(ValueError):
+            datatypes.parse_date('20161231T235962Z')
+
+    def test_written_as_read(self):
+        for lazy in (False, True):
+            vcalendar = datatypes.VCALENDAR()
+            vcalendar.ical_parse(reader.ical_data_lines('\r\n'.join(
+                ('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test') +
+                event('test', 'DTEND:20161231T235960Z') +
+                ('END:VCALENDAR', '')).encode('utf-8')), lazy)
+            end = vcalendar._components[0].get('DTEND')
+            self.assertEqual(end.ical_write(), 'DTEND:20161231T235960Z')
+            self.assertEqual(end.value,
+                datatypes.parse_date('20161231T235959Z')[0])
+
+    def test_not_written_once_changed(self):
+        end = datatypes.DateTime('DTEND')
+        end.ical_parse(':20161231T235960Z')
+        end.value = 0
+        self.assertEqual(end.ical_write(), 'DTEND:19700101T000000Z')
+        # parsed again
+        end.ical_parse(':20161231T235960Z')
+        end.ical_parse(':20170101T000000Z')
+        self.assertEqual(end.ical_write(), 'DTEND:20170101T000000Z')
+        end.ical_parse(':20161231T235960Z')
+        end.csv_parse('20170101T000000Z')
+        self.assertEqual(end.ical_write(), 'DTEND:20170101T000000Z')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import reader
+from icaltool import writer
+
+BLOCK_SIZES = (1, 7, 64, 1 << 20)
+
+LINES = ['VERSION:2.0', 'PRODID:test', 'BEGIN:VEVENT', 'UID:1',
+    'SUMMARY:' + 'aä€𝄞' * 40, 'DESCRIPTION:' + 'x' * 300, 'LOCATION:short',
+    'END:VEVENT', 'BEGIN:VEVENT', 'UID:2', 'X-EMPTY:', 'SUMMARY:' + 'ü' * 80,
+    'END:VEVENT']
+
+def calendar(line_break='\r\n', fold=writer.ical_fold):
+    text = ''.join(fold(line) for line in
+        ['BEGIN:VCALENDAR'] + LINES + ['END:VCALENDAR'])
+    return text.replace('\r\n', line_break).encode('utf-8')
+
+class UnfoldTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, data, block_size):
+        file_name = os.path.join(self.directory, 'test.ics')
+        with open(file_name, 'wb') as file_handle:
+            file_handle.write(data)
+        return list(reader.ical_read_lines(file_name, block_size=block_size))
+
+    def test_block_sizes(self):
+        for data in (calendar(), calendar('\n'), calendar('\r'),
+            reader.BOM + calendar(), reader.BOM + calendar('\r')):
+            for block_size in BLOCK_SIZES:
+                self.assertEqual(self.read(data, block_size), LINES)
+                self.assertEqual(list(reader.ical_data_lines(data,
+                    block_size=block_size)), LINES)
+
+    def test_folded_with_tabs(self):
+        def fold(line):
+            return writer.ical_fold(line).replace('\r\n ', '\r\n\t')
+
+        for line_break in ('\r\n', '\n', '\r'):
+            for block_size in BLOCK_SIZES:
+                self.assertEqual(self.read(calendar(line_break, fold),
+                    block_size), LINES)
+
+    def test_mixed_line_breaks(self):
+        data = calendar()
+        # every third line break a bare "\r" or "\n"
+        parts = data.split(b'\r\n')
+        data = b''.join(part + (b'\r\n', b'\r', b'\n')[number % 3]
+            for number, part in enumerate(parts[:-1])) + parts[-1]
+        for block_size in BLOCK_SIZES:
+            self.assertEqual(self.read(data, block_size), LINES)
+
+    def test_without_last_line_break(self):
+        data = calendar()[:-2]
+        for block_size in BLOCK_SIZES:
+            self.assertEqual(self.read(data, block_size), LINES)
+
+    def test_empty_file(self):
+        self.assertEqual(self.read(b'', 64), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+import calendar
+import datetime
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+from icaltool import recurrence
+from icaltool import rules
+
+def _time(text):
+    # "YYYYMMDDTHHMMSS" or "YYYYMMDD" as seconds since the epoch
+    if len(text) == 8:
+        text += 'T000000'
+    return calendar.timegm(datetime.datetime.strptime(text,
+        '%Y%m%dT%H%M%S').timetuple())
+
+def _text(value):
+    return datetime.datetime.fromtimestamp(value,
+        datetime.timezone.utc).strftime('%Y%m%dT%H%M%S')
+
+def expand(rule, start, number=None, date_only=False):
+    # the first `number` (all if `None`) occurrences as text
+    occurrences = []
+    for value in recurrence.RecurrenceRule(rule, _time(start),
+        date_only).iter_from():
+        if not number is None and len(occurrences) == number:
+            break
+        occurrences.append(_text(value))
+    return occurrences
+
+def at_nine(*days):
+    return ['{}T090000'.format(day) for day in days]
+
+class RFC5545ExamplesTest(unittest.TestCase):
+    # the examples of RFC 5545 3.8.5.3 (in local time)
+
+    def test_daily(self):
+        self.assertEqual(expand('FREQ=DAILY;COUNT=10', '19970902T090000'),
+            at_nine(*['199709{:02}'.format(day) for day in range(2, 12)]))
+        occurrences = expand('FREQ=DAILY;UNTIL=19971224T000000Z',
+            '19970902T090000')
+        self.assertEqual(len(occurrences), 113)
+        self.assertEqual(occurrences[-1], '19971223T090000')
+        self.assertEqual(expand('FREQ=DAILY;INTERVAL=10;COUNT=5',
+            '19970902T090000'), at_nine('19970902', '19970912', '19970922',
+            '19971002', '19971012'))
+
+    def test_every_day_in_january(self):
+        occurrences = expand('FREQ=YEARLY;UNTIL=20000131T140000Z;BYMONTH=1;'
+            'BYDAY=SU,MO,TU,WE,TH,FR,SA', '19980101T090000')
+        self.assertEqual(len(occurrences), 93)
+        self.assertEqual(occurrences[31], '19990101T090000')
+        self.assertEqual(occurrences[-1], '20000131T090000')
+
+    def test_weekly(self):
+        self.assertEqual(expand('FREQ=WEEKLY;UNTIL=19971007T000000Z;WKST=SU;'
+            'BYDAY=TU,TH', '19970902T090000'), at_nine('19970902', '19970904',
+            '19970909', '19970911', '19970916', '19970918', '19970923',
+            '19970925', '19970930', '19971002'))
+        self.assertEqual(expand('FREQ=WEEKLY;INTERVAL=2;WKST=SU;BYDAY=TU,TH;'
+            'COUNT=8', '19970902T090000'), at_nine('19970902', '19970904',
+            '19970916', '19970918', '19970930', '19971002', '19971014',
+            '19971016'))
+
+    def test_week_start(self):
+        self.assertEqual(expand('FREQ=WEEKLY;INTERVAL=2;COUNT=4;BYDAY=TU,SU;'
+            'WKST=MO', '19970805T090000'), at_nine('19970805', '19970810',
+            '19970819', '19970824'))
+        self.assertEqual(expand('FREQ=WEEKLY;INTERVAL=2;COUNT=4;BYDAY=TU,SU;'
+            'WKST=SU', '19970805T090000'), at_nine('19970805', '19970817',
+            '19970819', '19970831'))
+
+    def test_monthly_by_day(self):
+        self.assertEqual(expand('FREQ=MONTHLY;COUNT=10;BYDAY=1FR',
+            '19970905T090000'), at_nine('19970905', '19971003', '19971107',
+            '19971205', '19980102', '19980206', '19980306', '19980403',
+            '19980501', '19980605'))
+        self.assertEqual(expand('FREQ=MONTHLY;INTERVAL=2;COUNT=10;'
+            'BYDAY=1SU,-1SU', '19970907T090000'), at_nine('19970907',
+            '19970928', '19971102', '19971130', '19980104', '19980125',
+            '19980301', '19980329', '19980503', '19980531'))
+        self.assertEqual(expand('FREQ=MONTHLY;COUNT=6;BYDAY=-2MO',
+            '19970922T090000'), at_nine('19970922', '19971020', '19971117',
+            '19971222', '19980119', '19980216'))
+
+    def test_monthly_by_month_day(self):
+        self.assertEqual(expand('FREQ=MONTHLY;BYMONTHDAY=-3',
+            '19970928T090000', 6), at_nine('19970928', '19971029',
+            '19971128', '19971229', '19980129', '19980226'))
+        self.assertEqual(expand('FREQ=MONTHLY;COUNT=10;BYMONTHDAY=2,15',
+            '19970902T090000'), at_nine('19970902', '19970915', '19971002',
+            '19971015', '19971102', '19971115', '19971202', '19971215',
+            '19980102', '19980115'))
+        # months without the 30th are skipped
+        self.assertEqual(expand('FREQ=MONTHLY;BYMONTHDAY=15,30;COUNT=5',
+            '20070115T090000'), at_nine('20070115', '20070130', '20070215',
+            '20070315', '20070330'))
+
+    def test_yearly(self):
+        self.assertEqual(expand('FREQ=YEARLY;INTERVAL=2;COUNT=10;'
+            'BYMONTH=1,2,3', '19970310T090000'), at_nine('19970310',
+            '19990110', '19990210', '19990310', '20010110', '20010210',
+            '20010310', '20030110', '20030210', '20030310'))
+        self.assertEqual(expand('FREQ=YEARLY;BYDAY=20MO', '19970519T090000',
+            3), at_nine('19970519', '19980518', '19990517'))
+        self.assertEqual(expand('FREQ=YEARLY;BYMONTH=3;BYDAY=TH',
+            '19970313T090000', 11), at_nine('19970313', '19970320',
+            '19970327', '19980305', '19980312', '19980319', '19980326',
+            '19990304', '19990311', '19990318', '19990325'))
+
+    def test_combined_parts(self):
+        # every Friday the 13th
+        self.assertEqual(expand('FREQ=MONTHLY;BYDAY=FR;BYMONTHDAY=13',
+            '19970902T090000', 5), at_nine('19980213', '19980313',
+            '19981113', '19990813', '20001013'))
+        # U.S. presidential election day
+        self.assertEqual(expand('FREQ=YEARLY;INTERVAL=4;BYMONTH=11;BYDAY=TU;'
+            'BYMONTHDAY=2,3,4,5,6,7,8', '19961105T090000', 3),
+            at_nine('19961105', '20001107', '20041102'))
+
+    def test_set_position(self):
+        self.assertEqual(expand('FREQ=MONTHLY;COUNT=3;BYDAY=TU,WE,TH;'
+            'BYSETPOS=3', '19970904T090000'), at_nine('19970904', '19971007',
+            '19971106'))
+        self.assertEqual(expand('FREQ=MONTHLY;BYDAY=MO,TU,WE,TH,FR;'
+            'BYSETPOS=-2', '19970929T090000', 7), at_nine('19970929',
+            '19971030', '19971127', '19971230', '19980129', '19980226',
+            '19980330'))
+
+    def test_sub_daily(self):
+        self.assertEqual(expand('FREQ=HOURLY;INTERVAL=3;'
+            'UNTIL=19970902T170000Z', '19970902T090000'), ['19970902T090000',
+            '19970902T120000', '19970902T150000'])
+        self.assertEqual(expand('FREQ=MINUTELY;INTERVAL=15;COUNT=6',
+            '19970902T090000'), ['19970902T{}00'.format(time) for time
+            in ('0900', '0915', '0930', '0945', '1000', '1015')])
+        self.assertEqual(expand('FREQ=DAILY;BYHOUR=9,10,11,12,13,14,15,16;'
+            'BYMINUTE=0,20,40', '19970902T090000', 5), ['19970902T090000',
+            '19970902T092000', '19970902T094000', '19970902T100000',
+            '19970902T102000'])
+
+    def test_invalid(self):
+        for rule in ('FREQ=FORTNIGHTLY', 'FREQ=YEARLY;BYWEEKNO=20',
+            'FREQ=DAILY;INTERVAL=0', 'COUNT=3'):
+            with self.assertRaises((ValueError, KeyError)):
+                recurrence.RecurrenceRule(rule, _time('19970902T090000'))
+
+class RareOccurrencesTest(unittest.TestCase):
+
+    def test_leap_days(self):
+        # the same occurrences for every frequency (BYMONTHDAY does not apply
+        # to WEEKLY), 2100 is no leap year
+        expected = ['20240229T090000', '20280229T090000', '20320229T090000']
+        for frequency in ('HOURLY', 'DAILY', 'MONTHLY', 'YEARLY'):
+            self.assertEqual(expand('FREQ={};BYMONTH=2;BYMONTHDAY=29;'
+                'BYHOUR=9;COUNT=3'.format(frequency), '20240229T090000'),
+                expected, frequency)
+            self.assertEqual(expand('FREQ={};BYMONTH=2;BYMONTHDAY=29;'
+                'BYHOUR=9;COUNT=2'.format(frequency), '20960229T090000'),
+                ['20960229T090000', '21040229T090000'], frequency)
+        # on a Monday: 2072, then 2112
+        self.assertEqual(expand('FREQ=DAILY;BYMONTH=2;BYMONTHDAY=29;BYDAY=MO;'
+            'COUNT=2', '20720229T090000'), ['20720229T090000',
+            '21120229T090000'])
+
+    def test_impossible(self):
+        for frequency in ('HOURLY', 'DAILY', 'MONTHLY', 'YEARLY'):
+            self.assertEqual(expand('FREQ={};BYMONTH=2;BYMONTHDAY=30'.format(
+                frequency), '20240201T090000'), [])
+
+def parse_event(*lines):
+    text = '\r\n'.join(('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test',
+        'BEGIN:VEVENT', 'UID:test', 'DTSTAMP:20200101T000000Z') + lines +
+        ('END:VEVENT', 'END:VCALENDAR')) + '\r\n'
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_data_lines(text.encode('utf-8')))
+    return vcalendar._components[0]
+
+class RecurrenceTest(unittest.TestCase):
+
+    def test_windows(self):
+        component = parse_event('DTSTART:19900101T090000Z',
+            'DTEND:19900101T100000Z', 'RRULE:FREQ=DAILY',
+            'EXDATE:20300102T090000Z')
+        occurrences = component.recurrence()
+        self.assertEqual([_text(value) for value in occurrences.between(
+            *rules.parse_date_range('2030-01-01to2030-01-03'))],
+            at_nine('20300101', '20300103'))
+        # DTEND rules look at the ends of the occurrences
+        rule = rules.compile_rules('DTEND:+2030-01-02').property_rules[
+            'DTEND']
+        self.assertFalse(occurrences.matches('DTEND', rule))
+        rule = rules.compile_rules('DTEND:+2030-01-03').property_rules[
+            'DTEND']
+        self.assertTrue(occurrences.matches('DTEND', rule))
+
+    def test_large_windows_are_not_kept(self):
+        occurrences = parse_event('DTSTART:19900101T090000Z',
+            'RRULE:FREQ=DAILY').recurrence()
+        for year in range(1990, 2060):
+            self.assertEqual(len(occurrences.between(
+                *rules.parse_date_range(str(year)))),
+                366 if calendar.isleap(year) else 365)
+        self.assertTrue(len(occurrences._occurrences) <=
+            recurrence.MAX_KEPT_OCCURRENCES)
+        self.assertEqual(len(occurrences.between(
+            *rules.parse_date_range('1990to2059'))), 25567)
+        self.assertEqual(occurrences._occurrences, [])
+
+class SkippedLocalTimeTest(unittest.TestCase):
+    # daylight saving time starts 2020-03-29 02:00 in Europe/Berlin
+
+    def test_only_the_skipped_occurrence_moves(self):
+        occurrences = parse_event(
+            'DTSTART;TZID=Europe/Berlin:20200329T023000',
+            'RRULE:FREQ=DAILY;COUNT=3').recurrence()
+        # 03:30 +0200, then 02:30 +0200
+        self.assertEqual([_text(value) for value in
+            occurrences.iter_between()], ['20200329T013000',
+            '20200330T003000', '20200331T003000'])
+        self.assertEqual([_text(local) for _, local in
+            occurrences.iter_local_between()], ['20200329T023000',
+            '20200330T023000', '20200331T023000'])
+
+    def test_excluded_by_wall_clock_time(self):
+        occurrences = parse_event(
+            'DTSTART;TZID=Europe/Berlin:20200328T023000',
+            'RRULE:FREQ=DAILY;COUNT=4',
+            'EXDATE;TZID=Europe/Berlin:20200329T033000,20200330T023000'
+            ).recurrence()
+        # 03:30 on the 29th is not an occurrence (02:30 moved there is)
+        self.assertEqual([_text(value) for value in
+            occurrences.iter_between()], ['20200328T013000',
+            '20200329T013000', '20200331T003000'])
+        occurrences = parse_event(
+            'DTSTART;TZID=Europe/Berlin:20200329T023000',
+            'RRULE:FREQ=DAILY;COUNT=3',
+            'EXDATE;TZID=Europe/Berlin:20200329T023000',
+            'EXDATE:20200331T003000Z').recurrence()
+        self.assertEqual([_text(value) for value in
+            occurrences.iter_between()], ['20200330T003000'])
+
+    def test_csv_rows(self):
+        component = parse_event('DTSTART;TZID=Europe/Berlin:20200329T023000',
+            'DTEND;TZID=Europe/Berlin:20200329T043000',
+            'RRULE:FREQ=DAILY;COUNT=3')
+        rows = recurrence.csv_rows(component, 'VEVENT', ['DTSTART', 'DTEND'],
+            *rules.parse_date_range('2020'))
+        self.assertEqual(rows, [
+            ['TZID=Europe/Berlin:20200329T023000',
+                'TZID=Europe/Berlin:20200329T043000'],
+            ['TZID=Europe/Berlin:20200330T023000',
+                'TZID=Europe/Berlin:20200330T033000'],
+            ['TZID=Europe/Berlin:20200331T023000',
+                'TZID=Europe/Berlin:20200331T033000']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import rules
+
+def _epoch(text):
+    # the start of the day / month / year `text` as used by `DateTime`
+    return rules.parse_date_range(text)[0]
+
+class ExcludedTermsTest(unittest.TestCase):
+
+    def test_many_excluded_dates(self):
+        # the exclusions are combined for texts but not for dates
+        for years in (range(2010, 2017), range(2010, 2018)):
+            rule = rules.compile_rules('DTSTART:' + '|'.join(
+                '-{}'.format(year) for year in years)).property_rules[
+                'DTSTART']
+            self.assertFalse(rule.matches_date(_epoch('2012-05-01')))
+            self.assertTrue(rule.matches_date(_epoch('2020-05-01')))
+
+    def test_many_excluded_texts(self):
+        terms = ['-name{}'.format(number) for number in range(10)]
+        rule = rules.compile_rules('SUMMARY:' + '|'.join(terms)) \
+            .property_rules['SUMMARY']
+        self.assertFalse(rule.matches(':with name3'))
+        self.assertTrue(rule.matches(':with someone else'))
+
+    def test_terms_added_later(self):
+        rule_filter = rules.compile_rules('SUMMARY:-a|-b|-c|-d|-e|-f|-g|-h')
+        rule = rule_filter.property_rules['SUMMARY']
+        self.assertTrue(rule.matches(':xyz'))
+        rule_filter.add_terms('SUMMARY', ['xyz'], include=False)
+        self.assertFalse(rule.matches(':xyz'))
+
+class TermFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'deny.txt')
+        with open(self.file_name, 'w', encoding='utf-8') as file_handle:
+            file_handle.write('# denied\njane@\n\njohn@\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_terms_from_file(self):
+        rule = rules.compile_rules('ATTENDEE:-@in({})'.format(
+            self.file_name)).property_rules['ATTENDEE']
+        self.assertFalse(rule.matches(':mailto:john@mail.domain'))
+        self.assertTrue(rule.matches(':mailto:jim@mail.domain'))
+        rule = rules.compile_rules('ATTENDEE:+@is({})'.format(
+            self.file_name)).property_rules['ATTENDEE']
+        self.assertTrue(rule.matches(';CN=Jane:jane@'))
+        self.assertFalse(rule.matches(':mailto:jane@mail.domain'))
+        with self.assertRaises(ValueError):
+            rules.compile_rules('ATTENDEE:+@in({})'.format(
+                os.path.join(self.directory, 'missing.txt')))
+
+    def test_literal(self):
+        for term in ('in(person)', 'is(it)', 're-in(x)'):
+            rule = rules.compile_rules('SUMMARY:+' + term).property_rules[
+                'SUMMARY']
+            self.assertTrue(rule.matches(':meeting ' + term))
+            self.assertFalse(rule.matches(':meeting'))
+
+class RegexTermTest(unittest.TestCase):
+
+    def test_value_without_parameters(self):
+        rule = rules.compile_rules('SUMMARY:+re(Meet)').property_rules[
+            'SUMMARY']
+        self.assertTrue(rule.matches(':Meeting one'))
+        self.assertFalse(rule.matches(':Lunch'))
+        rule = rules.compile_rules('SUMMARY:-re(^Meeting)').property_rules[
+            'SUMMARY']
+        self.assertFalse(rule.matches(';LANGUAGE=en:Meeting one'))
+        self.assertTrue(rule.matches(':A Meeting'))
+
+    def test_term_list(self):
+        rule_filter = rules.Filter([], False, {})
+        rule_filter.add_terms('ATTENDEE', [r'mailto:jane@', r'.*@other\.'],
+            match='regex')
+        rule = rule_filter.property_rules['ATTENDEE']
+        self.assertTrue(rule.matches(';CN=Jane:mailto:jane@mail.domain'))
+        self.assertTrue(rule.matches(':mailto:john@other.domain'))
+        self.assertFalse(rule.matches(';CN=jane:mailto:john@mail.domain'))
+
+class CompileErrorTest(unittest.TestCase):
+
+    def test_invalid_regex(self):
+        with self.assertRaises(ValueError):
+            rules.compile_rules('SUMMARY:+re(([)')
+
+    def test_invalid_date(self):
+        with self.assertRaises(ValueError):
+            rules.compile_rules('DTSTART:+2015-13')
+        with self.assertRaises(ValueError):
+            rules.compile_rules('X-DUE:+2015-13', frozenset(['X-DUE']))
+        # dates are no text
+        with self.assertRaises(ValueError):
+            rules.compile_rules('DTSTART:+re(2020)')
+        with self.assertRaises(ValueError):
+            rules.compile_rules('SUMMARY:+Meeting;DTEND:+2020|-re(^2020)')
+        # not a date property, searched for as text
+        rule = rules.compile_rules('SUMMARY:+2015-13').property_rules[
+            'SUMMARY']
+        self.assertTrue(rule.matches(':release 2015-13'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+
+def parse(*lines, schema=None, lazy=False):
+    text = '\r\n'.join(('BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test') +
+        lines + ('END:VCALENDAR',)) + '\r\n'
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_data_lines(text.encode('utf-8')), lazy,
+        schema)
+    return vcalendar
+
+def event(uid, *lines):
+    return ('BEGIN:VEVENT', 'UID:' + uid, 'DTSTAMP:20200101T000000Z',
+        'DTSTART:20200101T100000Z') + lines + ('END:VEVENT',)
+
+class SchemaTest(unittest.TestCase):
+
+    def test_custom_schema(self):
+        schema = datatypes.Schema({'VEVENT': {
+            'X-IGNORED': [-1, 'Property'],
+            'X-DUE': [0, 'DateTime'],
+            'SUMMARY': [-1, 'Property']}})
+        for lazy in (False, True):
+            component = parse(*event('1', 'X-IGNORED:dropped',
+                'X-DUE:20200201T100000Z', 'SUMMARY:dropped', 'X-NEW:kept',
+                'BEGIN:VALARM', 'X-NEW:alarm', 'END:VALARM'), schema=schema,
+                lazy=lazy)._components[0]
+            self.assertIsNone(component.get('X-IGNORED'))
+            self.assertIsNone(component.get('SUMMARY'))
+            self.assertIsInstance(component.get('X-DUE'), datatypes.DateTime)
+            self.assertEqual(component.get('X-DUE').value,
+                datatypes.parse_date('20200201T100000Z')[0])
+            self.assertEqual(component.get('X-NEW').value, ':kept')
+            self.assertEqual(component._components[0].get('X-NEW').value,
+                ':alarm')
+        # unknown properties are added to the schema of the class they were
+        # found in, neither to other schemas nor to the classes
+        self.assertEqual(schema.definitions['VEVENT']['X-NEW'],
+            [0, 'Property'])
+        self.assertEqual(schema.definitions['VALARM']['X-NEW'],
+            [0, 'Property'])
+        self.assertNotIn('X-NEW', schema.definitions['VTODO'])
+        self.assertNotIn('X-NEW', datatypes.default_schema.definitions[
+            'VEVENT'])
+        self.assertNotIn('X-NEW', datatypes.VEVENT.defined_properties)
+        self.assertIn('X-NEW', schema.csv_columns('VEVENT'))
+        self.assertIn('X-DUE', schema.date_properties())
+        self.assertEqual(sorted(schema.new_properties(
+            datatypes.Schema().as_dict())), [('VALARM', ['X-NEW']),
+            ('VEVENT', ['X-IGNORED', 'X-DUE', 'X-NEW'])])
+
+        # the default schema parses the same lines differently
+        component = parse(*event('1', 'X-IGNORED:kept',
+            'SUMMARY:kept'))._components[0]
+        self.assertEqual(component.get('X-IGNORED').value, ':kept')
+        self.assertEqual(component.get('SUMMARY').value, ':kept')
+
+    def test_tables(self):
+        schema = datatypes.Schema()
+        table = schema.table(datatypes.VEVENT, 'ical_parse')
+        self.assertIs(schema.table(datatypes.VEVENT, 'ical_parse'), table)
+        self.assertIsNot(schema.table(datatypes.VEVENT, 'ical_parse_lazy'),
+            table)
+        required, property_class, function, name, shared, dated = \
+            table['DTSTART']
+        self.assertEqual((required, property_class, function, name, dated),
+            (1, datatypes.DateTime, datatypes.DateTime.ical_parse, 'DTSTART',
+            True))
+        self.assertEqual(table['STATUS'][4], True)
+        self.assertEqual(table['SUMMARY'][4], False)
+        # looking up an unknown name defines it
+        self.assertEqual(table['X-UNKNOWN'][:2], (0, datatypes.Property))
+        self.assertIn('X-UNKNOWN', schema.definitions['VEVENT'])
+        # changes compile new tables
+        schema.define('VEVENT', 'X-UNKNOWN', [-1, 'Property'])
+        new_table = schema.table(datatypes.VEVENT, 'ical_parse')
+        self.assertIsNot(new_table, table)
+        self.assertEqual(new_table['X-UNKNOWN'][0], -1)
+        self.assertEqual(table['X-UNKNOWN'][0], 0)
+
+class SharedValuesTest(unittest.TestCase):
+
+    def test_changed_in_one_component(self):
+        first, second = parse(*(event('1', 'STATUS:CONFIRMED',
+            'CATEGORIES:WORK', 'DTEND;TZID=Europe/Berlin:20200101T120000') +
+            event('2', 'STATUS:CONFIRMED', 'CATEGORIES:WORK',
+            'DTEND;TZID=Europe/Berlin:20200101T120000')))._components
+        self.assertIs(first.get('STATUS').value, second.get('STATUS').value)
+        self.assertIs(first.get('DTEND')._tzid, second.get('DTEND')._tzid)
+
+        first.get('STATUS').value = ':CANCELLED'
+        first.get('CATEGORIES').ical_parse(':HOME')
+        first.get('DTEND').ical_parse(
+            ';TZID=America/New_York:20200101T120000')
+        self.assertEqual(second.get('STATUS').value, ':CONFIRMED')
+        self.assertEqual(second.get('CATEGORIES').value, ':WORK')
+        self.assertEqual(second.ical_write()[-3:-1],
+            ['CATEGORIES:WORK', 'DTEND;TZID=Europe/Berlin:20200101T120000'])
+        self.assertEqual(first.ical_write()[-4:-1], ['STATUS:CANCELLED',
+            'CATEGORIES:HOME', 'DTEND;TZID=America/New_York:20200101T120000'])
+
+    def test_not_shared(self):
+        # values of other properties are not interned
+        first, second = parse(*(event('1', 'SUMMARY:' + 'same ' * 4) +
+            event('2', 'SUMMARY:' + 'same ' * 4)))._components
+        self.assertEqual(first.get('SUMMARY').value,
+            second.get('SUMMARY').value)
+        self.assertIsNot(first.get('SUMMARY').value,
+            second.get('SUMMARY').value)
+
+if __name__ == '__main__':
+    unittest.main()
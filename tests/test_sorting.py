@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+from icaltool import sorting
+from icaltool import writer
+from icaltool.icaltool import ICalTool
+
+EVENTS = 400
+
+def write_calendar(file_name):
+    # start times out of order, many of them equal, some events without one
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+    for number in range(EVENTS):
+        lines.extend(['BEGIN:VEVENT', 'UID:{}'.format(number),
+            'DTSTAMP:20200101T000000Z'])
+        if number % 17 != 0:
+            lines.append('DTSTART:202001{:02}T{:02}0000Z'.format(
+                number * 7 % 28 + 1, number * 5 % 3 + 10))
+        lines.extend(['SUMMARY:Ereignis Nr. {} über {}'.format(number,
+            'x' * (number % 90)), 'END:VEVENT'])
+    lines.append('END:VCALENDAR')
+    with open(file_name, 'w', encoding='utf-8', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+def read(file_name):
+    with open(file_name, 'rb') as file_handle:
+        return file_handle.read()
+
+class SortedWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'in.ics')
+        write_calendar(self.file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def stream(self, output, memory_limit):
+        # the output and the number of runs written sorting by DTSTART
+        tool = ICalTool(stats=True)
+        tool.sort_by = 'DTSTART'
+        tool.sort_memory = memory_limit
+        output = os.path.join(self.directory, output)
+        tool.stream(self.file_name, [('output', output)])
+        return read(output), tool.stats.counters['sort_runs_spilled']
+
+    def test_same_output_for_every_memory_limit(self):
+        for output in ('sorted.ics', 'sorted.csv'):
+            expected, runs = self.stream(output, 1 << 30)
+            self.assertEqual(runs, 0)
+            for memory_limit in (1 << 16, 1 << 14, 1000):
+                data, runs = self.stream(output, memory_limit)
+                self.assertGreater(runs, 1)
+                self.assertEqual(data, expected)
+            # merged in several passes
+            with unittest.mock.patch.object(sorting, 'MERGE_WIDTH', 2):
+                data, runs = self.stream(output, 1000)
+            self.assertGreater(runs, 2)
+            self.assertEqual(data, expected)
+
+    def test_order(self):
+        data, _ = self.stream('sorted.ics', 1000)
+        vcalendar = datatypes.VCALENDAR()
+        vcalendar.ical_parse(reader.ical_data_lines(data))
+        components = vcalendar._components
+        self.assertEqual(len(components), EVENTS)
+        keys = [sorting.sort_key(component, 'DTSTART')
+            for component in components]
+        self.assertEqual(keys, sorted(keys))
+        # equal keys keep the order they were written in
+        for previous, component in zip(components, components[1:]):
+            if sorting.sort_key(previous, 'DTSTART') == \
+                sorting.sort_key(component, 'DTSTART'):
+                self.assertLess(int(previous.get('UID').value[1:]),
+                    int(component.get('UID').value[1:]))
+        # components without DTSTART last
+        self.assertEqual(keys[-1], (3,))
+
+    def test_runs_are_removed(self):
+        runs = os.path.join(self.directory, 'runs')
+        os.mkdir(runs)
+        vcalendar = datatypes.VCALENDAR()
+        output = sorting.SortedWriter(writer.ICalWriter(os.path.join(
+            self.directory, 'sorted.ics'), vcalendar), 'DTSTART', 1000, runs)
+        for component in vcalendar.ical_iter(
+            reader.ical_read_lines(self.file_name)):
+            output.write(component)
+        self.assertNotEqual(os.listdir(runs), [])
+        output.close()
+        self.assertEqual(os.listdir(runs), [])
+
+if __name__ == '__main__':
+    unittest.main()
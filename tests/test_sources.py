@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import functools
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import sources
+from icaltool.icaltool import ICalTool
+
+def write_calendar(file_name, uid):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test', 'BEGIN:VEVENT',
+        'UID:' + uid, 'DTSTAMP:20200101T000000Z', 'DTSTART:20200101T100000Z',
+        'END:VEVENT', 'END:VCALENDAR']
+    with open(file_name, 'w', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    # serves the files of a directory, "/slow.ics" only answers once
+    # `release` is set
+
+    release = None
+
+    def do_GET(self):
+        if self.path == '/slow.ics':
+            self.release.wait(10)
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+class LoadManyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for name in ('a', 'b', 'slow'):
+            write_calendar(os.path.join(self.directory, name + '.ics'), name)
+        Handler.release = threading.Event()
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+            functools.partial(Handler, directory=self.directory))
+        self.thread = threading.Thread(target=self.server.serve_forever,
+            daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        Handler.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def url(self, name):
+        return 'http://127.0.0.1:{}/{}'.format(self.server.server_port, name)
+
+    def test_failed_sources_are_reported(self):
+        tool = ICalTool()
+        urls = [self.url('a.ics'), self.url('missing.ics'),
+            self.url('slow.ics'), os.path.join(self.directory, 'b.ics')]
+        failed = tool.load_many(urls, concurrency=4, fetchers=[
+            sources.URLFetcher(timeout=0.5), sources.FileFetcher()])
+        self.assertEqual(failed, [self.url('missing.ics'),
+            self.url('slow.ics')])
+        # the others are loaded in the order of the sources
+        self.assertEqual([component.get('UID').value
+            for component in tool.vcalendar._components], [':a', ':b'])
+
+    def test_stand_in_fetcher(self):
+        class StandIn(sources.Fetcher):
+            def handles(self, source):
+                return source[:8] == 'stand-in'
+
+            async def fetch(self, source):
+                with open(os.path.join(directory, 'a.ics'), 'rb') as \
+                    file_handle:
+                    return file_handle.read()
+
+        directory = self.directory
+        tool = ICalTool()
+        failed = tool.load_many(['stand-in:1', 'unknown:2', self.url('b.ics')],
+            fetchers=[StandIn(), sources.URLFetcher()])
+        self.assertEqual(failed, ['unknown:2'])
+        self.assertEqual([component.get('UID').value
+            for component in tool.vcalendar._components], [':a', ':b'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import asyncio
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import tracemalloc
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import stats as run_stats
+from icaltool.icaltool import ICalTool
+
+def write_calendar(file_name, events):
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+    for number in range(events):
+        lines.extend(['BEGIN:VEVENT', 'UID:{}'.format(number),
+            'DTSTAMP:20200101T000000Z', 'DTSTART:20200101T100000Z',
+            'END:VEVENT'])
+    lines.append('END:VCALENDAR')
+    with open(file_name, 'w', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+class CountingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_names = []
+        for events in range(1, 9):
+            file_name = os.path.join(self.directory, '{}.ics'.format(events))
+            write_calendar(file_name, events)
+            self.file_names.append(file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_tools_in_threads(self):
+        # every tool only counts its own components, even while the others
+        # load at the same time
+        barrier = threading.Barrier(len(self.file_names))
+
+        def load(file_name):
+            tool = ICalTool(stats=True)
+            barrier.wait()
+            for _ in range(20):
+                tool.ical_load(file_name)
+            return tool.stats.counters['components_parsed']
+
+        with concurrent.futures.ThreadPoolExecutor(len(self.file_names)) as \
+            executor:
+            counts = list(executor.map(load, self.file_names))
+        self.assertEqual(counts, [20 * events for events in range(1, 9)])
+        self.assertIsNone(datatypes.current_stats())
+
+    def test_load_many_at_the_same_time(self):
+        tools = [ICalTool(stats=True) for _ in range(2)]
+
+        async def load():
+            with concurrent.futures.ThreadPoolExecutor(4) as executor:
+                await asyncio.gather(
+                    tools[0].aload_many(self.file_names[:4],
+                        executor=executor),
+                    tools[1].aload_many(self.file_names[4:],
+                        executor=executor))
+
+        asyncio.run(load())
+        self.assertEqual([tool.stats.counters['components_parsed']
+            for tool in tools], [1 + 2 + 3 + 4, 5 + 6 + 7 + 8])
+
+    def test_memory_of_steps(self):
+        stats = run_stats.Stats(True, trace_memory=True)
+        with stats.step('large'):
+            data = bytearray(2**22)
+        # what the previous step left is not counted
+        with stats.step('small'):
+            small_data = bytearray(2**10)
+        large, small = stats.steps
+        self.assertGreaterEqual(large['peak_memory'], 2**22)
+        self.assertLess(small['peak_memory'], 2**20)
+        if not run_stats.resource is None:
+            self.assertGreaterEqual(small['peak_rss'], large['peak_rss'])
+        report = stats.report().splitlines()
+        self.assertIn('peak RSS so far', report[0])
+        self.assertRegex(report[1], r'^large .* 4\.\d MiB ')
+
+    def test_memory_without_tracing(self):
+        stats = run_stats.Stats(True)
+        with stats.step('load'):
+            pass
+        self.assertIsNone(stats.steps[0]['peak_memory'])
+        self.assertRegex(stats.report().splitlines()[1], r'^load .* - ')
+
+    def test_memory_not_traced_while_disabled(self):
+        stats = run_stats.Stats(trace_memory=True)
+        with stats.step('load'):
+            self.assertFalse(tracemalloc.is_tracing())
+        self.assertIsNone(stats.steps[0]['peak_memory'])
+
+    def test_disabled(self):
+        tool = ICalTool()
+        tool.ical_load(self.file_names[0])
+        self.assertEqual(tool.stats.counters, {})
+
+if __name__ == '__main__':
+    unittest.main()
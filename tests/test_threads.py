@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+from icaltool.icaltool import ICalTool
+
+# a reduced version of `benchmarks/threads.py`
+CALENDARS = 8
+EVENTS = 30
+THREADS = 4
+ROUNDS = 3
+
+def write_calendar(file_name, number):
+    # every calendar has X-properties of its own
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+    for event in range(EVENTS):
+        lines.extend(['BEGIN:VEVENT', 'UID:{}-{}'.format(number, event),
+            'DTSTAMP:20200101T000000Z',
+            'DTSTART;TZID=Europe/Berlin:202001{:02}T100000'.format(
+                event % 28 + 1),
+            'SUMMARY:event {} of calendar {}'.format(event, number)])
+        for x_property in range(2):
+            lines.append('X-CALENDAR{}-{}:{}'.format(number, x_property,
+                event))
+        if event % 5 == 0:
+            lines.extend(['BEGIN:VALARM', 'ACTION:DISPLAY',
+                'TRIGGER:-PT15M', 'END:VALARM'])
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    with open(file_name, 'w', newline='') as file_handle:
+        file_handle.write('\r\n'.join(lines) + '\r\n')
+
+def load(file_name):
+    # the written calendar, the .csv-columns and the number of components
+    # parsed using a tool of its own
+    tool = ICalTool(stats=True)
+    tool.ical_load(file_name)
+    return (tool.vcalendar.ical_write(), tool.schema.csv_columns('VEVENT'),
+        tool.stats.counters['components_parsed'])
+
+def parse(file_name, schema):
+    # the written calendar parsed using `schema` (shared by all threads)
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_read_lines(file_name), schema=schema)
+    return vcalendar.ical_write()
+
+class ThreadsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_names = []
+        for number in range(CALENDARS):
+            file_name = os.path.join(self.directory, '{}.ics'.format(number))
+            write_calendar(file_name, number)
+            self.file_names.append(file_name)
+        self.expected = [load(file_name) for file_name in self.file_names]
+        self.executor = concurrent.futures.ThreadPoolExecutor(THREADS)
+
+    def tearDown(self):
+        self.executor.shutdown()
+        shutil.rmtree(self.directory)
+
+    def test_a_tool_per_calendar(self):
+        for reference in self.expected:
+            # the components and their alarms
+            self.assertEqual(reference[2], EVENTS + EVENTS // 5)
+        for _ in range(ROUNDS):
+            self.assertEqual(list(self.executor.map(load, self.file_names)),
+                self.expected)
+
+    def test_one_shared_schema(self):
+        for _ in range(ROUNDS):
+            schema = datatypes.Schema()
+            results = list(self.executor.map(parse, self.file_names,
+                [schema] * CALENDARS))
+            self.assertEqual(results, [reference[0]
+                for reference in self.expected])
+            # every X-property of every calendar, each added once
+            columns = schema.csv_columns('VEVENT')
+            self.assertEqual(len(columns), len(set(columns)))
+            for reference in self.expected:
+                for name in reference[1]:
+                    self.assertIn(name, columns)
+
+    def test_load_many(self):
+        # properties are added in the order of the sources
+        ordered = [name for reference in self.expected
+            for name in reference[1] if name[:10] == 'X-CALENDAR']
+        for _ in range(ROUNDS):
+            tool = ICalTool(stats=True)
+            tool.load_many(self.file_names, concurrency=THREADS,
+                executor=self.executor)
+            self.assertEqual([name for name in tool.schema.csv_columns(
+                'VEVENT') if name[:10] == 'X-CALENDAR'], ordered)
+            self.assertEqual(tool.stats.counters['components_parsed'],
+                sum(reference[2] for reference in self.expected))
+
+    def test_own_columns(self):
+        # tools set up differently write their own columns at the same time
+        def write(number):
+            tool = ICalTool()
+            tool.setup({'VEVENT': {'defined_properties': {
+                'X-TOOL{}'.format(number): [0, 'Property']}}})
+            tool.ical_load(self.file_names[number])
+            file_name = os.path.join(self.directory, '{}.csv'.format(number))
+            tool.csv_write(file_name)
+            with open(file_name, encoding='utf-8') as file_handle:
+                header = file_handle.readline()
+            return (header, tool.vcalendar.csv_write('VEVENT',
+                schema=tool.schema)[0])
+
+        for number, (header, row) in enumerate(self.executor.map(write,
+            range(CALENDARS))):
+            self.assertIn('"X-TOOL{}"'.format(number), header)
+            self.assertEqual(header.count('X-TOOL'), 1)
+            self.assertEqual(row.count(','), header.count(','))
+
+    def test_nothing_leaks_into_the_defaults(self):
+        list(self.executor.map(load, self.file_names))
+        self.assertEqual([name for name in datatypes.VEVENT.defined_properties
+            if name[:10] == 'X-CALENDAR'] + [name for name in
+            datatypes.default_schema.csv_columns('VEVENT')
+            if name[:10] == 'X-CALENDAR'], [])
+
+if __name__ == '__main__':
+    unittest.main()
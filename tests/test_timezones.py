@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+import unittest.mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import merge
+from icaltool import reader
+from icaltool import rules
+from icaltool import timezones
+
+def vtimezone(offset):
+    return ['BEGIN:VTIMEZONE', 'TZID:Custom', 'BEGIN:STANDARD',
+        'DTSTART:19700101T000000', 'TZOFFSETFROM:' + offset,
+        'TZOFFSETTO:' + offset, 'END:STANDARD', 'END:VTIMEZONE']
+
+def event(start):
+    return ['BEGIN:VEVENT', 'UID:test', 'DTSTAMP:20200101T000000Z',
+        'DTSTART;' + start, 'END:VEVENT']
+
+def parse(lines, vcalendar=None, lazy=False):
+    if vcalendar is None:
+        vcalendar = datatypes.VCALENDAR()
+    text = '\r\n'.join(['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test'] +
+        lines + ['END:VCALENDAR']) + '\r\n'
+    vcalendar.ical_parse(reader.ical_data_lines(text.encode('utf-8')), lazy)
+    return vcalendar
+
+def starts(vcalendar):
+    return [component.get('DTSTART') for component in vcalendar._components
+        if component.name == 'VEVENT']
+
+class ZonesTest(unittest.TestCase):
+
+    def test_vtimezone_after_the_times(self):
+        for lazy in (False, True):
+            start = starts(parse(event('TZID=Custom:20200101T100000') +
+                vtimezone('+0100'), lazy=lazy))[0]
+            self.assertEqual(start.value,
+                rules.parse_date_range('2020-01-01')[0] + 9 * 3600)
+            self.assertEqual(start.ical_write(),
+                'DTSTART;TZID=Custom:20200101T100000')
+
+    def test_calendars_defining_the_same_tzid(self):
+        first = parse(vtimezone('+0100') +
+            event('TZID=Custom:20200101T100000'))
+        second = parse(vtimezone('-0500') +
+            event('TZID=Custom:20200101T100000'))
+        first_start, second_start = starts(merge.merge([first, second]))
+        self.assertEqual(second_start.value - first_start.value, 6 * 3600)
+        self.assertEqual(first_start.ical_write(),
+            'DTSTART;TZID=Custom:20200101T100000')
+        # parsed into the same calendar one after the other
+        vcalendar = parse(vtimezone('+0100') +
+            event('TZID=Custom:20200101T100000'))
+        parse(vtimezone('-0500') + event('TZID=Custom:20200101T100000'),
+            vcalendar)
+        self.assertEqual([start.value for start in starts(vcalendar)],
+            [first_start.value, second_start.value])
+
+    def test_skipped_local_time_is_written_unchanged(self):
+        start = starts(parse(event(
+            'TZID=Europe/Berlin:20170326T023000')))[0]
+        self.assertEqual(start.ical_write(),
+            'DTSTART;TZID=Europe/Berlin:20170326T023000')
+        # moved forward to 03:30 (+0200)
+        self.assertEqual(start.value,
+            rules.parse_date_range('2017-03-26')[0] + 3600 + 1800)
+
+class ValueTest(unittest.TestCase):
+
+    def test_get_value_is_the_local_time(self):
+        for lazy in (False, True):
+            start = starts(parse(event('TZID=Custom:20200101T100000') +
+                vtimezone('+0100'), lazy=lazy))[0]
+            self.assertEqual(start.get_value()[:6], (2020, 1, 1, 10, 0, 0))
+            self.assertEqual(start.get_utc_value()[:6], (2020, 1, 1, 9, 0, 0))
+        start = starts(parse(event('VALUE=DATE:20200101')))[0]
+        self.assertEqual(start.get_value(), start.get_utc_value())
+
+    def test_converted_once(self):
+        start = starts(parse(event('TZID=Custom:20200101T100000') +
+            vtimezone('+0100')))[0]
+        value = start.value
+        with unittest.mock.patch.object(timezones.Zone, 'to_utc',
+            autospec=True, side_effect=timezones.Zone.to_utc) as to_utc:
+            self.assertEqual([start.value for _ in range(3)], [value] * 3)
+            self.assertEqual(to_utc.call_count, 0)
+            # defined again, e.g. by a VTIMEZONE following in the calendar
+            start._zone.zones.define(parse(vtimezone('+0300'))._components[0])
+            self.assertEqual(start.value, value - 2 * 3600)
+            self.assertEqual(start.value, value - 2 * 3600)
+            self.assertEqual(to_utc.call_count, 1)
+        # a new value is converted again
+        start.value = value
+        self.assertEqual(start.value, value)
+        self.assertEqual(start.ical_write(),
+            'DTSTART;TZID=Custom:20200101T120000')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import datatypes
+from icaltool import reader
+from icaltool.icaltool import ICalTool
+
+LINES = ['BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:test']
+for number, (start, summary) in enumerate((('20150301', 'Meeting'),
+    ('20160701', 'Lunch'), ('20170101', 'Meeting'), ('20180501', 'Party'))):
+    LINES += ['BEGIN:VEVENT', 'UID:{}'.format(number),
+        'DTSTAMP:20200101T000000Z', 'DTSTART:{}T100000Z'.format(start),
+        'DTEND:{}T110000Z'.format(start), 'SUMMARY:' + summary]
+    if number == 2:
+        LINES += ['BEGIN:VALARM', 'ACTION:DISPLAY', 'TRIGGER:-PT15M',
+            'END:VALARM']
+    LINES += ['END:VEVENT']
+LINES += ['BEGIN:VTODO', 'UID:todo', 'DTSTAMP:20200101T000000Z',
+    'CREATED:20160101T000000Z', 'LAST-MODIFIED:20160101T000000Z',
+    'SUMMARY:Meeting notes', 'END:VTODO', 'END:VCALENDAR']
+
+SPLITS = ('DTSTART:+2016to2017', 'SUMMARY:+Meeting',
+    'COMPONENT:-VALARM;SUMMARY:-Lunch')
+
+def uids(components):
+    return [component.get('UID').value[1:] for component in components
+        if component.name != 'VALARM']
+
+def read(file_name):
+    vcalendar = datatypes.VCALENDAR()
+    vcalendar.ical_parse(reader.ical_read_lines(file_name))
+    return vcalendar
+
+class ViewTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.input = os.path.join(self.directory, 'in.ics')
+        with open(self.input, 'w', newline='') as file_handle:
+            file_handle.write('\r\n'.join(LINES) + '\r\n')
+        self.tool = ICalTool()
+        self.tool.load(self.input)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_source_unchanged(self):
+        before = self.tool.vcalendar.ical_write()
+        for rules in SPLITS:
+            selection = self.tool.select(rules)
+            self.assertLess(len(selection),
+                len(self.tool.vcalendar._components))
+        self.assertEqual(self.tool.vcalendar.ical_write(), before)
+        self.assertEqual(len(self.tool.vcalendar._components[2]._components),
+            1)
+
+    def test_selected_twice(self):
+        for rules in SPLITS:
+            first = self.tool.select(rules)
+            second = self.tool.select(rules)
+            self.assertEqual(uids(first.components()),
+                uids(second.components()))
+            self.assertEqual(first.ical_write(), second.ical_write())
+        self.assertEqual(uids(self.tool.select(
+            'DTSTART:+2016to2017').components()), ['1', '2'])
+
+    def test_narrowed(self):
+        selection = self.tool.select('SUMMARY:+Meeting')
+        rule_filter = self.tool._compile_rules('DTSTART:+2017')
+        self.assertEqual(uids(selection.select(rule_filter).components()),
+            ['2'])
+        self.assertEqual(uids(selection.components()), ['0', '2', 'todo'])
+
+    def test_view_of_children(self):
+        # the alarm is dropped from the view, not from the event
+        selection = self.tool.select('COMPONENT:-VALARM')
+        event = list(selection.components())[2]
+        self.assertEqual(len(event), 0)
+        self.assertNotIn('BEGIN:VALARM', selection.ical_write())
+        self.assertIn('BEGIN:VALARM', self.tool.vcalendar.ical_write())
+
+    def test_split(self):
+        outputs = []
+        for number, rules in enumerate(SPLITS):
+            outputs.append((rules, os.path.join(self.directory,
+                'split{}.ics'.format(number))))
+        expected = [self.tool.select(rules).ical_write()
+            for rules, _ in outputs]
+        self.tool.split(outputs)
+        for (_, file_name), lines in zip(outputs, expected):
+            self.assertEqual(read(file_name).ical_write(), lines)
+
+        # streaming gives the same files
+        for rules, file_name in outputs:
+            os.remove(file_name)
+        ICalTool().stream(self.input, [('split', output)
+            for output in outputs])
+        for (_, file_name), lines in zip(outputs, expected):
+            self.assertEqual(read(file_name).ical_write(), lines)
+
+    def test_split_csv(self):
+        output = os.path.join(self.directory, 'split.csv')
+        selection = self.tool.select('SUMMARY:+Meeting')
+        self.tool.split([('SUMMARY:+Meeting', output)])
+        with open(output, 'r', encoding='utf-8', newline='') as file_handle:
+            loaded = file_handle.read()
+        streamed = os.path.join(self.directory, 'streamed.csv')
+        ICalTool().stream(self.input, [('split', ('SUMMARY:+Meeting',
+            streamed))])
+        with open(streamed, 'r', encoding='utf-8', newline='') as \
+            file_handle:
+            self.assertEqual(file_handle.read(), loaded)
+        # a row per selected event
+        self.assertEqual(len(loaded.split('\r\n')) - 1,
+            len(uids(component for component in selection.components()
+            if component.name == 'VEVENT')))
+
+if __name__ == '__main__':
+    unittest.main()
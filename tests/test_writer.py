@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from icaltool import writer
+
+# characters of one to four octets in UTF-8
+LINES = ['SUMMARY:' + text * count for text in ('a', 'ä', '€', '𝄞', 'aä€𝄞')
+    for count in (1, 60, 66, 67, 73, 74, 75, 200)] + ['', 'X:' + 'ä' * 500]
+
+def unfold(text):
+    return text.replace('\r\n ', '').replace('\r\n\t', '')
+
+class FoldTest(unittest.TestCase):
+
+    def test_octets(self):
+        for line in LINES:
+            folded = writer.ical_fold(line)
+            self.assertEqual(folded[-2:], '\r\n')
+            parts = folded[:-2].encode('utf-8').split(b'\r\n')
+            for number, part in enumerate(parts):
+                # RFC 5545 allows 75, one less is written
+                self.assertLessEqual(len(part), writer.FOLD_OCTETS)
+                if number:
+                    self.assertEqual(part[:1], b' ')
+                # not split inside a character
+                str(part, 'utf-8')
+            if len(line.encode('utf-8')) <= writer.FOLD_OCTETS:
+                self.assertEqual(len(parts), 1)
+            else:
+                # no more lines than needed
+                self.assertGreater(len(parts[-2]) + 4, writer.FOLD_OCTETS)
+
+    def test_unfolded_as_written(self):
+        for line in LINES:
+            self.assertEqual(unfold(writer.ical_fold(line)), line + '\r\n')
+
+    def test_lines(self):
+        self.assertEqual(writer.ical_fold_lines([]), '')
+        for lines in (LINES[:3], LINES, ['A:b', 'C:d']):
+            self.assertEqual(writer.ical_fold_lines(lines),
+                ''.join(map(writer.ical_fold, lines)))
+
+if __name__ == '__main__':
+    unittest.main()